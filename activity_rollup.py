@@ -0,0 +1,424 @@
+# activity_rollup.py
+# Streaming rollups over the JSON lines written by UserActivityService.
+#
+# Reads (or tails) activity log files once, in large blocks, and keeps only
+# aggregates in memory:
+#   - per time bucket: exact counts per (verb, status, target type), plus
+#     heavy-hitters sketches of actors, of (ip, verb, status), and of
+#     (ip, verb, status) for unsuccessful events only, so that rare failures
+#     (e.g. failed logins) are not crowded out by successful traffic
+#   - overall: a heavy-hitters sketch of actors
+# Buckets older than the retention window are discarded, and every sketch has a
+# fixed capacity, so memory does not grow with the size of the logs.
+#
+# File offsets and the rollups are checkpointed together (atomically), so a
+# restarted process resumes where it stopped without reprocessing or double
+# counting.
+#
+# Usage:
+#   python activity_rollup.py activity.log --checkpoint rollup.json [--follow]
+#   python activity_rollup.py activity.log --checkpoint rollup.json --report --verb login --status failure
+import argparse
+import functools
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+TIMESTAMP_FIELDS = ("timestamp", "@timestamp", "time", "asctime", "created")
+ACTIVITY_MARKER = '"user_activity"'
+
+
+class HeavyHitters:
+    """
+    Misra-Gries "frequent items" sketch holding at most 2 * capacity counters.
+
+    Any key seen more than total / (capacity + 1) times is guaranteed to be kept.
+    Counts are lower bounds and undercount by at most `error`. Sketches with the
+    same capacity can be merged, which is how per-bucket sketches combine into a
+    window.
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.counts = {}
+        self.total = 0
+        self.error = 0
+
+    def add(self, key, weight=1):
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + weight
+        self.total += weight
+        # Letting the table grow to 2x before shrinking keeps the amortized cost O(1)
+        if len(counts) > 2 * self.capacity:
+            self._reduce()
+
+    def _reduce(self):
+        threshold = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.counts = {key: count - threshold for key, count in self.counts.items() if count > threshold}
+        self.error += threshold
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total += other.total
+        self.error += other.error
+        if len(self.counts) > 2 * self.capacity:
+            self._reduce()
+
+    def top(self, n=10, predicate=None):
+        items = self.counts.items()
+        if predicate is not None:
+            items = [(key, count) for key, count in items if predicate(key)]
+        return sorted(items, key=lambda item: item[1], reverse=True)[:n]
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "error": self.error,
+            "counts": [[key, count] for key, count in self.counts.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["capacity"])
+        sketch.total = data["total"]
+        sketch.error = data["error"]
+        # JSON turns tuple keys into lists
+        sketch.counts = {tuple(key) if isinstance(key, list) else key: count for key, count in data["counts"]}
+        return sketch
+
+
+class _Bucket:
+    __slots__ = ("totals", "actors", "ips", "failed_ips")
+
+    def __init__(self, sketch_capacity):
+        self.totals = Counter()  # (verb, status, target type) -> count
+        self.actors = HeavyHitters(sketch_capacity)  # actor id
+        self.ips = HeavyHitters(sketch_capacity)  # (ip, verb, status)
+        self.failed_ips = HeavyHitters(sketch_capacity)  # (ip, verb, status), status != "success"
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_iso_seconds(value):
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def event_timestamp(event):
+    """Epoch seconds of an activity event, from the first timestamp field present (None if none)."""
+    for field in TIMESTAMP_FIELDS:
+        value = event.get(field)
+        if value is None:
+            continue
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            # Buckets need whole seconds; dropping the fraction of
+            # "YYYY-MM-DDTHH:MM:SS.ffffff+00:00" lets the parse cache hit
+            try:
+                return _parse_iso_seconds(value[:19] + value[19:].lstrip(".,0123456789"))
+            except ValueError:
+                return None
+    return None
+
+
+class ActivityRollup:
+    """
+    Time-bucketed counts over user activity events.
+
+    Args:
+        bucket_seconds: Width of a time bucket.
+        retention_buckets: Buckets kept, counted back from the newest event seen.
+                           Events older than that are counted in `late_events`.
+        sketch_capacity: Capacity of every heavy-hitters sketch.
+    """
+
+    def __init__(self, bucket_seconds=300, retention_buckets=288, sketch_capacity=200):
+        self.bucket_seconds = bucket_seconds
+        self.retention_buckets = retention_buckets
+        self.sketch_capacity = sketch_capacity
+        self.buckets = {}  # bucket start (epoch seconds) -> _Bucket
+        self.top_actors = HeavyHitters(sketch_capacity)
+        self.events = 0
+        self.late_events = 0
+        self.skipped_lines = 0
+        self.newest_bucket = None
+
+    def add(self, event):
+        """Adds one decoded activity event. Returns False if it was not counted."""
+        if event.get("event_type") != "user_activity":
+            self.skipped_lines += 1
+            return False
+        timestamp = event_timestamp(event)
+        if timestamp is None:
+            self.skipped_lines += 1
+            return False
+        bucket_start = int(timestamp // self.bucket_seconds) * self.bucket_seconds
+        bucket = self.buckets.get(bucket_start)
+        if bucket is None:
+            bucket = self._new_bucket(bucket_start)
+            if bucket is None:
+                self.late_events += 1
+                return False
+
+        action = event.get("action") or {}
+        verb, status = action.get("verb"), action.get("status")
+        actor_id = (event.get("actor") or {}).get("id")
+        target_type = (event.get("target") or {}).get("type")
+        ip_address = (event.get("network") or {}).get("ip_address")
+
+        bucket.totals[(verb, status, target_type)] += 1
+        if actor_id is not None:
+            bucket.actors.add(actor_id)
+            self.top_actors.add(actor_id)
+        if ip_address is not None:
+            bucket.ips.add((ip_address, verb, status))
+            if status != "success":
+                bucket.failed_ips.add((ip_address, verb, status))
+        self.events += 1
+        return True
+
+    def _new_bucket(self, bucket_start):
+        if self.newest_bucket is None or bucket_start > self.newest_bucket:
+            self.newest_bucket = bucket_start
+            oldest_kept = bucket_start - (self.retention_buckets - 1) * self.bucket_seconds
+            for expired in [start for start in self.buckets if start < oldest_kept]:
+                del self.buckets[expired]
+        elif bucket_start <= self.newest_bucket - self.retention_buckets * self.bucket_seconds:
+            return None
+        bucket = self.buckets[bucket_start] = _Bucket(self.sketch_capacity)
+        return bucket
+
+    def _window(self, since=None, until=None):
+        for start in sorted(self.buckets):
+            if since is not None and start + self.bucket_seconds <= since:
+                continue
+            if until is not None and start >= until:
+                continue
+            yield start, self.buckets[start]
+
+    def counts(self, since=None, until=None, verb=None, status=None):
+        """
+        Event counts per bucket in [since, until), optionally for one verb and/or status.
+
+        Returns:
+            list: [{"bucket": start, "count": n, "by_verb_status": {"verb/status": n}}, ...]
+        """
+        result = []
+        for start, bucket in self._window(since, until):
+            by_verb_status = Counter()
+            for (bucket_verb, bucket_status, _), count in bucket.totals.items():
+                if (verb is None or bucket_verb == verb) and (status is None or bucket_status == status):
+                    by_verb_status[f"{bucket_verb}/{bucket_status}"] += count
+            result.append({"bucket": start, "count": sum(by_verb_status.values()),
+                           "by_verb_status": dict(by_verb_status)})
+        return result
+
+    def top_ips(self, n=10, since=None, until=None, verb=None, status=None):
+        """Approximate top IPs in [since, until), e.g. failed logins per IP in the last hour."""
+        failures_only = status is not None and status != "success"
+        merged = HeavyHitters(self.sketch_capacity)
+        for _, bucket in self._window(since, until):
+            merged.merge(bucket.failed_ips if failures_only else bucket.ips)
+        per_ip = Counter()
+        for (ip_address, key_verb, key_status), count in merged.counts.items():
+            if (verb is None or key_verb == verb) and (status is None or key_status == status):
+                per_ip[ip_address] += count
+        return per_ip.most_common(n)
+
+    def top_actors_in(self, n=10, since=None, until=None):
+        """Approximate top actors in [since, until); with no bounds, over everything read so far."""
+        if since is None and until is None:
+            return self.top_actors.top(n)
+        merged = HeavyHitters(self.sketch_capacity)
+        for _, bucket in self._window(since, until):
+            merged.merge(bucket.actors)
+        return merged.top(n)
+
+    def to_dict(self):
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "retention_buckets": self.retention_buckets,
+            "sketch_capacity": self.sketch_capacity,
+            "events": self.events,
+            "late_events": self.late_events,
+            "skipped_lines": self.skipped_lines,
+            "newest_bucket": self.newest_bucket,
+            "top_actors": self.top_actors.to_dict(),
+            "buckets": [
+                {
+                    "start": start,
+                    "totals": [[*key, count] for key, count in bucket.totals.items()],
+                    "actors": bucket.actors.to_dict(),
+                    "ips": bucket.ips.to_dict(),
+                    "failed_ips": bucket.failed_ips.to_dict(),
+                }
+                for start, bucket in self.buckets.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        rollup = cls(data["bucket_seconds"], data["retention_buckets"], data["sketch_capacity"])
+        rollup.events = data["events"]
+        rollup.late_events = data["late_events"]
+        rollup.skipped_lines = data["skipped_lines"]
+        rollup.newest_bucket = data["newest_bucket"]
+        rollup.top_actors = HeavyHitters.from_dict(data["top_actors"])
+        for saved in data["buckets"]:
+            bucket = _Bucket(rollup.sketch_capacity)
+            bucket.totals = Counter({tuple(row[:3]): row[3] for row in saved["totals"]})
+            bucket.actors = HeavyHitters.from_dict(saved["actors"])
+            bucket.ips = HeavyHitters.from_dict(saved["ips"])
+            bucket.failed_ips = HeavyHitters.from_dict(saved["failed_ips"])
+            rollup.buckets[saved["start"]] = bucket
+        return rollup
+
+
+class ActivityLogReader:
+    """
+    Feeds activity log files into an ActivityRollup, remembering how far each file was read.
+
+    Only complete lines are consumed, so a line still being written is picked up on
+    the next pass. A file that shrank or was replaced (different inode, e.g. after
+    log rotation) is read again from the start.
+
+    Args:
+        paths: Activity log files.
+        checkpoint_path: Where offsets and rollups are saved; loaded if it exists.
+        checkpoint_interval: Minimum seconds between checkpoints while reading.
+        rollup_options: ActivityRollup arguments, used when there is no checkpoint.
+    """
+
+    def __init__(self, paths, checkpoint_path=None, checkpoint_interval=5.0, **rollup_options):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.offsets = {}  # path -> {"inode": int, "offset": int}
+        self.rollup = None
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as checkpoint_file:
+                saved = json.load(checkpoint_file)
+            self.offsets = saved["offsets"]
+            self.rollup = ActivityRollup.from_dict(saved["rollup"])
+        if self.rollup is None:
+            self.rollup = ActivityRollup(**rollup_options)
+        self._last_checkpoint = time.monotonic()
+
+    def checkpoint(self):
+        """Atomically writes offsets and rollups to checkpoint_path."""
+        if not self.checkpoint_path:
+            return
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "w") as checkpoint_file:
+            json.dump({"offsets": self.offsets, "rollup": self.rollup.to_dict()}, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+        self._last_checkpoint = time.monotonic()
+
+    def read_available(self):
+        """Reads every complete line currently in the files. Returns the number of lines read."""
+        lines = 0
+        for path in self.paths:
+            lines += self._read_file(path)
+        self.checkpoint()
+        return lines
+
+    def follow(self, poll_interval=1.0):
+        """Keeps reading as the files grow, until interrupted."""
+        try:
+            while True:
+                if not self.read_available():
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.checkpoint()
+
+    def _read_file(self, path):
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return 0
+        with file:
+            inode = os.fstat(file.fileno()).st_ino
+            position = self.offsets.get(path)
+            offset = 0
+            if position and position["inode"] == inode and position["offset"] <= os.fstat(file.fileno()).st_size:
+                offset = position["offset"]
+            file.seek(offset)
+
+            add = self.rollup.add
+            decode = json.JSONDecoder().raw_decode
+            lines = 0
+            pending = b""
+            while True:
+                block = file.read(READ_BLOCK_SIZE)
+                if not block:
+                    break
+                block = pending + block
+                end = block.rfind(b"\n")
+                if end == -1:
+                    pending = block
+                    continue
+                pending = block[end + 1:]
+                block_lines = block[:end].decode("utf-8", "replace").split("\n")
+                for line in block_lines:
+                    # Cheap substring test first: most non-activity lines never get decoded
+                    if ACTIVITY_MARKER not in line:
+                        if line.strip():
+                            self.rollup.skipped_lines += 1
+                        continue
+                    try:
+                        add(decode(line)[0])
+                    except (ValueError, AttributeError, TypeError):
+                        self.rollup.skipped_lines += 1
+                lines += len(block_lines)
+                offset += end + 1
+                self.offsets[path] = {"inode": inode, "offset": offset}
+                if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                    self.checkpoint()
+            self.offsets[path] = {"inode": inode, "offset": offset}
+            return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming rollups over user activity logs")
+    parser.add_argument("paths", nargs="+", help="activity log files (JSON lines)")
+    parser.add_argument("--checkpoint", default=None, help="offsets + rollup state file, resumed if present")
+    parser.add_argument("--follow", action="store_true", help="keep tailing the files")
+    parser.add_argument("--bucket-seconds", type=int, default=300)
+    parser.add_argument("--retention-buckets", type=int, default=288)
+    parser.add_argument("--sketch-capacity", type=int, default=200)
+    parser.add_argument("--report", action="store_true", help="print rollups after reading")
+    parser.add_argument("--since-minutes", type=float, default=60, help="report window, back from the newest event")
+    parser.add_argument("--verb", default=None)
+    parser.add_argument("--status", default=None)
+    args = parser.parse_args()
+
+    reader = ActivityLogReader(args.paths, args.checkpoint, bucket_seconds=args.bucket_seconds,
+                               retention_buckets=args.retention_buckets, sketch_capacity=args.sketch_capacity)
+    if args.follow:
+        reader.follow()
+    else:
+        reader.read_available()
+
+    rollup = reader.rollup
+    print(f"events: {rollup.events}, skipped lines: {rollup.skipped_lines}, late events: {rollup.late_events}")
+    if args.report and rollup.newest_bucket is not None:
+        since = rollup.newest_bucket + rollup.bucket_seconds - args.since_minutes * 60
+        print(json.dumps({
+            "counts": rollup.counts(since=since, verb=args.verb, status=args.status),
+            "top_ips": rollup.top_ips(since=since, verb=args.verb, status=args.status),
+            "top_actors": rollup.top_actors_in(since=since),
+            "top_actors_all_time": rollup.top_actors.top(),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,173 +1,798 @@
-from flask import Flask, jsonify, request
+import base64
+import binascii
+import json
+import math
+import os
+from itertools import islice
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.routing import IntegerConverter
+
+from cdn_url_helper import add_static_cache_headers
+from chunked_upload import UploadError, UploadStore
+from content_server import serve_file
+from health_aggregator import LIVENESS, READINESS, HealthAggregator
+from health_check_utils import check_cache_status, check_database_status
+from quiz_analytics import QuizStats
+from quiz_grading import CompiledQuizCache
+from response_cache import VersionedResponseCache
+from search_index import KINDS as SEARCH_KINDS, SearchIndex
+from storage import create_storage
 
 app = Flask(__name__)
 
-# In-memory storage
-db = {
-    "courses": {},
-    "lessons": {},
-    "quizzes": {},
-    "assignments": {},
-    "content_uploads": {"videos": [], "documents": []}
-}
-lesson_id_counter = 1
-quiz_id_counter = 1
-assignment_id_counter = 1
+MAX_ID = 2**63 - 1  # the largest id SQLite's INTEGER column can hold
+
+def _decimal_at_most(bound):
+    """A regex matching the decimal numbers 1..`bound`, without leading zeros."""
+    digits = str(bound)
+    alternatives = [rf"[1-9]\d{{0,{len(digits) - 2}}}"]  # fewer digits than `bound`
+    for i, digit in enumerate(map(int, digits)):
+        lowest = 1 if i == 0 else 0
+        if digit > lowest:
+            # Same digits as `bound` up to i, then a smaller digit, then anything
+            alternatives.append(rf"{digits[:i]}[{lowest}-{digit - 1}]\d{{{len(digits) - i - 1}}}")
+    alternatives.append(digits)
+    return "(?:" + "|".join(alternatives) + ")"
+
+class IdConverter(IntegerConverter):
+    """
+    `<id:name>` in a route: an entity id, 1..MAX_ID. Anything else is a 404 on every
+    backend. The range is in the regex rather than a min/max check, because werkzeug
+    matches methods before converting and would answer a 405 on multi-method paths.
+    """
+    regex = _decimal_at_most(MAX_ID)
+
+app.url_map.converters['id'] = IdConverter
+# Fingerprinted static files (see cdn_url_helper.py) are served as immutable
+add_static_cache_headers(app)
+
+# Storage backend: the in-memory dict by default, or a shared SQLite database when
+# STORAGE_BACKEND=sqlite (see storage.py).
+storage = create_storage()
+
+# Uploaded files (and resumable upload sessions in progress) live on local disk
+upload_store = UploadStore(os.environ.get("CONTENT_STORAGE_DIR", "content_store"))
+
+# Serialized bodies of GET /api/quizzes/<id> and GET /api/lessons/<id>/content,
+# keyed by the storage versions they were built from.
+response_cache = VersionedResponseCache(max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
+
+# Full-text index of lessons, quizzes and assignments (search_index.py). It is built
+# from storage at startup, then kept current by the create/update/delete handlers.
+search_index = SearchIndex()
+for _kind in SEARCH_KINDS:
+    search_index.add_many(_kind, storage.iter_entities(_kind))
+
+def _indexed(kind, entities):
+    """Adds newly created (or re-indexes updated) entities in the search index and returns them."""
+    search_index.add_many(kind, entities)
+    return entities
+
+def _cached_json_response(key, build):
+    """
+    Serves a JSON GET response from `response_cache`, with a strong ETag.
+
+    Args:
+        key: Cache key that includes the versions of everything the body depends on,
+             or None if the entity doesn't exist (the response is then never cached).
+        build: Callable returning (payload, status_code). Only 200 responses are cached.
+
+    Returns a 304 if the request's If-None-Match matches the body's ETag.
+    """
+    entry = response_cache.get(key) if key is not None else None
+    if entry is None:
+        payload, status_code = build()
+        if status_code != 200 or key is None:
+            return jsonify(payload), status_code
+        entry = response_cache.put(key, jsonify(payload).get_data())
+
+    body, etag = entry
+    response = Response(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate; unchanged entities answer 304
+    response.cache_control.no_cache = True
+    response.make_conditional(request)
+    if response.status_code == 304:
+        response_cache.record_not_modified()
+    return response
+
+# --- Validation ---
+# Each validator returns an error string for an invalid item, or None.
+MAX_BATCH_SIZE = 1000
+
+ANSWER_TYPES = {str, int, float, bool, type(None)}
+def _is_id(value):
+    # The same range IdConverter accepts in URLs
+    return type(value) is int and 1 <= value <= MAX_ID
+
+def _is_string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+# Types are checked here rather than left to the storage, so both backends accept and
+# reject the same bodies: the memory backend would store a null title or a string
+# course_id that SQLite cannot.
+def _validate_lesson(lesson_data):
+    if not isinstance(lesson_data, dict) or 'title' not in lesson_data:
+        return "Missing title"
+    if not isinstance(lesson_data['title'], str):
+        return "title must be a string"
+    if not _is_string_list(lesson_data.get('content_ids', [])):
+        return "content_ids must be a list of strings"
+    return None
+
+def _validate_lesson_link(data):
+    if data.get('lesson_id') is not None and not _is_id(data['lesson_id']):
+        return "lesson_id must be a positive integer or null"
+    return None
+
+def _validate_questions(questions):
+    # The grader (quiz_grading.py) and the analytics labels rely on this shape
+    if not isinstance(questions, list):
+        return "questions must be a list"
+    for index, question in enumerate(questions):
+        if not isinstance(question, dict):
+            return f"Question {index} must be an object"
+        if 'q' in question and not isinstance(question['q'], str):
+            return f"Question {index}: q must be a string"
+        if 'a' in question and type(question['a']) not in ANSWER_TYPES - {type(None)}:
+            return f"Question {index}: a must be a string, a number or a boolean"
+        points = question.get('points', 1)
+        if type(points) not in (int, float) or not math.isfinite(points) or points < 0:
+            return f"Question {index}: points must be a non-negative number"
+    return None
+
+def _validate_quiz(quiz_data):
+    if not isinstance(quiz_data, dict) or 'title' not in quiz_data or 'questions' not in quiz_data:
+        return "Missing title or questions"
+    if not isinstance(quiz_data['title'], str):
+        return "title must be a string"
+    return _validate_questions(quiz_data['questions']) or _validate_lesson_link(quiz_data)
+
+def _validate_assignment(assignment_data):
+    if not isinstance(assignment_data, dict) or 'title' not in assignment_data or 'description' not in assignment_data:
+        return "Missing title or description"
+    if not isinstance(assignment_data['title'], str) or not isinstance(assignment_data['description'], str):
+        return "title and description must be strings"
+    return _validate_lesson_link(assignment_data)
+
+def _validate_lesson_changes(changes):
+    if not isinstance(changes, dict):
+        return "Request body must be a JSON object"
+    if "title" in changes and not isinstance(changes["title"], str):
+        return "title must be a string"
+    if "content_ids" in changes and not _is_string_list(changes["content_ids"]):
+        return "content_ids must be a list of strings"
+    if "course_id" in changes and not _is_id(changes["course_id"]):
+        return "course_id must be a positive integer"
+    return None
+
+def _validate_submission(submission_data, num_questions):
+    if not isinstance(submission_data, dict) or 'student_id' not in submission_data or 'answers' not in submission_data:
+        return "Missing student_id or answers"
+    if not isinstance(submission_data['student_id'], (str, int)) or isinstance(submission_data['student_id'], bool):
+        return "student_id must be a string or an integer"
+    answers = submission_data['answers']
+    if not isinstance(answers, list) or len(answers) > num_questions:
+        return f"answers must be a list of at most {num_questions} answers"
+    # One set of types per submission instead of an isinstance call per answer
+    if not set(map(type, answers)) <= ANSWER_TYPES:
+        return "Each answer must be a string, a number, a boolean or null"
+    return None
+
+def _batch_errors(errors, status, message):
+    """A `status` response listing `errors` (one error string or None per item) under `results`."""
+    results = [
+        {"index": index, "status": status, "error": error} if error else {"index": index, "status": "valid"}
+        for index, error in enumerate(errors)
+    ]
+    return jsonify({"error": message, "results": results}), status
+
+def _validated_batch(validate, max_size, action):
+    """
+    Reads a batch request body and validates every item in one pass.
+
+    Returns:
+        tuple: (items, None) if the batch is valid, else (None, a 400 response).
+    """
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({"error": "Request body must be a non-empty JSON array"}), 400)
+    if len(items) > max_size:
+        return None, (jsonify({"error": f"Batch too large (max {max_size} items)"}), 400)
+
+    errors = [validate(item) for item in items]
+    if any(errors):
+        return None, _batch_errors(errors, 400, f"Batch validation failed, nothing was {action}")
+    return items, None
+
+def _create_batch(validate, to_args, create_many, result_key, max_size=MAX_BATCH_SIZE):
+    """
+    Shared handler for the batch create endpoints.
+
+    The request body is a JSON array. Every item is validated in one pass; if any
+    item is invalid nothing is created and a 400 lists the per-item errors. Otherwise
+    the whole batch is created atomically by `create_many` (one id block, one
+    transaction) and a 201 lists the created entity for each item.
+    """
+    items, error_response = _validated_batch(validate, max_size, "created")
+    if error_response:
+        return error_response
+
+    created = create_many([to_args(item) for item in items])
+    results = [{"index": index, "status": 201, result_key: entity} for index, entity in enumerate(created)]
+    return jsonify({"created": len(created), "results": results}), 201
 
 @app.route('/')
 def hello_world():
     return 'Hello, World!'
 
 # --- Content Upload Endpoints ---
+CONTENT_URL_PREFIXES = {"video": "/api/content/videos", "document": "/api/content/documents"}
+
+def _resolve_content(content_ids, registry=None):
+    """Resolves a lesson's content ids against the registry (fetched in a single pass unless given)."""
+    if registry is None:
+        registry = storage.get_contents(content_ids)
+    content_details = []
+    for content_id in content_ids:
+        # Lessons stored before content_ids were validated may hold unhashable ids
+        entry = registry.get(content_id) if isinstance(content_id, str) else None
+        if entry is None:
+            content_details.append({"id": content_id, "type": "unknown", "message": "Content not found in uploads"})
+        else:
+            content_details.append(entry)
+    return content_details
+
+def _content_url(content_type, filename):
+    return f"{CONTENT_URL_PREFIXES[content_type]}/{filename}"
+
+def _register_upload(content_type, upload_data, saved=None):
+    """
+    Registers an upload; a duplicate of existing content answers 200 with the existing entry.
+
+    `saved` is a staged upload from `upload_store`. It is published only if its content
+    is new, so a duplicate never overwrites the file stored under its name.
+    """
+    entry, duplicate = storage.register_content(content_type, upload_data, _content_url(content_type, upload_data['filename']))
+    if duplicate:
+        if saved:
+            upload_store.discard(saved)  # same bytes are already stored
+        return jsonify({"message": "Duplicate upload, existing content returned", "filename": entry["filename"], "content": entry}), 200
+    if saved:
+        upload_store.publish(saved)
+    message = f"{content_type.capitalize()} uploaded successfully" + ("" if saved else " (simulated)")
+    return jsonify({"message": message, "filename": entry["filename"], "content": entry}), 201
+
+def _handle_upload(content_type):
+    if request.is_json:
+        # Metadata-only upload: just records the filename (and optional size/checksum)
+        upload_data = request.json
+        if not isinstance(upload_data, dict) or 'filename' not in upload_data:
+            return jsonify({"error": "Missing filename in request body"}), 400
+        if not isinstance(upload_data['filename'], str) or not upload_data['filename']:
+            return jsonify({"error": "filename must be a non-empty string"}), 400
+        return _register_upload(content_type, upload_data)
+
+    # Raw body upload: streamed to disk in fixed-size chunks, hashed as it is written
+    filename = request.args.get('filename') or request.headers.get('X-Filename')
+    if not filename:
+        return jsonify({"error": "Missing filename (use ?filename= or the X-Filename header)"}), 400
+    saved = upload_store.save_stream(content_type, filename, request.stream, request.content_length)
+    upload_data = {"filename": saved["filename"], "size": saved["size"], "checksum": saved["checksum"]}
+    return _register_upload(content_type, upload_data, saved)
+
 @app.route('/api/content/upload-video', methods=['POST'])
 def upload_video():
-    # For now, we'll just simulate a successful upload
-    # In a real app, you'd handle file saving, metadata, etc.
-    video_data = request.json
-    if not video_data or 'filename' not in video_data:
-        return jsonify({"error": "Missing filename in request body"}), 400
-
-    db["content_uploads"]["videos"].append(video_data['filename'])
-    return jsonify({"message": "Video uploaded successfully (simulated)", "filename": video_data['filename']}), 201
+    return _handle_upload("video")
 
 @app.route('/api/content/upload-document', methods=['POST'])
 def upload_document():
-    # Similar simulation for document upload
-    doc_data = request.json
-    if not doc_data or 'filename' not in doc_data:
-        return jsonify({"error": "Missing filename in request body"}), 400
+    return _handle_upload("document")
+
+# --- Content Download Endpoints ---
+# Used when content isn't served by the CDN. If nginx fronts the app, set
+# CONTENT_X_ACCEL_PREFIX to an `internal` location aliased to CONTENT_STORAGE_DIR and
+# nginx will send the files itself.
+CONTENT_X_ACCEL_PREFIX = os.environ.get("CONTENT_X_ACCEL_PREFIX")
+
+def _serve_content(content_type, filename):
+    if filename != UploadStore.clean_filename(filename):
+        return jsonify({"error": "Content not found"}), 404
+    path = upload_store.content_path(content_type, filename)
+    if not os.path.isfile(path):
+        return jsonify({"error": "Content not found"}), 404
+    x_accel_path = f"{CONTENT_X_ACCEL_PREFIX.rstrip('/')}/{content_type}s/{filename}" if CONTENT_X_ACCEL_PREFIX else None
+    # Videos only need single ranges (seeking); documents may ask for several at once
+    return serve_file(request, path, allow_multi_range=content_type == "document", x_accel_path=x_accel_path)
+
+@app.route('/api/content/videos/<filename>', methods=['GET'])
+def download_video(filename):
+    return _serve_content("video", filename)
+
+@app.route('/api/content/documents/<filename>', methods=['GET'])
+def download_document(filename):
+    return _serve_content("document", filename)
+
+# --- Resumable Upload Endpoints ---
+@app.errorhandler(UploadError)
+def handle_upload_error(error):
+    return jsonify({"error": error.message, **error.details}), error.status_code
+
+@app.route('/api/content/uploads', methods=['POST'])
+def create_upload_session():
+    session_data = request.json
+    if not isinstance(session_data, dict) or 'filename' not in session_data or 'type' not in session_data:
+        return jsonify({"error": "Missing filename or type in request body"}), 400
+    session = upload_store.create_session(session_data['type'], session_data['filename'], session_data.get('size'))
+    return jsonify(session), 201, {"Location": f"/api/content/uploads/{session['id']}"}
 
-    db["content_uploads"]["documents"].append(doc_data['filename'])
-    return jsonify({"message": "Document uploaded successfully (simulated)", "filename": doc_data['filename']}), 201
+@app.route('/api/content/uploads/<session_id>', methods=['GET'])
+def get_upload_session(session_id):
+    # Clients resume an interrupted upload from the returned offset
+    return jsonify(upload_store.get_session(session_id)), 200
+
+@app.route('/api/content/uploads/<session_id>', methods=['PUT'])
+def upload_chunk(session_id):
+    offset = request.headers.get('Upload-Offset', request.args.get('offset'))
+    if offset is None or not offset.isdigit():
+        return jsonify({"error": "Missing or invalid Upload-Offset header"}), 400
+    session = upload_store.append_chunk(
+        session_id, int(offset), request.stream, request.content_length, request.headers.get('Chunk-Checksum'))
+    return jsonify(session), 200
+
+@app.route('/api/content/uploads/<session_id>/complete', methods=['POST'])
+def complete_upload_session(session_id):
+    completion_data = request.get_json(silent=True) or {}
+    saved = upload_store.complete_session(session_id, completion_data.get('checksum'))
+    upload_data = {"filename": saved["filename"], "size": saved["size"], "checksum": saved["checksum"]}
+    return _register_upload(saved["type"], upload_data, saved)
+
+@app.route('/api/content/uploads/<session_id>', methods=['DELETE'])
+def abort_upload_session(session_id):
+    upload_store.abort_session(session_id)
+    return jsonify({"message": "Upload session aborted"}), 200
 
 # --- Course and Lesson Endpoints ---
-@app.route('/api/courses/<int:course_id>/lessons', methods=['GET'])
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def _encode_cursor(lesson_id):
+    # Opaque to clients: they should only ever pass back what we handed out
+    return base64.urlsafe_b64encode(f"lesson:{lesson_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor):
+    """Returns the lesson id encoded in `cursor`, or None if it is malformed or out of range."""
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, lesson_id = decoded.split(":", 1)
+        lesson_id = int(lesson_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    # Checked here, before a streaming response starts: an id SQLite can't bind would
+    # otherwise fail inside the generator and truncate a 200 body
+    if prefix != "lesson" or not 0 <= lesson_id <= MAX_ID:
+        return None
+    return lesson_id
+
+STREAM_CHUNK_LESSONS = 256
+
+def _stream_lessons(lessons):
+    """Writes a JSON array incrementally, encoding STREAM_CHUNK_LESSONS lessons per chunk."""
+    # One reusable encoder with jsonify's settings instead of building one per chunk
+    encode = json.JSONEncoder(
+        sort_keys=app.json.sort_keys,
+        ensure_ascii=app.json.ensure_ascii,
+        separators=(",", ":"),
+        default=app.json.default,
+    ).encode
+    yield "["
+    separator = ""
+    lessons = iter(lessons)
+    while True:
+        chunk = list(islice(lessons, STREAM_CHUNK_LESSONS))
+        if not chunk:
+            break
+        # Encoding a list gives "[a,b,...]"; strip the brackets to splice it in
+        yield separator + encode(chunk)[1:-1]
+        separator = ","
+    yield "]"
+
+@app.route('/api/courses/<id:course_id>/lessons', methods=['GET'])
 def get_course_lessons(course_id):
-    # For simplicity, we're not strictly checking if course_id exists in db["courses"]
+    # For simplicity, we're not strictly checking if the course exists
     # In a real app, you'd validate this and potentially create courses separately.
-    course_lessons = [lesson for lesson in db["lessons"].values() if lesson.get("course_id") == course_id]
-    return jsonify(course_lessons), 200
+    after_id = None
+    if 'after' in request.args:
+        after_id = _decode_cursor(request.args['after'])
+        if after_id is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    if request.args.get('stream') in ('1', 'true'):
+        # Streams every lesson (after the cursor, if any) without materializing the
+        # list, so memory and time to first byte don't grow with course size.
+        lessons = storage.iter_course_lessons(course_id, after_id)
+        return Response(_stream_lessons(lessons), status=200, mimetype='application/json')
+
+    if 'limit' not in request.args and after_id is None:
+        return jsonify(storage.list_course_lessons(course_id)), 200
 
-@app.route('/api/courses/<int:course_id>/lessons', methods=['POST'])
+    limit = request.args.get('limit', str(DEFAULT_PAGE_SIZE))
+    limit = int(limit) if limit.isdigit() else 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_PAGE_SIZE}"}), 400
+    lessons, has_more = storage.list_course_lessons_page(course_id, after_id, limit)
+    next_cursor = _encode_cursor(lessons[-1]["id"]) if has_more else None
+    return jsonify({"lessons": lessons, "next_cursor": next_cursor}), 200
+
+@app.route('/api/courses/<id:course_id>/lessons', methods=['POST'])
 def create_course_lesson(course_id):
-    global lesson_id_counter
     lesson_data = request.json
-    if not lesson_data or 'title' not in lesson_data:
-        return jsonify({"error": "Missing title in request body"}), 400
-
-    new_lesson_id = lesson_id_counter
-    lesson_id_counter += 1
-
-    new_lesson = {
-        "id": new_lesson_id,
-        "course_id": course_id,
-        "title": lesson_data['title'],
-        "content_ids": lesson_data.get("content_ids", []) # e.g., IDs of uploaded videos/docs
-    }
-    db["lessons"][new_lesson_id] = new_lesson
-    # Simulate adding the course if it doesn't exist for simplicity
-    if course_id not in db["courses"]:
-        db["courses"][course_id] = {"id": course_id, "name": f"Course {course_id}", "lesson_ids": []}
-    db["courses"][course_id]["lesson_ids"].append(new_lesson_id)
+    error = _validate_lesson(lesson_data)
+    if error:
+        return jsonify({"error": f"{error} in request body"}), 400
 
+    # content_ids are e.g. IDs of uploaded videos/docs
+    new_lesson = storage.create_lesson(course_id, lesson_data['title'], lesson_data.get("content_ids", []))
+    search_index.add("lesson", new_lesson)
     return jsonify(new_lesson), 201
 
-@app.route('/api/lessons/<int:lesson_id>', methods=['PUT'])
-def update_lesson(lesson_id):
-    if lesson_id not in db["lessons"]:
-        return jsonify({"error": "Lesson not found"}), 404
+@app.route('/api/courses/<id:course_id>/lessons/batch', methods=['POST'])
+def create_course_lessons_batch(course_id):
+    return _create_batch(
+        _validate_lesson,
+        lambda item: (item['title'], item.get("content_ids", [])),
+        lambda items: _indexed("lesson", storage.create_lessons(course_id, items)),
+        "lesson",
+    )
 
+@app.route('/api/lessons/<id:lesson_id>', methods=['PUT'])
+def update_lesson(lesson_id):
     lesson_data = request.json
     if not lesson_data:
+        if storage.get_lesson(lesson_id) is None:
+            return jsonify({"error": "Lesson not found"}), 404
         return jsonify({"error": "Request body cannot be empty"}), 400
 
-    updated_lesson = db["lessons"][lesson_id]
-    if 'title' in lesson_data:
-        updated_lesson['title'] = lesson_data['title']
-    if 'content_ids' in lesson_data:
-        updated_lesson['content_ids'] = lesson_data['content_ids']
+    error = _validate_lesson_changes(lesson_data)
+    if error:
+        return jsonify({"error": error}), 400
 
-    db["lessons"][lesson_id] = updated_lesson
+    # Only title, content_ids and course_id can be changed
+    updated_lesson = storage.update_lesson(lesson_id, lesson_data)
+    if updated_lesson is None:
+        return jsonify({"error": "Lesson not found"}), 404
+    search_index.add("lesson", updated_lesson)
     return jsonify(updated_lesson), 200
 
-@app.route('/api/lessons/<int:lesson_id>', methods=['DELETE'])
-def delete_lesson(lesson_id):
-    if lesson_id not in db["lessons"]:
-        return jsonify({"error": "Lesson not found"}), 404
+@app.route('/api/lessons/batch', methods=['PUT'])
+def update_lessons_batch():
+    seen_ids = set()
 
-    lesson_course_id = db["lessons"][lesson_id]["course_id"]
-    del db["lessons"][lesson_id]
+    def validate(item):
+        if not isinstance(item, dict) or 'id' not in item:
+            return "Missing id"
+        lesson_id = item['id']
+        if not _is_id(lesson_id):
+            return "id must be a positive integer"
+        if lesson_id in seen_ids:
+            return "Duplicate id"
+        seen_ids.add(lesson_id)
+        changes = {field: value for field, value in item.items() if field != 'id'}
+        if not changes:
+            return "No changes"
+        return _validate_lesson_changes(changes)
 
-    # Remove lesson_id from the course's lesson list
-    if lesson_course_id in db["courses"] and lesson_id in db["courses"][lesson_course_id]["lesson_ids"]:
-        db["courses"][lesson_course_id]["lesson_ids"].remove(lesson_id)
+    items, error_response = _validated_batch(validate, MAX_BATCH_SIZE, "updated")
+    if error_response:
+        return error_response
+
+    updates = [(item['id'], {field: value for field, value in item.items() if field != 'id'}) for item in items]
+    updated = storage.update_lessons(updates)
+    if updated is None:
+        errors = ["Lesson not found" if storage.get_lesson(lesson_id) is None else None for lesson_id, _ in updates]
+        return _batch_errors(errors, 404, "Lessons not found, nothing was updated")
+    _indexed("lesson", updated)
+    results = [{"index": index, "status": 200, "lesson": lesson} for index, lesson in enumerate(updated)]
+    return jsonify({"updated": len(updated), "results": results}), 200
+
+@app.route('/api/lessons/<id:lesson_id>', methods=['DELETE'])
+def delete_lesson(lesson_id):
+    if not storage.delete_lesson(lesson_id):
+        return jsonify({"error": "Lesson not found"}), 404
+    search_index.remove("lesson", lesson_id)
 
     return jsonify({"message": "Lesson deleted successfully"}), 200
 
-@app.route('/api/lessons/<int:lesson_id>/content', methods=['GET'])
+@app.route('/api/lessons/<id:lesson_id>/content', methods=['GET'])
 def get_lesson_content(lesson_id):
-    if lesson_id not in db["lessons"]:
-        return jsonify({"error": "Lesson not found"}), 404
+    def build():
+        lesson = storage.get_lesson(lesson_id)
+        if lesson is None:
+            return {"error": "Lesson not found"}, 404
 
-    lesson = db["lessons"][lesson_id]
-    # This is a placeholder. In a real app, you'd fetch actual content based on content_ids
-    # For example, looking up filenames from db["content_uploads"]
-    content_details = []
-    for content_id in lesson.get("content_ids", []):
-        # This assumes content_ids are filenames for simplicity
-        if content_id in db["content_uploads"]["videos"]:
-            content_details.append({"id": content_id, "type": "video", "url": f"/path/to/video/{content_id}"})
-        elif content_id in db["content_uploads"]["documents"]:
-            content_details.append({"id": content_id, "type": "document", "url": f"/path/to/document/{content_id}"})
-        else:
-            content_details.append({"id": content_id, "type": "unknown", "message": "Content not found in uploads"})
+        # content_ids are the filenames registered by the upload endpoints
+        content_details = _resolve_content(lesson.get("content_ids", []))
+        return {"lesson_id": lesson_id, "content": content_details}, 200
 
-    return jsonify({"lesson_id": lesson_id, "content": content_details}), 200
+    # The body depends on the lesson and on the content registry it resolves against
+    lesson_version = storage.get_version("lesson", lesson_id)
+    key = None
+    if lesson_version is not None:
+        key = ("lesson_content", lesson_id, lesson_version, storage.get_version(*storage.CONTENT_REGISTRY) or 0)
+    return _cached_json_response(key, build)
 
 # --- Quiz and Assignment Endpoints ---
 @app.route('/api/quizzes', methods=['POST'])
 def create_quiz():
-    global quiz_id_counter
     quiz_data = request.json
-    if not quiz_data or 'title' not in quiz_data or 'questions' not in quiz_data:
-        return jsonify({"error": "Missing title or questions in request body"}), 400
-
-    new_quiz_id = quiz_id_counter
-    quiz_id_counter += 1
-
-    new_quiz = {
-        "id": new_quiz_id,
-        "title": quiz_data['title'],
-        "questions": quiz_data['questions'], # Expecting a list of question objects
-        "lesson_id": quiz_data.get("lesson_id") # Optional: link quiz to a lesson
-    }
-    db["quizzes"][new_quiz_id] = new_quiz
+    error = _validate_quiz(quiz_data)
+    if error:
+        return jsonify({"error": f"{error} in request body"}), 400
+
+    # questions is expected to be a list of question objects; lesson_id optionally links the quiz to a lesson
+    new_quiz = storage.create_quiz(quiz_data['title'], quiz_data['questions'], quiz_data.get("lesson_id"))
+    search_index.add("quiz", new_quiz)
     return jsonify(new_quiz), 201
 
-@app.route('/api/quizzes/<int:quiz_id>', methods=['GET'])
+@app.route('/api/quizzes/batch', methods=['POST'])
+def create_quizzes_batch():
+    return _create_batch(
+        _validate_quiz,
+        lambda item: (item['title'], item['questions'], item.get("lesson_id")),
+        lambda items: _indexed("quiz", storage.create_quizzes(items)),
+        "quiz",
+    )
+
+@app.route('/api/quizzes/<id:quiz_id>', methods=['GET'])
 def get_quiz(quiz_id):
-    if quiz_id not in db["quizzes"]:
-        return jsonify({"error": "Quiz not found"}), 404
-    return jsonify(db["quizzes"][quiz_id]), 200
+    def build():
+        quiz = storage.get_quiz(quiz_id)
+        if quiz is None:
+            return {"error": "Quiz not found"}, 404
+        return quiz, 200
+
+    quiz_version = storage.get_version("quiz", quiz_id)
+    return _cached_json_response(("quiz", quiz_id, quiz_version) if quiz_version is not None else None, build)
 
 @app.route('/api/assignments', methods=['POST'])
 def create_assignment():
-    global assignment_id_counter
     assignment_data = request.json
-    if not assignment_data or 'title' not in assignment_data or 'description' not in assignment_data:
-        return jsonify({"error": "Missing title or description in request body"}), 400
-
-    new_assignment_id = assignment_id_counter
-    assignment_id_counter += 1
-
-    new_assignment = {
-        "id": new_assignment_id,
-        "title": assignment_data['title'],
-        "description": assignment_data['description'],
-        "lesson_id": assignment_data.get("lesson_id") # Optional: link assignment to a lesson
-    }
-    db["assignments"][new_assignment_id] = new_assignment
+    error = _validate_assignment(assignment_data)
+    if error:
+        return jsonify({"error": f"{error} in request body"}), 400
+
+    # lesson_id optionally links the assignment to a lesson
+    new_assignment = storage.create_assignment(
+        assignment_data['title'], assignment_data['description'], assignment_data.get("lesson_id"))
+    search_index.add("assignment", new_assignment)
     return jsonify(new_assignment), 201
 
+@app.route('/api/assignments/batch', methods=['POST'])
+def create_assignments_batch():
+    return _create_batch(
+        _validate_assignment,
+        lambda item: (item['title'], item['description'], item.get("lesson_id")),
+        lambda items: _indexed("assignment", storage.create_assignments(items)),
+        "assignment",
+    )
+
+# --- Course Outline ---
+# Everything a course page renders, in one request: a page of lessons, each with its
+# resolved content and the quizzes and assignments linked to it. The page costs one
+# lesson query plus one batched lookup each for content, quizzes and assignments
+# (through the storage's lesson -> quiz/assignment indexes), however many lessons it has.
+OUTLINE_SECTIONS = ("content", "quizzes", "assignments")
+OUTLINE_FIELDS = {
+    "fields": ("id", "course_id", "title", "content_ids"),
+    "quiz_fields": ("id", "title", "questions", "lesson_id"),
+    "assignment_fields": ("id", "title", "description", "lesson_id"),
+}
+
+def _requested_fields(param):
+    """
+    Parses a comma-separated field list (e.g. quiz_fields=title,questions).
+
+    Returns:
+        tuple: (fields, error) where fields is None when the parameter is absent (all
+               fields). "id" is always included.
+    """
+    if param not in request.args:
+        return None, None
+    allowed = OUTLINE_FIELDS[param]
+    fields = [field for field in request.args[param].split(',') if field]
+    if not set(fields) <= set(allowed):
+        return None, f"{param} must be a comma-separated list of {', '.join(allowed)}"
+    return ("id", *(field for field in dict.fromkeys(fields) if field != "id")), None
+
+def _project(entity, fields):
+    return entity if fields is None else {field: entity[field] for field in fields}
+
+@app.route('/api/courses/<id:course_id>/outline', methods=['GET'])
+def get_course_outline(course_id):
+    after_id = None
+    if 'after' in request.args:
+        after_id = _decode_cursor(request.args['after'])
+        if after_id is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+    limit = request.args.get('limit', str(DEFAULT_PAGE_SIZE))
+    limit = int(limit) if limit.isdigit() else 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_PAGE_SIZE}"}), 400
+    include = OUTLINE_SECTIONS
+    if 'include' in request.args:
+        include = [section for section in request.args['include'].split(',') if section]
+        if not set(include) <= set(OUTLINE_SECTIONS):
+            return jsonify({"error": f"include must be a comma-separated list of {', '.join(OUTLINE_SECTIONS)}"}), 400
+    projections = {}
+    for param in OUTLINE_FIELDS:
+        projections[param], error = _requested_fields(param)
+        if error:
+            return jsonify({"error": error}), 400
+
+    lessons, has_more = storage.list_course_lessons_page(course_id, after_id, limit)
+    lesson_ids = [lesson["id"] for lesson in lessons]
+    registry = None
+    if "content" in include:
+        registry = storage.get_contents([content_id for lesson in lessons for content_id in lesson["content_ids"]])
+    quizzes = storage.get_lesson_quizzes(lesson_ids) if "quizzes" in include else None
+    assignments = storage.get_lesson_assignments(lesson_ids) if "assignments" in include else None
+
+    outline = []
+    for lesson in lessons:
+        item = _project(lesson, projections["fields"])
+        if registry is not None:
+            item["content"] = _resolve_content(lesson["content_ids"], registry)
+        if quizzes is not None:
+            item["quizzes"] = [_project(quiz, projections["quiz_fields"]) for quiz in quizzes.get(lesson["id"], [])]
+        if assignments is not None:
+            item["assignments"] = [
+                _project(assignment, projections["assignment_fields"])
+                for assignment in assignments.get(lesson["id"], [])
+            ]
+        outline.append(item)
+    next_cursor = _encode_cursor(lessons[-1]["id"]) if has_more else None
+    return jsonify({"course_id": course_id, "lessons": outline, "next_cursor": next_cursor}), 200
+
+# --- Search ---
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+SEARCH_LOADERS = {"lesson": storage.get_lesson, "quiz": storage.get_quiz, "assignment": storage.get_assignment}
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Missing q query parameter"}), 400
+    kinds = None
+    if request.args.get('type'):
+        kinds = request.args['type'].split(',')
+        if not set(kinds) <= set(SEARCH_KINDS):
+            return jsonify({"error": f"type must be one or more of {', '.join(SEARCH_KINDS)}"}), 400
+    course_id = request.args.get('course_id')
+    if course_id is not None:
+        if not course_id.isdigit():
+            return jsonify({"error": "course_id must be an integer"}), 400
+        course_id = int(course_id)
+    limit = request.args.get('limit', str(DEFAULT_SEARCH_LIMIT))
+    limit = int(limit) if limit.isdigit() else 0
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_SEARCH_LIMIT}"}), 400
+
+    total, hits = search_index.search(query, kinds, course_id, limit)
+    results = []
+    for kind, entity_id, score in hits:
+        entity = SEARCH_LOADERS[kind](entity_id)
+        if entity is not None:  # deleted since the search
+            results.append({"type": kind, "id": entity_id, "score": score, "item": entity})
+    return jsonify({"query": query, "total": total, "results": results}), 200
+
+# --- Quiz Submissions ---
+# Answer keys are compiled once per quiz version and each request's submissions are
+# graded together as array operations (quiz_grading.py). Cohort exams are submitted
+# through the batch endpoint.
+MAX_SUBMISSION_BATCH_SIZE = 10000
+compiled_quizzes = CompiledQuizCache()
+
+def _compiled_quiz(quiz_id):
+    quiz_version = storage.get_version("quiz", quiz_id)
+    if quiz_version is None:
+        return None
+    return compiled_quizzes.get(quiz_id, quiz_version, lambda: storage.get_quiz(quiz_id))
+
+def _grade_submissions(quiz_id, compiled, items):
+    """
+    Grades (student_id, answers) items in one batch and stores the graded submissions,
+    updating the quiz's running analytics with the batch.
+    """
+    graded = compiled.grade([answers for _, answers in items])
+    return storage.create_submissions(quiz_id, [
+        (student_id, answers, score, graded.max_score, correct)
+        for (student_id, answers), score, correct in zip(items, graded.scores.tolist(), graded.correct.tolist())
+    ], stats=QuizStats.from_graded(graded, compiled.num_questions))
+
+@app.route('/api/quizzes/<id:quiz_id>/submissions', methods=['POST'])
+def submit_quiz(quiz_id):
+    compiled = _compiled_quiz(quiz_id)
+    if compiled is None:
+        return jsonify({"error": "Quiz not found"}), 404
+    submission_data = request.get_json(silent=True)
+    error = _validate_submission(submission_data, compiled.num_questions)
+    if error:
+        return jsonify({"error": f"{error} in request body"}), 400
+
+    submission, = _grade_submissions(quiz_id, compiled, [(str(submission_data['student_id']), submission_data['answers'])])
+    return jsonify(submission), 201
+
+@app.route('/api/quizzes/<id:quiz_id>/submissions/batch', methods=['POST'])
+def submit_quiz_batch(quiz_id):
+    compiled = _compiled_quiz(quiz_id)
+    if compiled is None:
+        return jsonify({"error": "Quiz not found"}), 404
+    return _create_batch(
+        lambda item: _validate_submission(item, compiled.num_questions),
+        lambda item: (str(item['student_id']), item['answers']),
+        lambda items: _grade_submissions(quiz_id, compiled, items),
+        "submission",
+        max_size=MAX_SUBMISSION_BATCH_SIZE,
+    )
+
+@app.route('/api/quizzes/<id:quiz_id>/analytics', methods=['GET'])
+def get_quiz_analytics(quiz_id):
+    # Computed from running sums: O(questions), however many submissions there are
+    quiz = storage.get_quiz(quiz_id)
+    if quiz is None:
+        return jsonify({"error": "Quiz not found"}), 404
+    stats = storage.get_quiz_stats(quiz_id)
+    if stats is None:
+        compiled = _compiled_quiz(quiz_id)
+        stats = QuizStats(compiled.num_questions, compiled.max_score)
+    return jsonify({"quiz_id": quiz_id, **stats.report(quiz["questions"])}), 200
+
+@app.route('/api/submissions/<id:submission_id>', methods=['GET'])
+def get_submission(submission_id):
+    submission = storage.get_submission(submission_id)
+    if submission is None:
+        return jsonify({"error": "Submission not found"}), 404
+    return jsonify(submission), 200
+
+# --- Operational Endpoints ---
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(response_cache.stats()), 200
+
+# --- Health ---
+# Probes read cached results kept warm by a background refresher (health_aggregator.py),
+# so load balancer traffic never reaches storage directly.
+HEALTH_CHECK_TIMEOUT = float(os.environ.get("HEALTH_CHECK_TIMEOUT", 1.0))
+HEALTH_CHECK_TTL = float(os.environ.get("HEALTH_CHECK_TTL", 10.0))
+health = HealthAggregator(refresh_interval=float(os.environ.get("HEALTH_REFRESH_INTERVAL", 5.0)))
+
+def _ping_storage():
+    storage.get_version(*storage.CONTENT_REGISTRY)
+    return True, f"{type(storage).__name__} reachable."
+
+def _ping_response_cache():
+    return True, f"Response cache holding {response_cache.stats()['entries']} entries."
+
+health.register("database", lambda: check_database_status(_ping_storage),
+                timeout=HEALTH_CHECK_TIMEOUT, ttl=HEALTH_CHECK_TTL, views=(READINESS,))
+health.register("cache", lambda: check_cache_status(_ping_response_cache),
+                timeout=HEALTH_CHECK_TIMEOUT, ttl=HEALTH_CHECK_TTL, views=(READINESS,))
+
+def _health_response(view):
+    # Started on first use rather than at import, so each forked worker gets its own threads
+    health.start()
+    report = health.status(view)
+    return jsonify(report), 200 if report["status"] == "ok" else 503
+
+@app.route('/health/live', methods=['GET'])
+def liveness():
+    return _health_response(LIVENESS)
+
+@app.route('/health/ready', methods=['GET'])
+def readiness():
+    return _health_response(READINESS)
+
 if __name__ == '__main__':
     app.run(debug=True)
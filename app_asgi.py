@@ -0,0 +1,18 @@
+# app_asgi.py
+# The course API from app.py, served by an ASGI server instead of a WSGI one:
+#
+#     uvicorn app_asgi:app --host 0.0.0.0 --port 8000
+#
+# Routes, storage and responses are the ones in app.py. asgi_bridge.py receives and
+# sends bodies on the event loop, and runs the views on ASGI_EXECUTOR_THREADS
+# threads, so slow clients and long uploads don't tie up a thread each.
+import os
+
+from app import app as flask_app
+from asgi_bridge import ASGIBridge
+
+app = ASGIBridge(
+    flask_app,
+    max_workers=int(os.environ.get("ASGI_EXECUTOR_THREADS", 32)),
+    spool_memory_limit=int(os.environ.get("ASGI_SPOOL_MEMORY_LIMIT", 1024 * 1024)),
+)
@@ -1,5 +1,6 @@
 # app_with_otel.py
 from flask import Flask
+import os
 import time
 import random
 
@@ -7,11 +8,13 @@ import random
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter # Simple console exporter for demo
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter # Simple console exporter for demo
 # For OTLP (e.g., to Jaeger, Lightstep, Honeycomb, Grafana Tempo etc.)
 # from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.flask import FlaskInstrumentor
 
+from otel_sampling import TailKeepSpanProcessor, build_sampler, parse_route_ratios, tuned_batch_processor
+
 # --- Setup OpenTelemetry ---
 # Define a resource for your service (optional but good practice)
 resource = Resource(attributes={
@@ -19,8 +22,22 @@ resource = Resource(attributes={
     "service.version": "0.1.0"
 })
 
+# --- Sampling (see otel_sampling.py) ---
+# Head sampling: OTEL_SAMPLE_RATIO of new traces, overridden per route template by
+# OTEL_ROUTE_SAMPLE_RATIOS (e.g. "/=0.01,/user/<user_id>=0.5"). Callers' sampling
+# decisions are honored (parent-based).
+OTEL_SAMPLE_RATIO = float(os.environ.get('OTEL_SAMPLE_RATIO', 0.1))
+OTEL_ROUTE_SAMPLE_RATIOS = parse_route_ratios(os.environ.get('OTEL_ROUTE_SAMPLE_RATIOS', ''))
+# At most this many new sampled traces per second per process (0: no limit)
+OTEL_MAX_TRACES_PER_SECOND = float(os.environ.get('OTEL_MAX_TRACES_PER_SECOND', 100))
+# Tail keep: unsampled traces that error or take longer than OTEL_SLOW_TRACE_MS are exported anyway
+OTEL_TAIL_KEEP = os.environ.get('OTEL_TAIL_KEEP', '1') == '1'
+OTEL_SLOW_TRACE_MS = float(os.environ.get('OTEL_SLOW_TRACE_MS', 500))
+
+sampler = build_sampler(OTEL_SAMPLE_RATIO, OTEL_ROUTE_SAMPLE_RATIOS, OTEL_MAX_TRACES_PER_SECOND, OTEL_TAIL_KEEP)
+
 # Set trace provider with the resource
-trace_provider = TracerProvider(resource=resource)
+trace_provider = TracerProvider(resource=resource, sampler=sampler)
 trace.set_tracer_provider(trace_provider)
 tracer = trace.get_tracer(__name__) # Get a tracer for the current module
 
@@ -36,8 +53,11 @@ span_exporter = ConsoleSpanExporter()
 # otlp_exporter = OTLPSpanExporter(endpoint=OTLP_ENDPOINT)
 
 # Use BatchSpanProcessor for production for better performance.
-# It batches spans before sending them to the exporter.
-span_processor = BatchSpanProcessor(span_exporter) # Use otlp_exporter for OTLP
+# It batches spans before sending them to the exporter (queue and batch sizes are
+# tuned in otel_sampling.tuned_batch_processor; OTEL_BSP_* variables override them).
+span_processor = tuned_batch_processor(span_exporter) # Use otlp_exporter for OTLP
+if OTEL_TAIL_KEEP:
+    span_processor = TailKeepSpanProcessor(span_processor, slow_threshold=OTEL_SLOW_TRACE_MS / 1000)
 trace_provider.add_span_processor(span_processor)
 # --- End OpenTelemetry Setup ---
 
@@ -46,7 +66,7 @@ app = Flask(__name__)
 # --- Auto-instrument Flask ---
 # This will automatically create spans for incoming Flask requests and can instrument
 # common libraries like `requests` if they are also instrumented.
-FlaskInstrumentor().instrument_app(app)
+FlaskInstrumentor().instrument_app(app, tracer_provider=trace_provider)
 # --- End Auto-instrumentation ---
 
 # Example of a function that might be called within a request, with custom span
@@ -117,6 +137,6 @@ if __name__ == '__main__':
 
     print("Flask app with OpenTelemetry (Console Exporter) running on http://localhost:5001")
     print("Access endpoints like / or /user/test to generate traces.")
-    print("Traces will be printed to the console.")
+    print("Traces will be printed to the console (sampled: OTEL_SAMPLE_RATIO=%s, plus slow/failed requests)."
+          % OTEL_SAMPLE_RATIO)
     app.run(host='0.0.0.0', port=5001, debug=False) # debug=False for cleaner OTel output sometimes
-```
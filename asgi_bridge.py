@@ -0,0 +1,283 @@
+# asgi_bridge.py
+# Runs a WSGI app (the Flask course API) as an ASGI application, so an asyncio server
+# such as uvicorn can serve it (see app_asgi.py).
+#
+# Under a threaded WSGI server, a connection holds a worker thread for as long as
+# its client takes to send the request body and read the response. Here the network
+# side runs on the event loop, and threads are used only while Python code runs:
+#   - The request body is received asynchronously and spooled: in memory up to
+#     SPOOL_MEMORY_LIMIT, then to a temporary file. A slow upload costs a coroutine,
+#     not a thread, and the view reads the complete body from the spool, which is
+#     handed to it as wsgi.input.
+#   - The view runs on a thread pool executor, with its blocking storage and
+#     upload-store calls, so they never block the event loop.
+#   - The response is sent asynchronously. Small bodies go out in one message.
+#     Generators (e.g. streamed lesson listings) are advanced on the executor one
+#     chunk at a time. Files handed to wsgi.file_wrapper are read in blocks on the
+#     executor. Every send waits for the client to drain, so a slow download holds no
+#     thread between blocks, and a client that disconnects stops its response at the
+#     next block.
+import asyncio
+import contextvars
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_SOFTWARE = "asgi_bridge"
+SPOOL_MEMORY_LIMIT = 1024 * 1024  # request bytes kept in memory before spooling to disk
+RESPONSE_BUFFER_SIZE = 64 * 1024  # response bytes collected by the view's executor call
+FILE_BLOCK_SIZE = 256 * 1024
+
+
+class FileWrapper:
+    """
+    wsgi.file_wrapper. The bridge sends the file from its current position, stopping
+    after Content-Length bytes (like gunicorn's sendfile path), so it can carry a range.
+    """
+
+    def __init__(self, file, block_size=FILE_BLOCK_SIZE):
+        self.file = file
+        self.block_size = block_size
+
+    def __iter__(self):
+        # Only used if middleware iterates the body itself
+        while True:
+            data = self.file.read(self.block_size)
+            if not data:
+                return
+            yield data
+
+    def close(self):
+        self.file.close()
+
+
+class _SpooledBody:
+    """
+    A request body received from ASGI messages, spooled to a SpooledTemporaryFile that
+    becomes wsgi.input once complete. Chunks are held as received and written in
+    batches of `memory_limit` bytes, so bytes are copied once, into the spool.
+    """
+
+    def __init__(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=memory_limit)
+        self._chunks = []
+        self._chunks_size = 0
+
+    async def receive(self, receive, run):
+        """Reads every http.request message; returns False if the client disconnected first."""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return False
+            chunk = message.get("body", b"")
+            if chunk:
+                self.size += len(chunk)
+                self._chunks.append(chunk)
+                self._chunks_size += len(chunk)
+                if self._chunks_size >= self.memory_limit:
+                    # This write rolls the spool over to disk (or appends to it): keep it off the event loop
+                    await run(self._write_chunks)
+            if not message.get("more_body", False):
+                if self.size > self.memory_limit:
+                    await run(self._write_chunks)
+                else:
+                    self._write_chunks()  # stays in memory
+                return True
+
+    def _write_chunks(self):
+        self.file.writelines(self._chunks)
+        self._chunks = []
+        self._chunks_size = 0
+
+    def stream(self):
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        self.file.close()
+
+
+class ASGIBridge:
+    """
+    ASGI application serving `wsgi_app`.
+
+    Args:
+        wsgi_app: The WSGI application (e.g. a Flask app).
+        max_workers: Executor threads running views, i.e. requests processed at once.
+                     Connections waiting on the network don't use one.
+        spool_memory_limit: Request body bytes kept in memory before spooling to a file.
+    """
+
+    def __init__(self, wsgi_app, max_workers=32, spool_memory_limit=SPOOL_MEMORY_LIMIT):
+        self.wsgi_app = wsgi_app
+        self.spool_memory_limit = spool_memory_limit
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asgi-view")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "websocket":
+            await send({"type": "websocket.close"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        # One context for every step of a request, so the view and its body
+        # generator see the same context variables whichever thread runs them
+        context = contextvars.copy_context()
+
+        def run(function, *args):
+            return loop.run_in_executor(self.executor, context.run, function, *args)
+
+        body = _SpooledBody(self.spool_memory_limit)
+        try:
+            if not await body.receive(receive, run):
+                return
+            # Anything received after the body is the client going away
+            disconnect = asyncio.ensure_future(receive())
+            try:
+                status, headers, chunks, rest = await run(self._call_wsgi, self._environ(scope, body))
+                await send({
+                    "type": "http.response.start",
+                    "status": int(status.split(" ", 1)[0]),
+                    "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+                })
+                if isinstance(rest, FileWrapper):
+                    await self._send_file(rest, headers, send, disconnect, run)
+                elif rest is None:
+                    await send({"type": "http.response.body", "body": b"".join(chunks)})
+                else:
+                    await self._send_iterable(chunks, rest, send, disconnect, run)
+            finally:
+                disconnect.cancel()
+        finally:
+            body.close()
+
+    def _environ(self, scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+            "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1] or 80),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "SERVER_SOFTWARE": SERVER_SOFTWARE,
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body.stream(),
+            # The body is complete, so chunked uploads can be read to the end
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "wsgi.file_wrapper": FileWrapper,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1")
+            value = value.decode("latin-1")
+            if name == "content-type":
+                environ["CONTENT_TYPE"] = value
+            elif name != "content-length":
+                key = "HTTP_" + name.upper().replace("-", "_")
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        if body.size or any(name == b"content-length" for name, _ in scope["headers"]):
+            # The spooled size, which is also right for chunked uploads
+            environ["CONTENT_LENGTH"] = str(body.size)
+        return environ
+
+    def _call_wsgi(self, environ):
+        """
+        Runs the view (on the executor) and collects the start of its body.
+
+        Returns:
+            tuple: (status, headers, chunks, rest) where `rest` is None if `chunks` is
+                   the whole body, a FileWrapper to send, or the body iterable to continue.
+        """
+        response = {}
+        written = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = status
+            response["headers"] = headers
+            return written.append
+
+        body = self.wsgi_app(environ, start_response)
+        if isinstance(body, FileWrapper):
+            return response["status"], response["headers"], written, body
+        chunks = written
+        size = sum(map(len, written))
+        try:
+            iterator = iter(body)
+            for chunk in iterator:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= RESPONSE_BUFFER_SIZE:
+                    return response["status"], response["headers"], chunks, (body, iterator)
+        except BaseException:
+            if hasattr(body, "close"):
+                body.close()
+            raise
+        if hasattr(body, "close"):
+            body.close()
+        return response["status"], response["headers"], chunks, None
+
+    @staticmethod
+    async def _send_iterable(chunks, rest, send, disconnect, run):
+        body, iterator = rest
+        try:
+            await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+            while not disconnect.done():
+                chunk = await run(next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(body, "close"):
+                await run(body.close)
+
+    @staticmethod
+    async def _send_file(wrapper, headers, send, disconnect, run):
+        try:
+            fd = wrapper.file.fileno()
+            offset = wrapper.file.tell()
+            remaining = next((int(value) for name, value in headers if name.lower() == "content-length"), None)
+            while (remaining is None or remaining > 0) and not disconnect.done():
+                size = wrapper.block_size if remaining is None else min(wrapper.block_size, remaining)
+                data = await run(os.pread, fd, size, offset)
+                if not data:
+                    break
+                offset += len(data)
+                if remaining is not None:
+                    remaining -= len(data)
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await run(wrapper.close)
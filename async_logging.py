@@ -0,0 +1,213 @@
+# async_logging.py
+# A QueueHandler/QueueListener-style logging pipeline that keeps formatting and I/O
+# off the calling (request) thread.
+#
+#   logger -> BoundedQueueHandler --(bounded queue)--> BatchingQueueListener -> real handlers
+#
+# The request thread only appends to the queue. A background thread drains it,
+# formats records and writes them in batches, flushing when `batch_size` records
+# are waiting or `flush_interval` seconds have passed, whichever comes first.
+import atexit
+import collections
+import logging
+import threading
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "sample")
+
+
+class BoundedQueueHandler(logging.Handler):
+    """
+    Puts records on a bounded queue without formatting them.
+
+    Overflow policies, applied when the queue is full (or, for "sample", filling up):
+      - "block":       wait up to `block_timeout` seconds for space, then drop.
+      - "drop_oldest": discard the oldest queued record to make room.
+      - "sample":      once the queue is more than `sample_threshold` full, keep only
+                       one record in `sample_rate`; drop everything while it is full.
+
+    The queue is a deque: appends and len() are atomic, so the common path takes no
+    lock. Counters (see stats()) are updated without a lock as well and may be off by
+    a few under heavy contention, which is fine for monitoring.
+
+    Records are formatted later on the writer thread, so objects passed in `args` or
+    `extra` must not be mutated after logging.
+    """
+
+    def __init__(self, maxsize=10000, overflow="drop_oldest", block_timeout=1.0,
+                 sample_rate=10, sample_threshold=0.8, wakeup_size=256):
+        super().__init__()
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.sample_rate = sample_rate
+        self.sample_high_water = int(maxsize * sample_threshold)
+        self.wakeup_size = wakeup_size
+        # drop_oldest gets eviction for free from maxlen
+        self.queue = collections.deque(maxlen=maxsize if overflow == "drop_oldest" else None)
+        self.wakeup = threading.Event()  # set when a full batch is waiting
+        self.space_available = threading.Condition()  # "block" policy only
+        self.queued = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.flushed = 0  # updated by the listener
+        self._sample_counter = 0
+
+    def emit(self, record):
+        self.enqueue(record)
+
+    def enqueue(self, item):
+        queue = self.queue
+        depth = len(queue)
+        if depth >= self.wakeup_size:
+            self.wakeup.set()
+        if self.overflow == "drop_oldest":
+            if depth >= self.maxsize:
+                self.dropped += 1
+        elif self.overflow == "sample":
+            if depth >= self.maxsize:
+                self.dropped += 1
+                return
+            if depth >= self.sample_high_water:
+                self._sample_counter += 1
+                if self._sample_counter % self.sample_rate:
+                    self.sampled_out += 1
+                    self.dropped += 1
+                    return
+        elif depth >= self.maxsize and not self._wait_for_space():
+            self.dropped += 1
+            return
+        queue.append(item)
+        self.queued += 1
+
+    def _wait_for_space(self):
+        self.wakeup.set()
+        with self.space_available:
+            return self.space_available.wait_for(lambda: len(self.queue) < self.maxsize, self.block_timeout)
+
+    def stats(self):
+        return {
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "flushed": self.flushed,
+            "queue_depth": len(self.queue),
+        }
+
+
+class BatchingQueueListener:
+    """
+    Drains a BoundedQueueHandler's queue on a daemon thread and writes to `handlers`.
+
+    StreamHandlers (and subclasses such as FileHandler) get a batch as one write and
+    one flush; other handlers receive records one at a time. A handler that fails
+    reports it through its handleError() and the thread carries on with the next batch.
+    """
+
+    def __init__(self, queue_handler, handlers, batch_size=256, flush_interval=0.5):
+        self.queue_handler = queue_handler
+        self.queue = queue_handler.queue
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="async-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=5.0):
+        """Flushes everything still queued and stops the writer thread."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self.queue_handler.wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        wakeup = self.queue_handler.wakeup
+        while True:
+            wakeup.wait(self.flush_interval)
+            wakeup.clear()
+            self._drain()
+            if self._stopping:
+                self._drain()
+                return
+
+    def _drain(self):
+        popleft = self.queue.popleft
+        while self.queue:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(popleft())
+            except IndexError:
+                pass
+            with self.queue_handler.space_available:
+                self.queue_handler.space_available.notify_all()
+            self._write(batch)
+
+    def _write(self, batch):
+        for handler in self.handlers:
+            # An exception escaping here would end the writer thread, and every later
+            # record would pile up in the queue unwritten
+            try:
+                if isinstance(handler, logging.StreamHandler):
+                    self._write_stream(handler, batch)
+                else:
+                    self._write_records(handler, batch)
+            except Exception:
+                handler.handleError(batch[-1])
+        self.queue_handler.flushed += len(batch)
+
+    @staticmethod
+    def _write_records(handler, batch):
+        for record in batch:
+            if record.levelno < handler.level:
+                continue
+            try:
+                handler.handle(record)
+            except Exception:
+                handler.handleError(record)
+
+    @staticmethod
+    def _write_stream(handler, batch):
+        lines = []
+        for record in batch:
+            if record.levelno < handler.level:
+                continue
+            try:
+                if handler.filter(record):
+                    lines.append(handler.format(record) + handler.terminator)
+            except Exception:
+                handler.handleError(record)
+        if not lines:
+            return
+        handler.acquire()
+        try:
+            handler.stream.write("".join(lines))
+            handler.flush()
+        except Exception:
+            handler.handleError(batch[-1])
+        finally:
+            handler.release()
+
+
+def attach_async_pipeline(logger, handlers, maxsize=10000, overflow="drop_oldest",
+                          batch_size=256, flush_interval=0.5, **handler_options):
+    """
+    Routes `logger` through a bounded queue to `handlers` written by a background thread.
+
+    Returns:
+        tuple: (BoundedQueueHandler, started BatchingQueueListener)
+    """
+    queue_handler = BoundedQueueHandler(maxsize=maxsize, overflow=overflow, wakeup_size=batch_size, **handler_options)
+    listener = BatchingQueueListener(queue_handler, handlers, batch_size=batch_size, flush_interval=flush_interval)
+    logger.addHandler(queue_handler)
+    listener.start()
+    return queue_handler, listener
@@ -0,0 +1,89 @@
+# benchmarks/bench_activity_logging.py
+# Per-call overhead seen by the request thread when recording a user activity event.
+# Every mode logs the way record_activity does, with logger.info(msg, extra=event):
+#   - sync:  the logger's handler formats the JSON and writes it on the calling thread,
+#            flushing every record (the setup before async_logging.py)
+#   - block / drop_oldest / sample: BoundedQueueHandler -> BatchingQueueListener
+#            (async_logging.py) with that overflow policy
+#
+# Events have the same shape as UserActivityService.record_activity produces. A
+# minimal JSON formatter stands in for json_formatter.JsonFormatter so the benchmark
+# has no dependency on it. Output goes to a temporary file.
+#
+# Usage: python benchmarks/bench_activity_logging.py [--events 200000] [--queue-size 10000]
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_logging import attach_async_pipeline  # noqa: E402
+
+ACTIVITY_FIELDS = ("event_type", "actor", "action", "target", "network", "details")
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {"timestamp": record.created, "message": record.getMessage()}
+        for field in ACTIVITY_FIELDS:
+            payload[field] = getattr(record, field, None)
+        return json.dumps(payload)
+
+
+def record_activity(logger, i):
+    activity_data = {
+        "event_type": "user_activity",
+        "actor": {"id": f"user_{i % 5000}"},
+        "action": {"verb": "view_lesson", "status": "success"},
+        "target": {"type": "lesson", "id": str(i % 300)},
+        "network": {"ip_address": "10.0.0.1", "user_agent": "bench"},
+        "details": {},
+    }
+    logger.info("User performed view_lesson", extra=activity_data)
+
+
+def measure(logger, events):
+    samples = []
+    for i in range(events):
+        start = time.perf_counter_ns()
+        record_activity(logger, i)
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return statistics.mean(samples) / 1000, samples[len(samples) // 2] / 1000, samples[int(len(samples) * 0.99)] / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Activity logging per-call overhead benchmark")
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'mode':<20} {'mean us':>8} {'p50 us':>8} {'p99 us':>8}  counters")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("sync", "block", "drop_oldest", "sample"):
+            logger = logging.getLogger(f"bench_activity_{mode}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            file_handler = logging.FileHandler(os.path.join(tmp, f"{mode}.log"))
+            file_handler.setFormatter(_JsonLinesFormatter())
+            if mode == "sync":
+                logger.addHandler(file_handler)
+                listener = queue_handler = None
+            else:
+                queue_handler, listener = attach_async_pipeline(logger, [file_handler], maxsize=args.queue_size,
+                                                                overflow=mode)
+            mean, p50, p99 = measure(logger, args.events)
+            if listener:
+                listener.stop()
+            file_handler.close()
+            counters = queue_handler.stats() if queue_handler else ""
+            print(f"{mode:<20} {mean:>8.2f} {p50:>8.2f} {p99:>8.2f}  {counters}")
+
+
+if __name__ == "__main__":
+    main()
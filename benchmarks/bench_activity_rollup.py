@@ -0,0 +1,109 @@
+# benchmarks/bench_activity_rollup.py
+# Throughput (events/s) and peak RSS of activity_rollup.py over a large activity log.
+#
+# Generates --size-mb of JSON lines shaped like UserActivityService output (with an
+# ISO timestamp, as a JSON formatter would add), then:
+#   1. reads the whole log with a fresh checkpoint,
+#   2. appends more events and reads again from the checkpoint, checking that only
+#      the new events are processed and none are counted twice.
+#
+# Usage: python benchmarks/bench_activity_rollup.py [--size-mb 2048] [--dir /path/with/space]
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from activity_rollup import ActivityLogReader  # noqa: E402
+
+VERBS = ("login", "view_lesson", "submit_quiz", "upload_video", "logout")
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def write_events(path, size_bytes, start_time, seed):
+    """Appends events until the file grows by size_bytes. Returns (events written, last timestamp)."""
+    rng = random.Random(seed)
+    written = 0
+    events = 0
+    moment = start_time
+    with open(path, "a") as log:
+        while written < size_bytes:
+            lines = []
+            for _ in range(10000):
+                moment += timedelta(milliseconds=rng.randrange(1, 20))
+                verb = rng.choice(VERBS)
+                # Skewed actors and IPs, so there are heavy hitters to find
+                actor = f"user_{int(rng.paretovariate(1.2)) % 50000}"
+                ip = int(rng.paretovariate(1.0)) % 65536
+                event = {
+                    "timestamp": moment.isoformat(),
+                    "level": "INFO",
+                    "message": f"User {actor} performed {verb}",
+                    "event_type": "user_activity",
+                    "actor": {"id": actor},
+                    "action": {"verb": verb, "status": "failure" if rng.random() < 0.05 else "success"},
+                    "target": {"type": "lesson", "id": str(rng.randrange(5000))},
+                    "network": {"ip_address": f"10.0.{ip // 256 % 256}.{ip % 256}", "user_agent": "Mozilla/5.0"},
+                    "details": {},
+                }
+                lines.append(json.dumps(event))
+            chunk = "\n".join(lines) + "\n"
+            log.write(chunk)
+            written += len(chunk)
+            events += len(lines)
+    return events, moment
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Activity log rollup throughput benchmark")
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--append-mb", type=int, default=64, help="appended before the resume run")
+    parser.add_argument("--dir", default=None, help="where the generated log is written")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        log_path = os.path.join(tmp, "activity.log")
+        checkpoint_path = os.path.join(tmp, "rollup.json")
+        start_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        print(f"generating {args.size_mb} MiB of activity events...")
+        events, last_time = write_events(log_path, args.size_mb * 2**20, start_time, seed=1)
+        print(f"baseline peak RSS: {peak_rss_mib():.1f} MiB")
+
+        reader = ActivityLogReader([log_path], checkpoint_path)
+        started = time.perf_counter()
+        reader.read_available()
+        elapsed = time.perf_counter() - started
+        assert reader.rollup.events + reader.rollup.late_events == events, (reader.rollup.events, events)
+        print(f"full read: {events} events in {elapsed:.1f}s = {events / elapsed:,.0f} events/s, "
+              f"{args.size_mb / elapsed:.0f} MiB/s, peak RSS {peak_rss_mib():.1f} MiB")
+
+        appended, _ = write_events(log_path, args.append_mb * 2**20, last_time, seed=2)
+        resumed = ActivityLogReader([log_path], checkpoint_path)
+        before = resumed.rollup.events + resumed.rollup.late_events
+        started = time.perf_counter()
+        resumed.read_available()
+        elapsed = time.perf_counter() - started
+        processed = resumed.rollup.events + resumed.rollup.late_events - before
+        assert processed == appended, (processed, appended)
+        print(f"resume:    {processed} new events in {elapsed:.2f}s (nothing reprocessed)")
+
+        rollup = resumed.rollup
+        since = rollup.newest_bucket + rollup.bucket_seconds - 3600
+        print("failed logins per IP, last hour:", rollup.top_ips(5, since=since, verb="login", status="failure"))
+        print("top actors, all time:", rollup.top_actors.top(5))
+
+
+if __name__ == "__main__":
+    main()
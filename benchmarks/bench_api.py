@@ -0,0 +1,351 @@
+# benchmarks/bench_api.py
+# Load and latency benchmark for every route of app.py.
+#
+# Seeds storage with a reproducible dataset (--seed): --courses courses of
+# --lessons-per-course lessons, --uploads stored videos and documents, and --quizzes
+# quizzes and assignments. Then it sends --requests requests to each endpoint and
+# reports req/s and p50/p95/p99 latency per endpoint.
+#
+# By default the requests go through the Flask test client in process, which
+# measures the app alone. With --server the app is served by a threaded WSGI server
+# on a local socket and --concurrency clients (keep-alive connections) send the requests
+# concurrently.
+#
+# Requests that need state (a lesson to delete, an upload session to complete...) get
+# it prepared beforehand, outside the timed section.
+#
+#   python benchmarks/bench_api.py --output results.json
+#   python benchmarks/bench_api.py --compare results.json    # exits 1 on a regression
+#
+# Comparing is meaningful between runs with the same dataset, mode and machine.
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+# --- Dataset ---
+class Dataset:
+    """Ids of the seeded entities, which the request generators pick from."""
+
+    def __init__(self):
+        self.course_ids = []
+        self.lesson_ids = []
+        self.quiz_ids = []
+        self.videos = []
+        self.documents = []
+
+
+def seed(course_api, args, rng):
+    storage, upload_store = course_api.storage, course_api.upload_store
+    data = Dataset()
+
+    for i in range(args.uploads):
+        for content_type, names in (("video", data.videos), ("document", data.documents)):
+            extension = "mp4" if content_type == "video" else "pdf"
+            body = rng.randbytes(args.upload_size_kb * 1024)
+            saved = upload_store.save_stream(content_type, f"seed_{i}.{extension}", io.BytesIO(body), len(body))
+            upload_store.publish(saved)  # random bytes, never a duplicate
+            upload_data = {"filename": saved["filename"], "size": saved["size"], "checksum": saved["checksum"]}
+            storage.register_content(content_type, upload_data,
+                                     course_api._content_url(content_type, saved["filename"]))
+            names.append(saved["filename"])
+
+    contents = data.videos + data.documents
+    for course_id in range(1, args.courses + 1):
+        items = [(f"Course {course_id} lesson {i}", rng.sample(contents, min(3, len(contents))))
+                 for i in range(args.lessons_per_course)]
+        data.lesson_ids.extend(lesson["id"] for lesson in storage.create_lessons(course_id, items))
+        data.course_ids.append(course_id)
+
+    quizzes = [(f"Quiz {i}", _questions(rng), rng.choice(data.lesson_ids)) for i in range(args.quizzes)]
+    data.quiz_ids = [quiz["id"] for quiz in storage.create_quizzes(quizzes)]
+    storage.create_assignments([(f"Assignment {i}", "Write an essay on...", rng.choice(data.lesson_ids))
+                                for i in range(args.quizzes)])
+    return data
+
+
+def _questions(rng, count=10):
+    return [{"q": f"{a}+{b}?", "a": str(a + b)} for a, b in
+            ((rng.randrange(100), rng.randrange(100)) for _ in range(count))]
+
+
+# --- Endpoints ---
+# Each generator returns one request as (method, path, headers, body), preparing any
+# state it needs first. Names are the route templates, plus the variant measured.
+def endpoints(course_api, data, rng, upload_size):
+    storage, upload_store = course_api.storage, course_api.upload_store
+    counter = iter(range(10**9))
+
+    def scratch_lesson():
+        return storage.create_lesson(10**6, "Scratch lesson", [])["id"]
+
+    def session_with_chunk():
+        body = rng.randbytes(4096)
+        session = upload_store.create_session("document", f"bench_{next(counter)}.pdf", len(body))
+        upload_store.append_chunk(session["id"], 0, io.BytesIO(body), len(body))
+        return session["id"]
+
+    def lesson_json():
+        return json.dumps({"title": "Bench lesson", "content_ids": rng.sample(data.videos, 1)})
+
+    return {
+        "GET /": lambda: ("GET", "/", {}, None),
+        "GET /api/courses/<course_id>/lessons": lambda: (
+            "GET", f"/api/courses/{rng.choice(data.course_ids)}/lessons", {}, None),
+        "GET /api/courses/<course_id>/lessons?limit=100": lambda: (
+            "GET", f"/api/courses/{rng.choice(data.course_ids)}/lessons?limit=100", {}, None),
+        "GET /api/courses/<course_id>/lessons?stream=1": lambda: (
+            "GET", f"/api/courses/{rng.choice(data.course_ids)}/lessons?stream=1", {}, None),
+        "POST /api/courses/<course_id>/lessons": lambda: (
+            "POST", f"/api/courses/{rng.choice(data.course_ids)}/lessons", JSON_HEADERS, lesson_json()),
+        "POST /api/courses/<course_id>/lessons/batch (100)": lambda: (
+            "POST", f"/api/courses/{rng.choice(data.course_ids)}/lessons/batch", JSON_HEADERS,
+            json.dumps([{"title": f"Batch lesson {i}"} for i in range(100)])),
+        "PUT /api/lessons/<lesson_id>": lambda: (
+            "PUT", f"/api/lessons/{rng.choice(data.lesson_ids)}", JSON_HEADERS, json.dumps({"title": "Renamed"})),
+        "DELETE /api/lessons/<lesson_id>": lambda: ("DELETE", f"/api/lessons/{scratch_lesson()}", {}, None),
+        "GET /api/lessons/<lesson_id>/content": lambda: (
+            "GET", f"/api/lessons/{rng.choice(data.lesson_ids)}/content", {}, None),
+        "POST /api/content/upload-video (metadata)": lambda: (
+            "POST", "/api/content/upload-video", JSON_HEADERS,
+            json.dumps({"filename": f"bench_{next(counter)}.mp4", "size": 1024})),
+        "POST /api/content/upload-document (raw body)": lambda: (
+            "POST", f"/api/content/upload-document?filename=bench_{next(counter)}.pdf",
+            {"Content-Type": "application/pdf"}, rng.randbytes(upload_size)),
+        "GET /api/content/videos/<filename>": lambda: (
+            "GET", f"/api/content/videos/{rng.choice(data.videos)}", {}, None),
+        "GET /api/content/videos/<filename> (Range)": lambda: (
+            "GET", f"/api/content/videos/{rng.choice(data.videos)}", {"Range": "bytes=0-4095"}, None),
+        "GET /api/content/documents/<filename>": lambda: (
+            "GET", f"/api/content/documents/{rng.choice(data.documents)}", {}, None),
+        "POST /api/content/uploads": lambda: (
+            "POST", "/api/content/uploads", JSON_HEADERS,
+            json.dumps({"filename": f"bench_{next(counter)}.mp4", "type": "video", "size": 4096})),
+        "GET /api/content/uploads/<session_id>": lambda: (
+            "GET", f"/api/content/uploads/{upload_store.create_session('video', 'bench.mp4')['id']}", {}, None),
+        "PUT /api/content/uploads/<session_id>": lambda: (
+            "PUT", f"/api/content/uploads/{upload_store.create_session('video', 'bench.mp4', 4096)['id']}",
+            {"Upload-Offset": "0", "Content-Type": "application/octet-stream"}, rng.randbytes(4096)),
+        "POST /api/content/uploads/<session_id>/complete": lambda: (
+            "POST", f"/api/content/uploads/{session_with_chunk()}/complete", JSON_HEADERS, "{}"),
+        "DELETE /api/content/uploads/<session_id>": lambda: (
+            "DELETE", f"/api/content/uploads/{upload_store.create_session('video', 'bench.mp4')['id']}", {}, None),
+        "POST /api/quizzes": lambda: (
+            "POST", "/api/quizzes", JSON_HEADERS,
+            json.dumps({"title": "Bench quiz", "questions": _questions(rng), "lesson_id": rng.choice(data.lesson_ids)})),
+        "POST /api/quizzes/batch (100)": lambda: (
+            "POST", "/api/quizzes/batch", JSON_HEADERS,
+            json.dumps([{"title": f"Quiz {i}", "questions": _questions(rng)} for i in range(100)])),
+        "GET /api/quizzes/<quiz_id>": lambda: ("GET", f"/api/quizzes/{rng.choice(data.quiz_ids)}", {}, None),
+        "POST /api/assignments": lambda: (
+            "POST", "/api/assignments", JSON_HEADERS,
+            json.dumps({"title": "Essay", "description": "Write an essay on...", "lesson_id": rng.choice(data.lesson_ids)})),
+        "POST /api/assignments/batch (100)": lambda: (
+            "POST", "/api/assignments/batch", JSON_HEADERS,
+            json.dumps([{"title": f"Essay {i}", "description": "Write..."} for i in range(100)])),
+        "GET /api/cache/stats": lambda: ("GET", "/api/cache/stats", {}, None),
+        "GET /health/live": lambda: ("GET", "/health/live", {}, None),
+        "GET /health/ready": lambda: ("GET", "/health/ready", {}, None),
+    }
+
+
+# --- Drivers ---
+def run_test_client(app, requests):
+    """Sends `requests` one after another through the Flask test client; returns (latencies, errors, wall time)."""
+    client = app.test_client()
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for method, path, headers, body in requests:
+        begin = time.perf_counter()
+        response = client.open(path, method=method, headers=headers, data=body)
+        response.get_data()
+        latencies.append(time.perf_counter() - begin)
+        errors += response.status_code >= 400
+        response.close()
+    return latencies, errors, time.perf_counter() - started
+
+
+class LocalServer:
+    """The app on a threaded werkzeug server with HTTP/1.1 keep-alive, in a background thread."""
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class KeepAliveHandler(WSGIRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveHandler)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def run_server(port, requests, concurrency):
+    """Sends `requests` over `concurrency` keep-alive connections; returns (latencies, errors, wall time)."""
+    shares = [requests[i::concurrency] for i in range(concurrency)]
+
+    def client(share):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        latencies, errors = [], 0
+        for method, path, headers, body in share:
+            begin = time.perf_counter()
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - begin)
+            errors += response.status >= 400
+        conn.close()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(client, shares))
+    elapsed = time.perf_counter() - started
+    return [latency for latencies, _ in results for latency in latencies], sum(e for _, e in results), elapsed
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(0.50), 3),
+        "p95_ms": round(percentile(0.95), 3),
+        "p99_ms": round(percentile(0.99), 3),
+    }
+
+
+# --- Comparison ---
+def compare(baseline, results, threshold, min_delta_ms):
+    """
+    Returns the endpoints whose p50 or p95 grew, or req/s fell, by more than
+    `threshold` (a fraction). Latency changes under `min_delta_ms` are ignored as noise.
+    """
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline["endpoints"].get(name)
+        if previous is None:
+            continue
+        for metric, worse in (("p50_ms", 1), ("p95_ms", 1), ("rps", -1)):
+            before, after = previous[metric], current[metric]
+            if metric != "rps" and after - before < min_delta_ms:
+                continue
+            if before and worse * (after - before) / before > threshold:
+                regressions.append((name, metric, before, after))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-endpoint throughput and latency of app.py")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--lessons-per-course", type=int, default=200)
+    parser.add_argument("--uploads", type=int, default=50, help="stored videos (and as many documents)")
+    parser.add_argument("--upload-size-kb", type=int, default=64)
+    parser.add_argument("--quizzes", type=int, default=1000, help="quizzes (and as many assignments)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--endpoints", help="only endpoints whose name contains this text")
+    parser.add_argument("--server", action="store_true", help="serve over a local socket instead of the test client")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients with --server")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON results to flag regressions against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regression threshold (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.25, help="ignore smaller latency changes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as content_dir:
+        # app.py reads this at import
+        os.environ["CONTENT_STORAGE_DIR"] = content_dir
+        import app as course_api
+
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        data = seed(course_api, args, rng)
+        print(f"Seeded {len(data.course_ids)} courses, {len(data.lesson_ids)} lessons, "
+              f"{len(data.videos) + len(data.documents)} uploads, {len(data.quiz_ids)} quizzes "
+              f"in {time.perf_counter() - started:.1f} s")
+
+        server = LocalServer(course_api.app) if args.server else None
+        results = {
+            "meta": {
+                "commit": _git_commit(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "mode": f"server (concurrency {args.concurrency})" if args.server else "test client",
+                "storage": type(course_api.storage).__name__,
+                "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            },
+            "endpoints": {},
+        }
+        print(f"{'endpoint':<52} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        try:
+            for name, generate in endpoints(course_api, data, rng, args.upload_size_kb * 1024).items():
+                if args.endpoints and args.endpoints not in name:
+                    continue
+                requests = [generate() for _ in range(args.requests)]
+                if server is not None:
+                    summary = summarize(*run_server(server.port, requests, args.concurrency))
+                else:
+                    summary = summarize(*run_test_client(course_api.app, requests))
+                results["endpoints"][name] = summary
+                print(f"{name:<52} {summary['rps']:>8.0f} {summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} "
+                      f"{summary['p99_ms']:>8.2f} {summary['errors']:>6}")
+        finally:
+            if server is not None:
+                server.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold, args.min_delta_ms)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name}: {metric} {before} -> {after}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# benchmarks/bench_asgi.py
+# Sync (WSGI) vs. async (ASGI) serving of the course API under --clients concurrent
+# keep-alive clients (default 5000):
+#
+#   sync:  gunicorn -k gthread, one worker with --threads threads (app:app)
+#   async: uvicorn, one worker, views on --threads executor threads (app_asgi:app)
+#
+# Every client opens one connection and reuses it. Most clients send fast requests:
+# lesson content, a lesson page, or a 64 KiB range of a video. --slow-fraction of
+# them upload 256 KiB documents in 16 KiB pieces, pausing --slow-pause seconds
+# between pieces, like clients on a poor network. The report gives the fast
+# requests' throughput and latency, the completed slow uploads, and errors
+# (refused connections, resets, or requests over --timeout).
+#
+# Usage: python benchmarks/bench_asgi.py [--clients 5000] [--duration 20] [--mode sync|async|both]
+# Requires gunicorn and uvicorn.
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COURSES = 10
+LESSONS_PER_COURSE = 100
+VIDEO_SIZE = 1024 * 1024
+UPLOAD_SIZE = 256 * 1024
+UPLOAD_PIECE = 16 * 1024
+
+
+def server_command(mode, port, args):
+    if mode == "sync":
+        return [sys.executable, "-m", "gunicorn", "-k", "gthread", "-w", "1", "--threads", str(args.threads),
+                "--worker-connections", str(args.clients + 100), "--backlog", "8192", "--keep-alive", "300",
+                "--timeout", "300", "-b", f"127.0.0.1:{port}", "app:app"]
+    return [sys.executable, "-m", "uvicorn", "app_asgi:app", "--port", str(port), "--backlog", "8192",
+            "--timeout-keep-alive", "300", "--log-level", "warning"]
+
+
+def start_server(mode, port, args, content_dir):
+    env = dict(os.environ, CONTENT_STORAGE_DIR=content_dir, ASGI_EXECUTOR_THREADS=str(args.threads))
+    server = subprocess.Popen(server_command(mode, port, args), cwd=REPO_ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base}/health/live", timeout=1).read()
+            break
+        except OSError:
+            time.sleep(0.1)
+    else:
+        server.kill()
+        raise RuntimeError(f"{mode} server did not start")
+    # Seed the catalog and one video through the API
+    for course_id in range(1, COURSES + 1):
+        lessons = [{"title": f"Lesson {i}", "content_ids": ["clip.mp4"]} for i in range(LESSONS_PER_COURSE)]
+        urllib.request.urlopen(urllib.request.Request(
+            f"{base}/api/courses/{course_id}/lessons/batch", json.dumps(lessons).encode(),
+            {"Content-Type": "application/json"})).read()
+    urllib.request.urlopen(urllib.request.Request(
+        f"{base}/api/content/upload-video?filename=clip.mp4", os.urandom(VIDEO_SIZE),
+        {"Content-Type": "application/octet-stream"})).read()
+    return server
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return int(status_line.split()[1])
+
+
+class Client:
+    def __init__(self, index, port, args, stats):
+        self.index = index
+        self.port = port
+        self.args = args
+        self.stats = stats
+        self.slow = index < args.clients * args.slow_fraction
+        self.rng = random.Random(index)
+        self.reader = self.writer = None
+        self.uploads = 0
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection("127.0.0.1", self.port), self.args.timeout)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def _fast_request(self):
+        choice = self.rng.random()
+        if choice < 0.5:
+            path, extra = f"/api/lessons/{self.rng.randint(1, COURSES * LESSONS_PER_COURSE)}/content", ""
+        elif choice < 0.8:
+            path, extra = f"/api/courses/{self.rng.randint(1, COURSES)}/lessons?limit=20", ""
+        else:
+            start = self.rng.randrange(0, VIDEO_SIZE - 65536)
+            path, extra = "/api/content/videos/clip.mp4", f"Range: bytes={start}-{start + 65535}\r\n"
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n{extra}\r\n".encode())
+        return await read_response(self.reader)
+
+    async def _slow_upload(self):
+        self.uploads += 1
+        self.writer.write(
+            f"POST /api/content/upload-document?filename=slow-{self.index}-{self.uploads}.bin HTTP/1.1\r\n"
+            f"Host: bench\r\nContent-Type: application/octet-stream\r\nContent-Length: {UPLOAD_SIZE}\r\n\r\n".encode())
+        piece = bytes(UPLOAD_PIECE)
+        for _ in range(UPLOAD_SIZE // UPLOAD_PIECE):
+            self.writer.write(piece)
+            await self.writer.drain()
+            await asyncio.sleep(self.args.slow_pause)
+        return await read_response(self.reader)
+
+    async def run(self, deadline):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if self.reader is None:
+                    await self.connect()
+                request = self._slow_upload() if self.slow else self._fast_request()
+                status = await asyncio.wait_for(request, self.args.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                self.stats["errors"] += 1
+                self.close()
+                await asyncio.sleep(0.1)
+                continue
+            if status >= 400:
+                self.stats["errors"] += 1
+            elif self.slow:
+                self.stats["uploads"] += 1
+            else:
+                self.stats["latencies"].append(time.perf_counter() - started)
+        self.close()
+
+
+async def load(port, args):
+    stats = {"latencies": [], "uploads": 0, "errors": 0, "connected": 0}
+    clients = [Client(i, port, args, stats) for i in range(args.clients)]
+    connecting = asyncio.Semaphore(200)
+
+    async def connect(client):
+        async with connecting:
+            try:
+                await client.connect()
+                stats["connected"] += 1
+            except (OSError, asyncio.TimeoutError):
+                pass
+
+    await asyncio.gather(*map(connect, clients))
+    stats["errors"] = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(client.run(started + args.duration) for client in clients))
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000 if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs. async serving under many keep-alive clients")
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per mode")
+    parser.add_argument("--threads", type=int, default=32, help="gthread threads / ASGI executor threads")
+    parser.add_argument("--slow-fraction", type=float, default=0.1)
+    parser.add_argument("--slow-pause", type=float, default=0.1, help="seconds between 16 KiB upload pieces")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a request counts as failed")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    print(f"{args.clients} keep-alive clients ({args.slow_fraction:.0%} slow uploaders), "
+          f"{args.threads} threads, {args.duration:.0f} s per mode")
+    print(f"{'mode':<6} {'connected':>9} {'fast req/s':>10} {'p50 ms':>8} {'p99 ms':>9} {'uploads':>8} {'errors':>7}")
+    for offset, mode in enumerate(modes):
+        content_dir = tempfile.mkdtemp(prefix="bench_asgi_")
+        server = start_server(mode, args.port + offset, args, content_dir)
+        try:
+            stats = asyncio.run(load(args.port + offset, args))
+        finally:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(content_dir, ignore_errors=True)
+        latencies = sorted(stats["latencies"])
+        print(f"{mode:<6} {stats['connected']:>9} {len(latencies) / stats['elapsed']:>10.0f} "
+              f"{percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.99):>9.1f} "
+              f"{stats['uploads']:>8} {stats['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_asset_manifest.py
+# Build and runtime cost of cdn_url_helper's asset manifest.
+#
+#   1. Hashing a synthetic static tree of --files files (--size-kb each) with one
+#      thread vs. the default thread pool.
+#   2. Generating the URLs of a page referencing --assets assets: the previous
+#      unmemoized string formatting vs. memoized get_asset_url with a manifest.
+#
+# Usage: python benchmarks/bench_asset_manifest.py [--files 2000] [--size-kb 256] [--assets 500]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cdn_url_helper  # noqa: E402
+
+
+def unmemoized_asset_url(asset_path):
+    """get_asset_url as it was before the manifest: formats the URL on every call."""
+    clean_asset_path = asset_path.lstrip('/')
+    if cdn_url_helper.IS_PRODUCTION and cdn_url_helper.CDN_DOMAIN:
+        return f"{cdn_url_helper.CDN_DOMAIN.rstrip('/')}/{clean_asset_path}"
+    return f"{cdn_url_helper.LOCAL_STATIC_PREFIX.rstrip('/')}/{clean_asset_path}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asset manifest build and URL generation cost")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--assets", type=int, default=500, help="asset URLs per rendered page")
+    parser.add_argument("--renders", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as static_root:
+        for i in range(args.files):
+            directory = os.path.join(static_root, f"dir_{i % 20}")
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"asset_{i}.js"), "wb") as f:
+                f.write(os.urandom(args.size_kb * 1024))
+
+        total_mb = args.files * args.size_kb / 1024
+        for name, workers in (("serial", 1), (f"{os.cpu_count()} workers", None)):
+            started = time.perf_counter()
+            manifest = cdn_url_helper.hash_assets(static_root, workers=workers)
+            elapsed = time.perf_counter() - started
+            print(f"hash {args.files} files ({total_mb:.0f} MiB), {name:<11} {elapsed:6.2f} s "
+                  f"({total_mb / elapsed:.0f} MiB/s)")
+
+    assets = list(manifest)[:args.assets]
+    cdn_url_helper.configure(manifest=manifest)
+    for name, url_for in (("unmemoized", unmemoized_asset_url), ("memoized", cdn_url_helper.get_asset_url)):
+        started = time.perf_counter()
+        for _ in range(args.renders):
+            for asset in assets:
+                url_for(asset)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<11} {elapsed / args.renders * 1e6:8.1f} us per page of {len(assets)} asset URLs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_bulk_import.py
+# Compares importing a course one lesson/quiz/assignment per request against the
+# batch endpoints (one request per entity type).
+#
+# Usage: python benchmarks/bench_bulk_import.py [--lessons 300] [--courses 20] [--backend memory|sqlite]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as course_api  # noqa: E402
+from storage import create_storage  # noqa: E402
+
+
+def course_payload(lessons):
+    lesson_items = [{"title": f"Lesson {i}", "content_ids": [f"lesson-{i}.mp4"]} for i in range(lessons)]
+    quiz_items = [{"title": f"Quiz {i}", "questions": [{"q": "2+2?", "a": "4"}], "lesson_id": i} for i in range(lessons // 3)]
+    assignment_items = [{"title": f"Assignment {i}", "description": "Write...", "lesson_id": i} for i in range(lessons // 3)]
+    return lesson_items, quiz_items, assignment_items
+
+
+def import_single(client, course_id, payload):
+    lesson_items, quiz_items, assignment_items = payload
+    for item in lesson_items:
+        assert client.post(f"/api/courses/{course_id}/lessons", json=item).status_code == 201
+    for item in quiz_items:
+        assert client.post("/api/quizzes", json=item).status_code == 201
+    for item in assignment_items:
+        assert client.post("/api/assignments", json=item).status_code == 201
+
+
+def import_batch(client, course_id, payload):
+    lesson_items, quiz_items, assignment_items = payload
+    assert client.post(f"/api/courses/{course_id}/lessons/batch", json=lesson_items).status_code == 201
+    assert client.post("/api/quizzes/batch", json=quiz_items).status_code == 201
+    assert client.post("/api/assignments/batch", json=assignment_items).status_code == 201
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vs single-item course import benchmark")
+    parser.add_argument("--lessons", type=int, default=300, help="lessons per course")
+    parser.add_argument("--courses", type=int, default=20, help="courses imported per mode")
+    parser.add_argument("--backend", default="memory", choices=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    payload = course_payload(args.lessons)
+    entities = sum(len(items) for items in payload) * args.courses
+    print(f"{'mode':<8} {'courses/s':>10} {'entities/s':>12}")
+    for mode, importer in (("single", import_single), ("batch", import_batch)):
+        with tempfile.TemporaryDirectory() as tmp:
+            course_api.storage = create_storage(args.backend, os.path.join(tmp, "bench.db"))
+            client = course_api.app.test_client()
+            start = time.perf_counter()
+            for course_id in range(1, args.courses + 1):
+                importer(client, course_id, payload)
+            elapsed = time.perf_counter() - start
+            course_api.storage.close()
+        print(f"{mode:<8} {args.courses / elapsed:>10.1f} {entities / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
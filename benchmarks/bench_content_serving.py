@@ -0,0 +1,135 @@
+# benchmarks/bench_content_serving.py
+# Compares serving a stored video through GET /api/content/videos/<filename>
+# (wsgi.file_wrapper -> os.sendfile under gunicorn) with a naive handler that
+# reads the file into memory and returns the bytes.
+#
+# Each mode runs in its own single-worker gunicorn process on a real socket. The
+# benchmark reports client throughput, worker CPU time and worker peak RSS for
+# whole-file downloads and for random 1 MiB Range requests (video seeking).
+#
+# Usage: python benchmarks/bench_content_serving.py [--size-mb 512] [--downloads 10] [--ranges 500]
+# Requires gunicorn (pip install gunicorn) and Linux (/proc).
+import argparse
+import http.client
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import app as course_api  # noqa: E402
+from flask import Response  # noqa: E402
+
+app = course_api.app
+
+
+@app.route('/bench/naive/videos/<filename>')
+def naive_download(filename):
+    # What the zero-copy path avoids: the whole file is copied into Python memory
+    with open(course_api.upload_store.content_path("video", filename), "rb") as file:
+        return Response(file.read(), mimetype="video/mp4")
+
+
+@app.route('/bench/pid')
+def worker_pid():
+    return str(os.getpid())
+
+
+def worker_stats(pid):
+    """Returns (cpu seconds, peak RSS MiB) of a process."""
+    with open(f"/proc/{pid}/stat") as stat_file:
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    with open(f"/proc/{pid}/status") as status_file:
+        peak_kib = next(int(line.split()[1]) for line in status_file if line.startswith("VmHWM"))
+    return cpu, peak_kib / 1024
+
+
+def fetch(conn, path, headers=None):
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    received = 0
+    while True:
+        data = response.read(1024 * 1024)
+        if not data:
+            break
+        received += len(data)
+    return response.status, received
+
+
+def fetch_text(conn, path):
+    conn.request("GET", path)
+    return conn.getresponse().read().decode()
+
+
+def run_mode(name, path, port, size, downloads, ranges, storage_dir):
+    env = dict(os.environ, CONTENT_STORAGE_DIR=storage_dir)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", "1", "-b", f"127.0.0.1:{port}", "--log-level", "warning",
+         "benchmarks.bench_content_serving:app"],
+        cwd=REPO_ROOT, env=env,
+    )
+    try:
+        for _ in range(100):
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port)
+                pid = int(fetch_text(conn, "/bench/pid"))
+                break
+            except (ConnectionError, OSError):
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("gunicorn did not start")
+
+        cpu_before, _ = worker_stats(pid)
+        start = time.perf_counter()
+        for _ in range(downloads):
+            status, received = fetch(conn, path)
+            assert status == 200 and received == size, (status, received)
+        full_seconds = time.perf_counter() - start
+        cpu_full, _ = worker_stats(pid)
+
+        start = time.perf_counter()
+        for _ in range(ranges):
+            offset = random.randrange(0, size - 2**20)
+            range_header = {} if name == "naive" else {"Range": f"bytes={offset}-{offset + 2**20 - 1}"}
+            status, _ = fetch(conn, path, range_header)
+            assert status in (200, 206), status
+        range_seconds = time.perf_counter() - start
+        cpu_range, peak = worker_stats(pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{name:<10} {size * downloads / 2**20 / full_seconds:>12.0f} {cpu_full - cpu_before:>10.2f} "
+          f"{ranges / range_seconds:>10.0f} {cpu_range - cpu_full:>10.2f} {peak:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zero-copy vs naive content serving benchmark")
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--downloads", type=int, default=10)
+    parser.add_argument("--ranges", type=int, default=500, help="1 MiB range requests (naive mode reads the whole file each time)")
+    parser.add_argument("--port", type=int, default=18090)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        videos = os.path.join(storage_dir, "videos")
+        os.makedirs(videos)
+        size = args.size_mb * 2**20
+        with open(os.path.join(videos, "lecture.mp4"), "wb") as video:
+            for _ in range(args.size_mb):
+                video.write(os.urandom(2**20))
+
+        print(f"{'mode':<10} {'full MiB/s':>12} {'full cpu s':>10} {'ranges/s':>10} {'range cpu':>10} {'peak MiB':>10}")
+        run_mode("sendfile", "/api/content/videos/lecture.mp4", args.port, size, args.downloads, args.ranges, storage_dir)
+        # The naive handler can't do ranges, so its "range" column re-sends the whole file
+        run_mode("naive", "/bench/naive/videos/lecture.mp4", args.port + 1, size, args.downloads,
+                 max(1, args.ranges // 100), storage_dir)
+
+
+if __name__ == "__main__":
+    main()
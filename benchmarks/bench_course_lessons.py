@@ -0,0 +1,58 @@
+# benchmarks/bench_course_lessons.py
+# Measures GET /api/courses/<id>/lessons latency as the total number of lessons
+# on the platform grows. With the per-course index the latency should stay flat,
+# because a read only touches the lessons of the requested course.
+#
+# Usage: python benchmarks/bench_course_lessons.py [--sizes 1000,10000,100000,1000000]
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as course_api  # noqa: E402
+from storage import MemoryStorage  # noqa: E402
+
+
+def seed(total_lessons, lessons_per_course):
+    """Replaces the app's storage with a fresh MemoryStorage holding `total_lessons` lessons."""
+    storage = MemoryStorage()
+    for lesson_id in range(1, total_lessons + 1):
+        storage.create_lesson((lesson_id - 1) // lessons_per_course + 1, f"Lesson {lesson_id}", [])
+    course_api.storage = storage
+
+
+def measure(client, course_id, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.get(f"/api/courses/{course_id}/lessons")
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    samples.sort()
+    return {
+        "p50_us": statistics.median(samples) * 1e6,
+        "p95_us": samples[int(len(samples) * 0.95) - 1] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Course lessons read latency benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--lessons-per-course", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    client = course_api.app.test_client()
+    print(f"{'total lessons':>14} {'p50 (us)':>10} {'p95 (us)':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        seed(size, args.lessons_per_course)
+        # Read a course from the middle of the catalog
+        result = measure(client, size // args.lessons_per_course // 2 + 1, args.iterations)
+        print(f"{size:>14} {result['p50_us']:>10.1f} {result['p95_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_course_outline.py
+# Time to load everything a course page renders: the client-side N+1 fetch (the
+# lesson listing, then each lesson's content, then each quiz) vs. one
+# GET /api/courses/<id>/outline request, through the Flask test client.
+#
+# Each course has --lessons lessons with two content items each, and a quiz and an
+# assignment for every third lesson. The N+1 client already knows the quiz ids,
+# since the API has no way to look them up by lesson. Requests are sent one after
+# another, as a page load would. The report gives the time spent in the app and
+# adds --rtt-ms of network round trip per request to estimate a remote client.
+#
+# Usage: python benchmarks/bench_course_outline.py [--lessons 20,100,1000] [--backend memory|sqlite] [--rtt-ms 20]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as course_api  # noqa: E402
+from storage import create_storage  # noqa: E402
+
+PAGES = 20  # page loads timed per mode and course size
+
+
+def seed(client, course_id, lessons):
+    # Registered directly, so no files are written
+    for i in range(2):
+        filename = f"c{course_id}-{i}.pdf"
+        course_api.storage.register_content("document", {"filename": filename, "size": 4, "checksum": None},
+                                            f"/api/content/documents/{filename}")
+    items = [{"title": f"Lesson {i}", "content_ids": [f"c{course_id}-0.pdf", f"c{course_id}-1.pdf"]}
+             for i in range(lessons)]
+    lesson_ids = []
+    for start in range(0, lessons, 1000):
+        created = client.post(f"/api/courses/{course_id}/lessons/batch", json=items[start:start + 1000]).get_json()
+        lesson_ids += [result["lesson"]["id"] for result in created["results"]]
+    linked = lesson_ids[::3]
+    quiz_ids = []
+    for start in range(0, len(linked), 1000):
+        chunk = linked[start:start + 1000]
+        created = client.post("/api/quizzes/batch", json=[
+            {"title": f"Quiz for {lesson_id}", "questions": [{"q": "2+2?", "a": "4"}], "lesson_id": lesson_id}
+            for lesson_id in chunk]).get_json()
+        quiz_ids += [result["quiz"]["id"] for result in created["results"]]
+        client.post("/api/assignments/batch", json=[
+            {"title": f"Assignment for {lesson_id}", "description": "Write...", "lesson_id": lesson_id}
+            for lesson_id in chunk])
+    return quiz_ids
+
+
+def get(client, path):
+    response = client.get(path)
+    assert response.status_code == 200, (path, response.status_code)
+    return response.get_json()
+
+
+def load_n_plus_one(client, course_id, quiz_ids):
+    lessons = get(client, f"/api/courses/{course_id}/lessons")
+    for lesson in lessons:
+        get(client, f"/api/lessons/{lesson['id']}/content")
+    for quiz_id in quiz_ids:
+        get(client, f"/api/quizzes/{quiz_id}")
+    return 1 + len(lessons) + len(quiz_ids)
+
+
+def load_outline(client, course_id, quiz_ids):
+    requests = 0
+    path = f"/api/courses/{course_id}/outline?limit=1000"
+    while path:
+        page = get(client, path)
+        requests += 1
+        cursor = page["next_cursor"]
+        path = f"/api/courses/{course_id}/outline?limit=1000&after={cursor}" if cursor else None
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Course page load: N+1 requests vs. the outline endpoint")
+    parser.add_argument("--lessons", default="20,100,1000", help="comma-separated lessons per course")
+    parser.add_argument("--backend", default="memory", choices=["memory", "sqlite"])
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="network round trip added per request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        course_api.storage = create_storage(args.backend, os.path.join(tmp, "bench.db"))
+        client = course_api.app.test_client()
+        print(f"{'lessons':>8} {'mode':<10} {'requests':>9} {'app ms':>9} {f'at {args.rtt_ms:g} ms RTT':>14}")
+        try:
+            for course_id, lessons in enumerate(map(int, args.lessons.split(",")), start=1):
+                quiz_ids = seed(client, course_id, lessons)
+                for mode, load in (("n+1", load_n_plus_one), ("outline", load_outline)):
+                    load(client, course_id, quiz_ids)  # warm up caches
+                    started = time.perf_counter()
+                    for _ in range(PAGES):
+                        requests = load(client, course_id, quiz_ids)
+                    app_ms = (time.perf_counter() - started) / PAGES * 1000
+                    remote_ms = app_ms + requests * args.rtt_ms
+                    print(f"{lessons:>8} {mode:<10} {requests:>9} {app_ms:>9.1f} {remote_ms:>14.0f}")
+        finally:
+            course_api.storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_lesson_streaming.py
+# Time to first byte, total time and peak Python memory for listing one large course:
+#   - full:   GET /api/courses/<id>/lessons            (whole list jsonify'd at once)
+#   - stream: GET /api/courses/<id>/lessons?stream=1   (JSON written from a generator)
+#   - page:   GET /api/courses/<id>/lessons?limit=100  (first page only)
+#
+# Usage: python benchmarks/bench_lesson_streaming.py [--sizes 10000,100000,500000] [--backend memory|sqlite]
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as course_api  # noqa: E402
+from storage import create_storage  # noqa: E402
+
+COURSE_ID = 1
+MODES = {
+    "full": f"/api/courses/{COURSE_ID}/lessons",
+    "stream": f"/api/courses/{COURSE_ID}/lessons?stream=1",
+    "page": f"/api/courses/{COURSE_ID}/lessons?limit=100",
+}
+
+
+def measure(client, url):
+    """Returns (time to first byte, total time, peak traced memory in bytes)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    chunks = iter(response.response)
+    first_chunk = next(chunks)
+    ttfb = time.perf_counter() - start
+    received = len(first_chunk)
+    for chunk in chunks:
+        received += len(chunk)  # discard, like a socket write would
+    total = time.perf_counter() - start
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming vs full lesson listing benchmark")
+    parser.add_argument("--sizes", default="10000,100000,500000", help="lessons in the course")
+    parser.add_argument("--backend", default="memory", choices=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    print(f"{'lessons':>8} {'mode':<7} {'ttfb (ms)':>10} {'total (ms)':>11} {'peak MiB':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            course_api.storage = create_storage(args.backend, os.path.join(tmp, "bench.db"))
+            for offset in range(0, size, course_api.MAX_BATCH_SIZE):
+                count = min(course_api.MAX_BATCH_SIZE, size - offset)
+                course_api.storage.create_lessons(COURSE_ID, [(f"Lesson {offset + i}", ["intro.mp4"]) for i in range(count)])
+            client = course_api.app.test_client()
+            for mode, url in MODES.items():
+                ttfb, total, peak = measure(client, url)
+                print(f"{size:>8} {mode:<7} {ttfb * 1e3:>10.2f} {total * 1e3:>11.1f} {peak / 2**20:>9.1f}")
+            course_api.storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_memory_persistence.py
+# Warm restart of the persisted in-memory backend (memory_persistence.py) with a
+# catalog of --lessons lessons:
+#
+#   1. Build the catalog through create_lessons batches (logged, sync="commit").
+#   2. Restart from the write-ahead log alone.
+#   3. Write a snapshot while a reader thread keeps serving lookups. Reports the
+#      snapshot time and the reader's worst-case stall.
+#   4. Restart from the snapshot plus a log tail of --tail single writes.
+#   5. Group commit: single-lesson creates per second from 1 and --threads threads.
+#
+# Usage: python benchmarks/bench_memory_persistence.py [--lessons 1000000] [--dir /path/on/real/disk]
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_persistence import PersistentMemoryStorage  # noqa: E402
+
+BATCH = 1000
+
+
+def directory_mib(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2**20
+
+
+def open_storage(path):
+    storage = PersistentMemoryStorage(path, snapshot_interval=None)
+    print(f"  restart: {storage.load_seconds:.2f} s, {len(storage.db['lessons'])} lessons, "
+          f"{storage.replayed} log records replayed")
+    return storage
+
+
+def creates_per_second(storage, threads, seconds=2.0):
+    count = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(index):
+        while time.perf_counter() < deadline:
+            storage.create_lesson(10**7 + index, "Group commit lesson", [])
+            count[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return sum(count) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm restart time of the persisted memory backend")
+    parser.add_argument("--lessons", type=int, default=1000000)
+    parser.add_argument("--tail", type=int, default=10000, help="single writes logged after the snapshot")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--dir", help="parent directory for the data (default: system temp dir)")
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix="memory_persistence_", dir=args.dir)
+    try:
+        print(f"1. building {args.lessons} lessons in batches of {BATCH}")
+        storage = PersistentMemoryStorage(path, snapshot_interval=None)
+        started = time.perf_counter()
+        for first in range(0, args.lessons, BATCH):
+            count = min(BATCH, args.lessons - first)
+            storage.create_lessons(first // 100 + 1, [(f"Lesson {first + i}", ["intro.mp4"]) for i in range(count)])
+        print(f"  {time.perf_counter() - started:.1f} s, log {directory_mib(path):.0f} MiB")
+        storage.close()
+
+        print("2. restart from the log only")
+        storage = open_storage(path)
+
+        print("3. snapshot while serving lookups")
+        lesson_ids = list(storage.db["lessons"])
+        stop = threading.Event()
+        stalls = []
+
+        def reader():
+            rng = random.Random(1)
+            last = time.perf_counter()
+            worst = 0.0
+            while not stop.is_set():
+                storage.get_lesson(rng.choice(lesson_ids))
+                now = time.perf_counter()
+                worst = max(worst, now - last)
+                last = now
+            stalls.append(worst)
+
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+        started = time.perf_counter()
+        storage.snapshot()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        reader_thread.join()
+        print(f"  {elapsed:.2f} s, snapshot {directory_mib(path):.0f} MiB, "
+              f"worst reader stall {stalls[0] * 1000:.1f} ms")
+
+        for i in range(args.tail):
+            storage.update_lesson(lesson_ids[i % len(lesson_ids)], {"title": f"Updated {i}"})
+        storage.close()
+
+        print(f"4. restart from the snapshot plus {args.tail} logged updates")
+        storage = open_storage(path)
+
+        print("5. group commit (sync=\"commit\"), single-lesson creates")
+        for threads in (1, args.threads):
+            print(f"  {threads:>2} threads: {creates_per_second(storage, threads):8.0f} creates/s")
+        storage.close()
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
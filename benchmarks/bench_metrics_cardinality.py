@@ -0,0 +1,100 @@
+# benchmarks/bench_metrics_cardinality.py
+# Memory and /metrics size under adversarial label traffic, with and without
+# metrics_cardinality.SeriesLimiter.
+#
+#   1. A counter labelled by raw request path (what per-path instrumentation of
+#      routes like /user/<user_id> amounts to) fed --paths unique paths, unlimited
+#      vs. capped at --max-series.
+#   2. PrometheusMiddleware in front of a Flask app with a /user/<user_id> route,
+#      hit with random ids, random unmatched paths and junk methods.
+#
+# Usage: python benchmarks/bench_metrics_cardinality.py [--paths 200000] [--max-series 1000]
+import argparse
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from prometheus_client import CollectorRegistry, Counter, generate_latest  # noqa: E402
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from metrics_cardinality import SeriesLimiter  # noqa: E402
+from prometheus_middleware import PrometheusMiddleware  # noqa: E402
+
+
+def series_count(registry):
+    return sum(len(metric.samples) for metric in registry.collect())
+
+
+def raw_path_counter(paths, max_series):
+    registry = CollectorRegistry()
+    counter = Counter("bench_requests_total", "requests", ["path"], registry=registry)
+    dropped = Counter("bench_series_dropped", "dropped", ["metric"], registry=registry)
+    limiter = SeriesLimiter(counter, max_series, dropped=dropped) if max_series else None
+
+    tracemalloc.start()
+    for path in paths:
+        if limiter is None:
+            counter.labels(path).inc()
+        else:
+            limiter.child((path,), time.perf_counter()).inc()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory / 2**20, len(generate_latest(registry)) / 1024, series_count(registry)
+
+
+def middleware_under_attack(requests, max_series):
+    app = Flask("bench_cardinality")
+
+    @app.route("/user/<user_id>")
+    def user(user_id):
+        return "ok"
+
+    registry = CollectorRegistry()
+    PrometheusMiddleware(app, prefix="bench", registry=registry, max_series=max_series)
+    rng = random.Random(1)
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    for i in range(requests):
+        kind = i % 3
+        if kind == 0:
+            path, method = f"/user/{rng.randrange(10**9)}", "GET"
+        elif kind == 1:
+            path, method = "/" + "".join(rng.choices(string.ascii_lowercase, k=12)), "GET"
+        else:
+            path, method = f"/user/{i}", "".join(rng.choices(string.ascii_uppercase, k=6))
+        body = app(EnvironBuilder(path=path, method=method).get_environ(), start_response)
+        for _ in body:
+            pass
+        body.close()
+    return series_count(registry), len(generate_latest(registry)) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metric cardinality under adversarial label traffic")
+    parser.add_argument("--paths", type=int, default=200000)
+    parser.add_argument("--max-series", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=30000, help="requests for the middleware part")
+    args = parser.parse_args()
+
+    paths = [f"/user/{i}" for i in range(args.paths)]
+    print(f"raw path label, {args.paths} unique paths:")
+    print(f"{'mode':<10} {'heap MiB':>9} {'/metrics KiB':>13} {'samples':>9}")
+    for name, max_series in (("unlimited", None), ("limited", args.max_series)):
+        memory, size, samples = raw_path_counter(paths, max_series)
+        print(f"{name:<10} {memory:>9.1f} {size:>13.0f} {samples:>9}")
+
+    samples, size = middleware_under_attack(args.requests, args.max_series)
+    print(f"middleware, {args.requests} requests with random ids, paths and methods: "
+          f"{samples} samples, {size:.0f} KiB /metrics")
+
+
+if __name__ == "__main__":
+    main()
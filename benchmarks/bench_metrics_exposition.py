@@ -0,0 +1,54 @@
+# benchmarks/bench_metrics_exposition.py
+# Cost of serving /metrics with metrics_exposition.CachedExposition.
+#
+# Populates --routes x statuses series through PrometheusMiddleware's metrics, records
+# --requests requests, then times a burst of scrapes rendered on every call (ttl=0)
+# against the cached rendering (the default 1 s TTL). With --multiprocess it runs in
+# prometheus_client's multiprocess mode, reading the mmap files like a gunicorn scrape.
+#
+# Usage: python benchmarks/bench_metrics_exposition.py [--routes 50] [--scrapes 200] [--multiprocess]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/metrics rendering cost, cached vs. uncached")
+    parser.add_argument("--routes", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--scrapes", type=int, default=200)
+    parser.add_argument("--multiprocess", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as multiproc_dir:
+        if args.multiprocess:
+            # Must be set before prometheus_client is imported
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = multiproc_dir
+
+        from flask import Flask
+
+        from metrics_exposition import CachedExposition
+        from prometheus_middleware import PrometheusMiddleware
+
+        app = Flask("bench_exposition")
+        metrics = PrometheusMiddleware(app, prefix="bench")
+        for i in range(args.requests):
+            metrics.record("GET", f"/route_{i % args.routes}/<item_id>", ("200", "404", "500")[i % 3],
+                           (i % 100) / 1000, time.perf_counter())
+
+        for name, ttl in (("uncached", 0), ("cached", 1.0)):
+            exposition = CachedExposition(ttl=ttl)
+            size = len(exposition.render())
+            started = time.perf_counter()
+            for _ in range(args.scrapes):
+                exposition.render()
+            elapsed = time.perf_counter() - started
+            print(f"{name:<9} {elapsed / args.scrapes * 1000:8.3f} ms/scrape  ({size / 1024:.0f} KiB output)")
+
+
+if __name__ == "__main__":
+    main()
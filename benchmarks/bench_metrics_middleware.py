@@ -0,0 +1,97 @@
+# benchmarks/bench_metrics_middleware.py
+# Per-request overhead of prometheus_middleware.PrometheusMiddleware.
+#
+# Calls a minimal Flask app's WSGI callable directly (no server, no test client), so
+# the difference between modes is the instrumentation cost itself:
+#   - bare:        no metrics
+#   - hand-coded:  the old app_with_metrics.py pattern: time.time() plus .labels() on
+#                  every request
+#   - middleware:  PrometheusMiddleware with cached label children
+# Fails (exit status 1) if the middleware overhead exceeds --budget-us.
+#
+# Usage: python benchmarks/bench_metrics_middleware.py [--requests 50000] [--budget-us 25]
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from prometheus_client import CollectorRegistry, Counter, Histogram  # noqa: E402
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from prometheus_middleware import PrometheusMiddleware  # noqa: E402
+
+
+def build_app(mode):
+    app = Flask(f"bench_{mode}")
+    registry = CollectorRegistry()
+
+    if mode == "hand-coded":
+        requests_total = Counter("bench_requests_total", "requests", ["method", "endpoint", "status_code"],
+                                 registry=registry)
+        latency = Histogram("bench_request_latency_seconds", "latency", ["method", "endpoint"], registry=registry)
+
+        @app.route("/user/<user_id>")
+        def user(user_id):
+            start_time = time.time()
+            requests_total.labels(method="GET", endpoint="/user/<user_id>", status_code=200).inc()
+            latency.labels(method="GET", endpoint="/user/<user_id>").observe(time.time() - start_time)
+            return "ok"
+    else:
+        @app.route("/user/<user_id>")
+        def user(user_id):
+            return "ok"
+
+    if mode == "middleware":
+        PrometheusMiddleware(app, prefix="bench", registry=registry)
+    return app
+
+
+def measure(apps, requests):
+    """
+    Median microseconds per request for each app. The apps take turns request by
+    request, so drift and noise from other processes hit every mode alike.
+    """
+    base_environ = EnvironBuilder(path="/user/42").get_environ()
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    samples = {mode: [] for mode in apps}
+    perf_counter = time.perf_counter
+    for _ in range(requests):
+        for mode, app in apps.items():
+            started = perf_counter()
+            body = app(dict(base_environ), start_response)
+            for _ in body:
+                pass
+            body.close()
+            samples[mode].append(perf_counter() - started)
+    return {mode: statistics.median(times) * 1e6 for mode, times in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prometheus middleware overhead benchmark")
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--budget-us", type=float, default=25.0, help="allowed middleware overhead per request")
+    args = parser.parse_args()
+
+    apps = {mode: build_app(mode) for mode in ("bare", "hand-coded", "middleware")}
+    results = measure(apps, args.requests)
+
+    print(f"{'mode':<12} {'us/request':>10} {'overhead us':>12}")
+    for mode, per_request in results.items():
+        print(f"{mode:<12} {per_request:>10.2f} {per_request - results['bare']:>12.2f}")
+
+    overhead = results["middleware"] - results["bare"]
+    if overhead > args.budget_us:
+        print(f"middleware overhead {overhead:.2f} us exceeds the {args.budget_us} us budget")
+        sys.exit(1)
+    print(f"middleware overhead {overhead:.2f} us is within the {args.budget_us} us budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_otel_sampling.py
+# Per-request latency of a Flask app like app_with_otel.py (without its simulated
+# sleeps) under different tracing configurations:
+#
+#   off        no instrumentation
+#   full       every trace sampled and exported
+#   sampled    parent-based --ratio head sampling
+#   tail-keep  --ratio head sampling, unsampled traces recorded for the tail-keep rule
+#   limited    full sampling capped at --max-per-second traces per second
+#
+# Spans go through the tuned BatchSpanProcessor to an exporter that only counts them,
+# so the numbers are the in-request tracing overhead, not export I/O. Requests are
+# interleaved across the apps and medians compared, so drift affects every mode alike.
+#
+# Usage: python benchmarks/bench_otel_sampling.py [--requests 20000] [--ratio 0.1]
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from opentelemetry.instrumentation.flask import FlaskInstrumentor  # noqa: E402
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult  # noqa: E402
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON  # noqa: E402
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from otel_sampling import TailKeepSpanProcessor, build_sampler, tuned_batch_processor  # noqa: E402
+
+
+class CountingExporter(SpanExporter):
+    def __init__(self):
+        self.exported = 0
+
+    def export(self, spans):
+        self.exported += len(spans)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def make_app(name, sampler=None, tail_keep=False):
+    app = Flask(name)
+    provider = exporter = None
+    if sampler is not None:
+        exporter = CountingExporter()
+        provider = TracerProvider(sampler=sampler)
+        processor = tuned_batch_processor(exporter)
+        if tail_keep:
+            processor = TailKeepSpanProcessor(processor, slow_threshold=0.5)
+        provider.add_span_processor(processor)
+        FlaskInstrumentor().instrument_app(app, tracer_provider=provider)
+    tracer = (provider or TracerProvider(sampler=build_sampler(0.0))).get_tracer(name)
+
+    @app.route("/user/<user_id>")
+    def user_profile(user_id):
+        with tracer.start_as_current_span("fetch_user_details") as db_span:
+            db_span.set_attribute("db.system", "simulated_db")
+            return f"Profile for User_{user_id}"
+
+    return app, provider, exporter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request latency with tracing off, full and sampled")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--ratio", type=float, default=0.1)
+    parser.add_argument("--max-per-second", type=float, default=100)
+    args = parser.parse_args()
+
+    modes = {
+        "off": make_app("off"),
+        "full": make_app("full", ALWAYS_ON),
+        "sampled": make_app("sampled", build_sampler(args.ratio)),
+        "tail-keep": make_app("tail_keep", build_sampler(args.ratio, tail_keep=True), tail_keep=True),
+        "limited": make_app("limited", build_sampler(1.0, max_per_second=args.max_per_second)),
+    }
+    environs = [EnvironBuilder(path=f"/user/{i}").get_environ() for i in range(100)]
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    timings = {name: [] for name in modes}
+    started = time.perf_counter()
+    for i in range(args.requests):
+        for name, (app, _, _) in modes.items():
+            begin = time.perf_counter()
+            body = app(dict(environs[i % 100]), start_response)
+            for _ in body:
+                pass
+            body.close()
+            timings[name].append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - started
+
+    baseline = statistics.median(timings["off"])
+    print(f"{args.requests} requests per mode over {elapsed:.1f} s, head ratio {args.ratio}, "
+          f"limit {args.max_per_second:g}/s")
+    print(f"{'mode':<10} {'p50 us':>8} {'p99 us':>8} {'overhead us':>12} {'spans exported':>15}")
+    for name, (_, provider, exporter) in modes.items():
+        samples = sorted(timings[name])
+        if provider is not None:
+            provider.force_flush()
+        exported = exporter.exported if exporter is not None else 0
+        p50 = statistics.median(samples)
+        p99 = samples[int(len(samples) * 0.99)]
+        print(f"{name:<10} {p50 * 1e6:>8.1f} {p99 * 1e6:>8.1f} {(p50 - baseline) * 1e6:>12.1f} {exported:>15}")
+        if provider is not None:
+            provider.shutdown()
+
+
+if __name__ == "__main__":
+    main()
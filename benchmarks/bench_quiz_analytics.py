@@ -0,0 +1,69 @@
+# benchmarks/bench_quiz_analytics.py
+# Quiz analytics read time as submissions accumulate: the running QuizStats
+# (quiz_analytics.py) vs. recomputing difficulty and point-biserial from every
+# stored submission on each read. Also reports the cost of updating the stats per
+# graded batch.
+#
+# Usage: python benchmarks/bench_quiz_analytics.py [--questions 50] [--batches 20] [--batch-size 5000]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from quiz_analytics import QuizStats  # noqa: E402
+from quiz_grading import CompiledQuiz  # noqa: E402
+from storage import MemoryStorage  # noqa: E402
+
+
+def recompute(submissions):
+    """Analytics from scratch: every submission's correctness row is read again."""
+    correct = np.array([submission["correct"] for submission in submissions], dtype=np.float64)
+    scores = np.array([submission["score"] for submission in submissions], dtype=np.float64)
+    difficulty = correct.mean(axis=0)
+    discrimination = [np.corrcoef(correct[:, j], scores)[0, 1] for j in range(correct.shape[1])]
+    return difficulty, discrimination
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental vs. recomputed quiz analytics")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    questions = [{"q": f"Question {j}", "a": str(j)} for j in range(args.questions)]
+    compiled = CompiledQuiz({"id": 1, "questions": questions})
+    storage = MemoryStorage()
+
+    print(f"{'submissions':>11} {'update ms':>10} {'incremental ms':>15} {'recompute ms':>13}")
+    for batch in range(1, args.batches + 1):
+        answers = [[str(j) if rng.random() < 0.4 + 0.5 * j / args.questions else "x" for j in range(args.questions)]
+                   for _ in range(args.batch_size)]
+        graded = compiled.grade(answers)
+        items = [(str(i), row, score, graded.max_score, correct)
+                 for i, (row, score, correct) in enumerate(zip(answers, graded.scores.tolist(), graded.correct.tolist()))]
+        started = time.perf_counter()
+        stats = QuizStats.from_graded(graded, compiled.num_questions)
+        update = time.perf_counter() - started
+        storage.create_submissions(1, items, stats=stats)
+
+        if batch % max(1, args.batches // 5) and batch != args.batches:
+            continue
+        started = time.perf_counter()
+        storage.get_quiz_stats(1).report(questions)
+        incremental = time.perf_counter() - started
+        started = time.perf_counter()
+        recompute(list(storage.db["submissions"].values()))
+        full = time.perf_counter() - started
+        print(f"{batch * args.batch_size:>11} {update * 1000:>10.2f} {incremental * 1000:>15.3f} {full * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
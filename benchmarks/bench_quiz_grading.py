@@ -0,0 +1,88 @@
+# benchmarks/bench_quiz_grading.py
+# Submissions graded per second for a cohort-sized batch (--students submissions of a
+# --questions question quiz):
+#
+#   loop        grading each submission with a Python loop over its answers
+#   vectorized  quiz_grading.CompiledQuiz.grade on the whole batch (first batch, then
+#               a second batch with the spelling cache warm)
+#   endpoint    POST /api/quizzes/<id>/submissions/batch through the Flask test client,
+#               JSON parsing, validation, storage and the response included
+#
+# About 70% of answers are correct, and some have stray whitespace or different case.
+#
+# Usage: python benchmarks/bench_quiz_grading.py [--students 10000] [--questions 50]
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_grading import CompiledQuiz, normalize_answer  # noqa: E402
+
+
+def make_answers(rng, keys, students):
+    def answer(key):
+        roll = rng.random()
+        if roll < 0.6:
+            return key
+        if roll < 0.7:
+            return f" {key.upper()} "
+        if roll < 0.75:
+            return None
+        return str(rng.randrange(1000))
+
+    return [[answer(key) for key in keys] for _ in range(students)]
+
+
+def grade_loop(questions, answers_batch):
+    """The straightforward per-submission grader the engine replaces."""
+    keys = [normalize_answer(question["a"]) for question in questions]
+    results = []
+    for answers in answers_batch:
+        correct = [answer is not None and normalize_answer(answer) == key for answer, key in zip(answers, keys)]
+        results.append((sum(correct), correct))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz grading throughput, per-submission loop vs. vectorized")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    questions = [{"q": f"Question {i}", "a": f"answer {rng.randrange(1000)}"} for i in range(args.questions)]
+    keys = [question["a"] for question in questions]
+    batches = [make_answers(rng, keys, args.students) for _ in range(2)]
+    print(f"{args.students} submissions x {args.questions} questions")
+
+    started = time.perf_counter()
+    grade_loop(questions, batches[0])
+    elapsed = time.perf_counter() - started
+    print(f"{'loop':<22} {args.students / elapsed:>10.0f} submissions/s")
+
+    compiled = CompiledQuiz({"id": 1, "questions": questions})
+    for name, batch in (("vectorized (cold)", batches[0]), ("vectorized (warm)", batches[1])):
+        started = time.perf_counter()
+        compiled.grade(batch)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<22} {args.students / elapsed:>10.0f} submissions/s")
+
+    import app as course_api
+
+    client = course_api.app.test_client()
+    quiz = client.post("/api/quizzes", json={"title": "Exam", "questions": questions}).get_json()
+    body = json.dumps([{"student_id": f"student-{i}", "answers": answers} for i, answers in enumerate(batches[1])])
+    started = time.perf_counter()
+    response = client.post(f"/api/quizzes/{quiz['id']}/submissions/batch", data=body, content_type="application/json")
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 201, response.get_json()
+    print(f"{'endpoint':<22} {args.students / elapsed:>10.0f} submissions/s")
+
+
+if __name__ == "__main__":
+    main()
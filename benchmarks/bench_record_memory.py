@@ -0,0 +1,129 @@
+# benchmarks/bench_record_memory.py
+# Bytes per entity of the memory backend's catalog: the compact records from
+# records.py vs. the dict-per-entity layout they replaced (reproduced below), at
+# 100k, 1M and 5M entities.
+#
+# The catalog is 80% lessons (two content ids each, from a pool of 1000 filenames),
+# 10% quizzes (three questions) and 10% assignments, created through the batch
+# methods from JSON-decoded batches like the API's request bodies. Each layout and
+# size runs in a fresh subprocess, and the figure is its RSS growth per entity.
+#
+# Usage: python benchmarks/bench_record_memory.py [--sizes 100000,1000000,5000000]
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import MemoryStorage  # noqa: E402
+
+BATCH = 1000
+ANSWERS = ["True", "False", "A", "B", "C", "D", "42", "Paris"]
+
+
+class DictLayoutStorage:
+    """The MemoryStorage layout before records.py: a dict per entity, dict-as-set course indexes, a versions dict."""
+
+    def __init__(self):
+        self.db = {"courses": {}, "lessons": {}, "quizzes": {}, "assignments": {}}
+        self.versions = {}
+        self.next_id = 1
+        self._lock = threading.RLock()
+
+    def _ids(self, count):
+        first = self.next_id
+        self.next_id += count
+        return first
+
+    def create_lessons(self, course_id, items):
+        first_id = self._ids(len(items))
+        with self._lock:
+            course = self.db["courses"].setdefault(
+                course_id, {"id": course_id, "name": f"Course {course_id}", "lesson_ids": {}})
+            for i, (title, content_ids) in enumerate(items):
+                lesson = {"id": first_id + i, "course_id": course_id, "title": title, "content_ids": content_ids}
+                self.db["lessons"][lesson["id"]] = lesson
+                course["lesson_ids"][lesson["id"]] = None
+                self.versions[("lesson", lesson["id"])] = 1
+
+    def create_quizzes(self, items):
+        first_id = self._ids(len(items))
+        with self._lock:
+            for i, (title, questions, lesson_id) in enumerate(items):
+                self.db["quizzes"][first_id + i] = {"id": first_id + i, "title": title, "questions": questions,
+                                                    "lesson_id": lesson_id}
+                self.versions[("quiz", first_id + i)] = 1
+
+    def create_assignments(self, items):
+        first_id = self._ids(len(items))
+        with self._lock:
+            for i, (title, description, lesson_id) in enumerate(items):
+                self.db["assignments"][first_id + i] = {"id": first_id + i, "title": title,
+                                                        "description": description, "lesson_id": lesson_id}
+                self.versions[("assignment", first_id + i)] = 1
+
+
+def rss_bytes():
+    # Current RSS where /proc is available; the catalog only grows, so peak RSS is close otherwise
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is KiB on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def load(storage, entities, rng):
+    lessons = entities * 8 // 10
+    quizzes = assignments = (entities - lessons) // 2
+    for first in range(0, lessons, BATCH):
+        items = [[f"Lesson {first + i}", [f"video{rng.randrange(1000)}.mp4", f"notes{rng.randrange(1000)}.pdf"]]
+                 for i in range(min(BATCH, lessons - first))]
+        storage.create_lessons(first // 500 + 1, [tuple(item) for item in json.loads(json.dumps(items))])
+    for first in range(0, quizzes, BATCH):
+        items = [[f"Quiz {first + i}", [{"q": f"Question {j} of quiz {first + i}", "a": rng.choice(ANSWERS)}
+                                        for j in range(3)], rng.randrange(1, lessons + 1)]
+                 for i in range(min(BATCH, quizzes - first))]
+        storage.create_quizzes([tuple(item) for item in json.loads(json.dumps(items))])
+    for first in range(0, assignments, BATCH):
+        items = [[f"Assignment {first + i}", "Write an essay on the lesson.", rng.randrange(1, lessons + 1)]
+                 for i in range(min(BATCH, assignments - first))]
+        storage.create_assignments([tuple(item) for item in json.loads(json.dumps(items))])
+    return lessons + quizzes + assignments
+
+
+def child(layout, entities):
+    storage = MemoryStorage() if layout == "records" else DictLayoutStorage()
+    before = rss_bytes()
+    created = load(storage, entities, random.Random(1))
+    print(json.dumps({"bytes": rss_bytes() - before, "entities": created}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per entity: compact records vs. dicts")
+    parser.add_argument("--sizes", default="100000,1000000,5000000", help="comma-separated entity counts")
+    parser.add_argument("--child", nargs=2, metavar=("LAYOUT", "ENTITIES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'entities':>10} {'dicts B/entity':>15} {'records B/entity':>17} {'saved':>7}")
+    for entities in map(int, args.sizes.split(",")):
+        per_entity = {}
+        for layout in ("dicts", "records"):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", layout, str(entities)],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            per_entity[layout] = result["bytes"] / result["entities"]
+        saved = 1 - per_entity["records"] / per_entity["dicts"]
+        print(f"{entities:>10} {per_entity['dicts']:>15.0f} {per_entity['records']:>17.0f} {saved:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
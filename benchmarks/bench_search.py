@@ -0,0 +1,115 @@
+# benchmarks/bench_search.py
+# Indexing throughput and query latency of the search index (search_index.py) at
+# 100k, 1M and 5M documents.
+#
+# The documents are 80% lessons, 10% quizzes (three questions) and 10% assignments.
+# Their words come from a 50k-word vocabulary with Zipf-like frequencies, like natural
+# text. After the initial build, 1% of the documents are updated and 1% deleted
+# through the same calls the API handlers make. Queries are timed over single
+# rare terms, single common terms, three-term mixes, and lessons of one course.
+#
+# Usage: python benchmarks/bench_search.py [--sizes 100000,1000000,5000000] [--queries 200]
+import argparse
+import os
+import random
+import sys
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex  # noqa: E402
+
+VOCABULARY = 50000
+LESSONS_PER_COURSE = 500
+
+
+class Corpus:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        # Zipf-like: word i is drawn with weight 1 / (i + 1)
+        self.words = [f"w{i}" for i in range(VOCABULARY)]
+        self.cum_weights = list(accumulate(1 / (i + 1) for i in range(VOCABULARY)))
+
+    def text(self, words):
+        return " ".join(self.rng.choices(self.words, cum_weights=self.cum_weights, k=words))
+
+    def entity(self, entity_id, size):
+        lessons = size * 8 // 10
+        if entity_id <= lessons:
+            return "lesson", {"id": entity_id, "course_id": (entity_id - 1) // LESSONS_PER_COURSE + 1,
+                              "title": self.text(6), "content_ids": []}
+        if entity_id <= lessons + size // 10:
+            return "quiz", {"id": entity_id, "title": self.text(4), "lesson_id": None,
+                            "questions": [{"q": self.text(10), "a": "x"} for _ in range(3)]}
+        return "assignment", {"id": entity_id, "title": self.text(4), "description": self.text(30),
+                              "lesson_id": None}
+
+
+def build(index, corpus, size):
+    """Indexes `size` documents in batches; returns the seconds spent in the index, not generating text."""
+    batches = {}
+    elapsed = 0.0
+    for entity_id in range(1, size + 1):
+        kind, entity = corpus.entity(entity_id, size)
+        batches.setdefault(kind, []).append(entity)
+        if len(batches[kind]) == 10000 or entity_id == size:
+            started = time.perf_counter()
+            for batch_kind, entities in batches.items():
+                index.add_many(batch_kind, entities)
+            elapsed += time.perf_counter() - started
+            batches = {}
+    return elapsed
+
+
+def time_queries(index, queries, **filters):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, **filters)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search index build throughput and query latency")
+    parser.add_argument("--sizes", default="100000,1000000,5000000", help="comma-separated document counts")
+    parser.add_argument("--queries", type=int, default=200, help="queries per query type")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'documents':>10} {'build docs/s':>12} {'update/s':>9} {'query':<16} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in map(int, args.sizes.split(",")):
+        corpus = Corpus(args.seed)
+        index = SearchIndex()
+        build_rate = size / build(index, corpus, size)
+
+        # One update or delete at a time, as the handlers do
+        changes = [corpus.entity(entity_id, size) for entity_id in corpus.rng.sample(range(1, size + 1), size // 50)]
+        started = time.perf_counter()
+        for i, (kind, entity) in enumerate(changes):
+            if i % 2:
+                index.remove(kind, entity["id"])
+            else:
+                index.add(kind, entity)
+        update_rate = len(changes) / (time.perf_counter() - started)
+
+        rng = random.Random(args.seed)
+        queries = {
+            "rare term": [f"w{rng.randrange(VOCABULARY // 2, VOCABULARY)}" for _ in range(args.queries)],
+            "common term": [f"w{rng.randrange(10)}" for _ in range(args.queries)],
+            "three terms": [f"w{rng.randrange(100)} w{rng.randrange(1000)} w{rng.randrange(VOCABULARY)}"
+                            for _ in range(args.queries)],
+        }
+        rows = [(name, time_queries(index, texts)) for name, texts in queries.items()]
+        course = rng.randrange(1, size * 8 // 10 // LESSONS_PER_COURSE + 1)
+        rows.append(("one course", time_queries(index, queries["three terms"], kinds=["lesson"], course_id=course)))
+        for i, (name, (p50, p99)) in enumerate(rows):
+            prefix = f"{size:>10} {build_rate:>12.0f} {update_rate:>9.0f}" if i == 0 else " " * 33
+            print(f"{prefix} {name:<16} {p50:>8.2f} {p99:>8.2f}")
+        print(f"{'':>10} {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_storage.py
+# Compares reads and writes per second for the storage backends in storage.py.
+#
+# The SQLite backend can also be driven from several processes at once, which is how
+# it runs under `gunicorn -w N` (every worker opens the same WAL database).
+#
+# Usage: python benchmarks/bench_storage.py [--ops 20000] [--processes 1,4]
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import MemoryStorage, SQLiteStorage  # noqa: E402
+
+LESSONS_PER_COURSE = 20
+
+
+def run_workload(storage, ops):
+    """Creates `ops` lessons, then reads each one back and lists their courses."""
+    start = time.perf_counter()
+    lesson_ids = [
+        storage.create_lesson(i // LESSONS_PER_COURSE + 1, f"Lesson {i}", ["intro.mp4"])["id"]
+        for i in range(ops)
+    ]
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for lesson_id in lesson_ids:
+        storage.get_lesson(lesson_id)
+    read_seconds = time.perf_counter() - start
+
+    courses = max(1, ops // LESSONS_PER_COURSE)
+    start = time.perf_counter()
+    for course_id in range(1, courses + 1):
+        storage.list_course_lessons(course_id)
+    list_seconds = time.perf_counter() - start
+    return ops / write_seconds, ops / read_seconds, courses / list_seconds
+
+
+def _sqlite_worker(path, ops, results):
+    storage = SQLiteStorage(path)
+    results.put(run_workload(storage, ops))
+    storage.close()
+
+
+def bench_sqlite_processes(path, ops, processes):
+    """Runs the workload in `processes` processes sharing one database; returns aggregate rates."""
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_sqlite_worker, args=(path, ops, results)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    rates = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return tuple(sum(rate[i] for rate in rates) for i in range(3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage backend throughput benchmark")
+    parser.add_argument("--ops", type=int, default=20000, help="lessons created/read per process")
+    parser.add_argument("--processes", default="1,4", help="process counts for the SQLite backend")
+    args = parser.parse_args()
+
+    print(f"{'backend':<22} {'writes/s':>12} {'reads/s':>12} {'course lists/s':>15}")
+    writes, reads, lists = run_workload(MemoryStorage(), args.ops)
+    print(f"{'memory':<22} {writes:>12.0f} {reads:>12.0f} {lists:>15.0f}")
+
+    for processes in (int(p) for p in args.processes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            SQLiteStorage(path).close()  # create the schema once up front
+            writes, reads, lists = bench_sqlite_processes(path, args.ops, processes)
+        print(f"{f'sqlite x{processes} proc':<22} {writes:>12.0f} {reads:>12.0f} {lists:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
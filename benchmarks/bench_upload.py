@@ -0,0 +1,96 @@
+# benchmarks/bench_upload.py
+# Upload throughput and peak RSS while streaming a large video through
+#   - POST /api/content/upload-video?filename=...        (single streamed request)
+#   - /api/content/uploads/<session>  in --chunk-mb chunks (resumable session)
+#
+# The request body is generated on the fly, so the only way RSS can grow with the
+# upload size is if the server buffers it. Peak RSS should stay flat.
+#
+# Usage: python benchmarks/bench_upload.py [--size-gb 5] [--chunk-mb 64] [--dir /path/with/space]
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BLOCK = os.urandom(1024 * 1024)
+
+
+class GeneratedStream:
+    """A readable stream of `size` bytes that never holds more than one block in memory."""
+
+    def __init__(self, size):
+        self.size = size
+        self.remaining = size
+
+    # tell()/seek() only exist so werkzeug's test client can measure the length
+    def tell(self):
+        return self.size - self.remaining
+
+    def seek(self, offset, whence=0):
+        self.remaining = 0 if whence == 2 else self.size - offset
+
+    def read(self, n=-1):
+        if self.remaining <= 0:
+            return b""
+        n = len(BLOCK) if n is None or n < 0 else min(n, len(BLOCK))
+        n = min(n, self.remaining)
+        self.remaining -= n
+        return BLOCK[:n]
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming upload throughput / memory benchmark")
+    parser.add_argument("--size-gb", type=float, default=1.0)
+    parser.add_argument("--chunk-mb", type=int, default=64, help="chunk size for the resumable session")
+    parser.add_argument("--dir", default=None, help="content storage directory (needs size-gb of free space)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        os.environ["CONTENT_STORAGE_DIR"] = tmp
+        import app as course_api
+
+        client = course_api.app.test_client()
+        size = int(args.size_gb * 2**30)
+        print(f"baseline peak RSS: {peak_rss_mib():.1f} MiB, upload size: {size / 2**30:.2f} GiB")
+
+        start = time.perf_counter()
+        response = client.post(
+            "/api/content/upload-video?filename=lecture.mp4",
+            input_stream=GeneratedStream(size),
+            content_type="application/octet-stream",
+        )
+        elapsed = time.perf_counter() - start
+        assert response.status_code in (200, 201), response.get_json()
+        print(f"streamed:  {size / 2**20 / elapsed:8.1f} MiB/s, peak RSS {peak_rss_mib():.1f} MiB")
+        os.remove(course_api.upload_store.content_path("video", "lecture.mp4"))
+
+        session = client.post("/api/content/uploads", json={"filename": "lecture2.mp4", "type": "video", "size": size}).get_json()
+        chunk = args.chunk_mb * 2**20
+        start = time.perf_counter()
+        for offset in range(0, size, chunk):
+            length = min(chunk, size - offset)
+            response = client.put(
+                f"/api/content/uploads/{session['id']}",
+                input_stream=GeneratedStream(length),
+                content_type="application/octet-stream",
+                headers={"Upload-Offset": str(offset)},
+            )
+            assert response.status_code == 200, response.get_json()
+        response = client.post(f"/api/content/uploads/{session['id']}/complete")
+        elapsed = time.perf_counter() - start
+        assert response.status_code in (200, 201), response.get_json()
+        print(f"resumable: {size / 2**20 / elapsed:8.1f} MiB/s, peak RSS {peak_rss_mib():.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
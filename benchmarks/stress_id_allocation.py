@@ -0,0 +1,99 @@
+# benchmarks/stress_id_allocation.py
+# Multithreaded stress test for lesson/quiz/assignment creation.
+#
+# Many threads create lessons (spread over a few shared courses), quizzes and
+# assignments at the same time, through the Flask app as it runs under a threaded
+# server. Afterwards it checks that:
+#   - no id was handed out twice,
+#   - every created lesson is stored and appears in its course's lesson list
+#     exactly once (no lost lesson_ids).
+# It reports creates per second for each thread count. Exits non-zero on any failure.
+#
+# Usage: python benchmarks/stress_id_allocation.py [--threads 1,2,4,8,16] [--backend memory|sqlite]
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as course_api  # noqa: E402
+from storage import create_storage  # noqa: E402
+
+COURSES = 4
+
+
+def worker(client, creates, barrier, results):
+    barrier.wait()
+    lessons, quizzes, assignments = [], [], []
+    for i in range(creates):
+        course_id = i % COURSES + 1
+        lesson = client.post(f"/api/courses/{course_id}/lessons", json={"title": f"Lesson {i}"}).get_json()
+        lessons.append((lesson["id"], course_id))
+        if i % 4 == 0:
+            quizzes.append(client.post("/api/quizzes", json={"title": "Q", "questions": []}).get_json()["id"])
+            assignments.append(client.post("/api/assignments", json={"title": "A", "description": "D"}).get_json()["id"])
+    results.append((lessons, quizzes, assignments))
+
+
+def run(threads, creates, backend, sqlite_path):
+    course_api.storage = create_storage(backend, sqlite_path)
+    barrier = threading.Barrier(threads + 1)
+    results = []
+    pool = [
+        threading.Thread(target=worker, args=(course_api.app.test_client(), creates, barrier, results))
+        for _ in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    errors = []
+    lessons = [lesson for result in results for lesson in result[0]]
+    for kind, ids in (
+        ("lesson", [lesson_id for lesson_id, _ in lessons]),
+        ("quiz", [quiz_id for result in results for quiz_id in result[1]]),
+        ("assignment", [assignment_id for result in results for assignment_id in result[2]]),
+    ):
+        duplicates = [entity_id for entity_id, count in Counter(ids).items() if count > 1]
+        if duplicates:
+            errors.append(f"{len(duplicates)} duplicate {kind} ids, e.g. {duplicates[:5]}")
+
+    listed = Counter()
+    for course_id in range(1, COURSES + 1):
+        listed.update(lesson["id"] for lesson in course_api.storage.list_course_lessons(course_id))
+    lost = [lesson_id for lesson_id, _ in lessons if listed[lesson_id] != 1]
+    if lost:
+        errors.append(f"{len(lost)} lesson ids missing from (or repeated in) course lists, e.g. {lost[:5]}")
+
+    course_api.storage.close()
+    total_creates = len(lessons) + sum(len(r[1]) + len(r[2]) for r in results)
+    return total_creates / elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent create stress test")
+    parser.add_argument("--threads", default="1,2,4,8,16")
+    parser.add_argument("--creates", type=int, default=2000, help="lessons created per thread")
+    parser.add_argument("--backend", default="memory", choices=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'threads':>8} {'creates/s':>12}  result")
+    for threads in (int(t) for t in args.threads.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            rate, errors = run(threads, args.creates, args.backend, os.path.join(tmp, "stress.db"))
+        print(f"{threads:>8} {rate:>12.0f}  {'OK' if not errors else 'FAIL: ' + '; '.join(errors)}")
+        failed = failed or bool(errors)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,179 @@
 # cdn_url_helper.py
+# Static asset URLs, fingerprinted by content hash so the CDN and browsers can cache them forever.
+#
+# Build time: `python cdn_url_helper.py build static/` hashes every file under the
+# static root (in parallel), copies each one to a content-hashed name next to it
+# (css/main.css -> css/main.3f2a9c1d0b7e.css) and writes a manifest mapping logical
+# paths to hashed ones. A changed file gets a new name, so stale copies are never served.
+#
+# Runtime: the manifest is loaded once into a read-only dict, and get_asset_url() is
+# memoized, so templates rendering hundreds of assets pay a cache lookup per URL.
+# Assets not in the manifest (or no manifest at all) keep their plain paths.
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
 
 # --- Configuration (would typically come from a config file or environment variables) ---
 IS_PRODUCTION = True  # Set to False for development to serve locally
 CDN_DOMAIN = "https://d123abcdef.cloudfront.net"  # Example CDN domain
 # Alternatively, use a custom CNAME like "https://cdn.yourcoolsite.com"
 LOCAL_STATIC_PREFIX = "/static"
+# Written by `python cdn_url_helper.py build`; a missing file means plain (unhashed) URLs
+ASSET_MANIFEST_PATH = os.environ.get("ASSET_MANIFEST_PATH", os.path.join("static", "asset-manifest.json"))
 # --- End Configuration ---
 
+HASH_LENGTH = 12
+# The name fingerprinted_name() gives a file: "<stem>.<HASH_LENGTH hex digits>" plus the extension
+_FINGERPRINT_RE = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}(\.[^./]*)?$")
+# Hashed names never change content, so they can be cached for a year without revalidating
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Plain names can change in place; caches must check back
+MUTABLE_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+_manifest = None
+_fingerprinted = frozenset()
+_manifest_lock = threading.Lock()
+
+
+# --- Build time ---
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        # hashlib releases the GIL on large updates, so threads hash files in parallel
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted_name(logical_path, digest):
+    """"css/main.css" + digest -> "css/main.<digest>.css"."""
+    root, ext = os.path.splitext(logical_path)
+    return f"{root}.{digest}{ext}"
+
+
+def is_fingerprinted(logical_path):
+    """True if the file name already carries a content hash, as the copies build_manifest() writes do."""
+    return _FINGERPRINT_RE.search(logical_path.rsplit("/", 1)[-1]) is not None
+
+
+def hash_assets(static_root, exclude=(), workers=None):
+    """
+    Content-hashes every file under `static_root`, except files whose names are
+    already fingerprinted: those are the hashed copies of earlier builds (including
+    ones no longer in the manifest), and hashing them again would give names like
+    main.<hash>.<hash>.css. A source file must not be named like a hashed copy.
+
+    Args:
+        static_root: Directory to walk.
+        exclude: Logical paths (relative, with forward slashes) to skip.
+        workers: Hashing threads (default: CPU count).
+
+    Returns:
+        {logical path: fingerprinted logical path}.
+    """
+    exclude = set(exclude)
+    logical_paths = []
+    for directory, _, filenames in os.walk(static_root):
+        for filename in filenames:
+            logical = os.path.relpath(os.path.join(directory, filename), static_root).replace(os.sep, "/")
+            if logical not in exclude and not is_fingerprinted(logical):
+                logical_paths.append(logical)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        digests = pool.map(lambda logical: _file_digest(os.path.join(static_root, logical)), logical_paths)
+        return {logical: fingerprinted_name(logical, digest) for logical, digest in zip(logical_paths, digests)}
+
+
+def build_manifest(static_root, manifest_path=None, workers=None):
+    """
+    Hashes the static tree, writes a fingerprinted copy of each file next to it and
+    writes the manifest (atomically). Rebuilding is safe: hashed copies from earlier
+    builds are not hashed again, and unchanged files keep their names.
+
+    Returns:
+        The manifest dict.
+    """
+    manifest_path = manifest_path or os.path.join(static_root, "asset-manifest.json")
+    manifest_logical = os.path.relpath(manifest_path, static_root).replace(os.sep, "/")
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    manifest = hash_assets(static_root, exclude={manifest_logical, *previous.values()}, workers=workers)
+    for logical, hashed in manifest.items():
+        target = os.path.join(static_root, hashed)
+        if not os.path.exists(target):
+            shutil.copy2(os.path.join(static_root, logical), target)
+
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+# --- Runtime ---
+def load_manifest(path=None):
+    """Reads a manifest into a read-only dict; an empty one if the file doesn't exist."""
+    try:
+        with open(path or ASSET_MANIFEST_PATH) as f:
+            return MappingProxyType(json.load(f))
+    except FileNotFoundError:
+        return MappingProxyType({})
+
+
+def _get_manifest():
+    global _manifest, _fingerprinted
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                manifest = load_manifest()
+                _fingerprinted = frozenset(manifest.values())
+                _manifest = manifest
+    return _manifest
+
+
+def configure(is_production=None, cdn_domain=None, local_static_prefix=None, manifest=None):
+    """
+    Changes the configuration at runtime and drops memoized URLs.
+
+    Args:
+        manifest: A {logical: fingerprinted} mapping, or None to reload ASSET_MANIFEST_PATH
+                  on next use.
+    """
+    global IS_PRODUCTION, CDN_DOMAIN, LOCAL_STATIC_PREFIX, _manifest, _fingerprinted
+    with _manifest_lock:
+        if is_production is not None:
+            IS_PRODUCTION = is_production
+        if cdn_domain is not None:
+            CDN_DOMAIN = cdn_domain
+        if local_static_prefix is not None:
+            LOCAL_STATIC_PREFIX = local_static_prefix
+        _manifest = MappingProxyType(dict(manifest)) if manifest is not None else None
+        _fingerprinted = frozenset(_manifest.values()) if _manifest is not None else frozenset()
+        get_asset_url.cache_clear()
+
+
+@lru_cache(maxsize=4096)
 def get_asset_url(asset_path: str) -> str:
     """
     Generates a URL for a static asset.
     In production, it points to the CDN.
     In development (or if CDN_DOMAIN is not set), it points to a local static path.
+    Assets in the manifest get their content-hashed filename.
+
+    Results are memoized; use configure() to change settings after the first call.
 
     Args:
         asset_path: The path to the asset relative to the static root
@@ -22,6 +184,7 @@ def get_asset_url(asset_path: str) -> str:
     """
     # Ensure asset_path doesn't start with a slash for proper joining
     clean_asset_path = asset_path.lstrip('/')
+    clean_asset_path = _get_manifest().get(clean_asset_path, clean_asset_path)
 
     if IS_PRODUCTION and CDN_DOMAIN:
         # Ensure CDN_DOMAIN doesn't have a trailing slash and asset_path doesn't have a leading one
@@ -30,35 +193,60 @@ def get_asset_url(asset_path: str) -> str:
         # Ensure LOCAL_STATIC_PREFIX doesn't have a trailing slash
         return f"{LOCAL_STATIC_PREFIX.rstrip('/')}/{clean_asset_path}"
 
+
+def cache_control_for(asset_path):
+    """The Cache-Control value for serving `asset_path` (relative to the static root)."""
+    _get_manifest()
+    return IMMUTABLE_CACHE_CONTROL if asset_path.lstrip('/') in _fingerprinted else MUTABLE_CACHE_CONTROL
+
+
+def add_static_cache_headers(app):
+    """
+    Sets Cache-Control on the Flask app's static file responses (also what the CDN
+    fetches from the origin): immutable for fingerprinted files, short-lived otherwise.
+    """
+    from flask import request
+
+    @app.after_request
+    def _static_cache_headers(response):
+        if request.endpoint == "static" and response.status_code in (200, 206, 304):
+            response.headers["Cache-Control"] = cache_control_for(request.view_args["filename"])
+        return response
+
+    return app
+
+
 if __name__ == "__main__":
-    print("--- Simulating Production Environment ---")
-    # In a real app, IS_PRODUCTION would be set based on the environment
-    # For this test, we'll manually toggle it if needed or rely on the default.
+    parser = argparse.ArgumentParser(description="Static asset manifest")
+    subcommands = parser.add_subparsers(dest="command")
+    build = subcommands.add_parser("build", help="fingerprint the static tree and write the manifest")
+    build.add_argument("static_root")
+    build.add_argument("--manifest", help="manifest path (default: <static_root>/asset-manifest.json)")
+    build.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest = build_manifest(args.static_root, args.manifest, args.workers)
+        print(f"Fingerprinted {len(manifest)} assets")
+        parser.exit()
 
+    print("--- Simulating Production Environment ---")
     print(f"Logo URL: {get_asset_url('images/logo.png')}")
     print(f"Stylesheet URL: {get_asset_url('css/main.css')}")
     print(f"JS Bundle URL: {get_asset_url('/js/bundle.js')}") # Handles leading slash
 
     # --- Simulate Development Environment ---
     print("\n--- Simulating Development Environment ---")
-    IS_PRODUCTION = False # Temporarily override for this part of the script
-    # Or, you might have a different configuration loaded for dev
-    # For example, by setting CDN_DOMAIN = None or an empty string.
-
+    configure(is_production=False)
     print(f"Logo URL (Dev): {get_asset_url('images/logo.png')}")
     print(f"Stylesheet URL (Dev): {get_asset_url('css/main.css')}")
 
-    # --- Restore for any further use if this script was part of a larger system ---
-    # IS_PRODUCTION = True # Or reload from actual config
-    # This is more for illustration in a standalone script.
-    # In a real app, config is usually loaded once at startup.
-
     # Example with a different CDN and ensuring no double slashes
-    CDN_DOMAIN = "https_mycdn.azureedge.net/" # With trailing slash
-    IS_PRODUCTION = True
+    configure(is_production=True, cdn_domain="https_mycdn.azureedge.net/") # With trailing slash
     print("\n--- Production with trailing slash in CDN_DOMAIN ---")
     print(f"Asset: {get_asset_url('/path/to/asset.jpg')}")
 
-    CDN_DOMAIN = "https_anothercdn.com" # No trailing slash
-    print("\n--- Production with no trailing slash in CDN_DOMAIN ---")
+    # With a manifest, URLs carry the content hash
+    configure(cdn_domain="https_anothercdn.com", manifest={"another/asset.js": "another/asset.0123456789ab.js"})
+    print("\n--- Production with an asset manifest ---")
     print(f"Asset: {get_asset_url('another/asset.js')}")
@@ -0,0 +1,295 @@
+# chunked_upload.py
+# Streaming and resumable uploads of content files to local disk.
+#
+# Request bodies are never buffered in memory: they are read from the WSGI input
+# stream in fixed-size chunks, written straight to disk and fed to a SHA-256 hasher
+# as they go, so memory use stays flat no matter how large the upload is.
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+
+try:
+    import fcntl  # Serializes appends to a session across worker processes (POSIX only)
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 1024 * 1024  # bytes read from the request stream per write
+CONTENT_TYPES = ("video", "document")
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    """An upload request that can't be applied. `status_code` is the HTTP status to answer with."""
+
+    def __init__(self, message, status_code=400, **details):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.details = details
+
+
+def copy_stream(stream, out_file, length=None, hashers=(), chunk_size=CHUNK_SIZE):
+    """
+    Copies `stream` to `out_file` in `chunk_size` pieces, updating every hasher in `hashers`.
+
+    Args:
+        length: Number of bytes to copy, or None to copy until the stream is exhausted.
+
+    Returns:
+        int: the number of bytes copied.
+    """
+    copied = 0
+    while length is None or copied < length:
+        to_read = chunk_size if length is None else min(chunk_size, length - copied)
+        data = stream.read(to_read)
+        if not data:
+            break
+        out_file.write(data)
+        for hasher in hashers:
+            hasher.update(data)
+        copied += len(data)
+    return copied
+
+
+class UploadStore:
+    """
+    Stores uploaded content under `root_dir`:
+        <root_dir>/videos/<filename>, <root_dir>/documents/<filename>   finished uploads
+        <root_dir>/sessions/<session_id>.json / .part                   resumable uploads in progress
+
+    Resumable uploads follow a simple offset protocol: the client creates a session,
+    then sends chunks with the offset they start at. A chunk whose offset doesn't
+    match the session's current offset is rejected with 409 and the current offset,
+    so a client that lost its connection asks for the offset and resumes from there.
+    Each chunk may carry a SHA-256 checksum; a mismatching chunk is discarded.
+
+    Finished uploads are staged, not yet in place: the caller checks the checksum for
+    duplicates first, then either publishes the staged file under its name or
+    discards it. A duplicate therefore never overwrites the file already stored
+    under its name.
+
+    The whole-file SHA-256 is computed incrementally as chunks arrive. The running
+    hasher lives in process memory; if a chunk lands on a process that doesn't have
+    it (a restart, or another worker without sticky sessions), the hasher is rebuilt
+    once by reading the part file already on disk.
+    """
+
+    def __init__(self, root_dir, chunk_size=CHUNK_SIZE):
+        self.root_dir = root_dir
+        self.chunk_size = chunk_size
+        self.sessions_dir = os.path.join(root_dir, "sessions")
+        for directory in [self.sessions_dir] + [self.content_dir(t) for t in CONTENT_TYPES]:
+            os.makedirs(directory, exist_ok=True)
+        self._hashers = {}  # session_id -> (offset covered, sha256 hasher)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    # --- Paths ---
+    def content_dir(self, content_type):
+        return os.path.join(self.root_dir, f"{content_type}s")
+
+    def content_path(self, content_type, filename):
+        return os.path.join(self.content_dir(content_type), filename)
+
+    def _session_paths(self, session_id):
+        if not _SESSION_ID_RE.match(session_id):
+            raise UploadError("Upload session not found", 404)
+        base = os.path.join(self.sessions_dir, session_id)
+        return base + ".json", base + ".part"
+
+    def _session_lock(self, session_id):
+        with self._locks_lock:
+            return self._locks.setdefault(session_id, threading.Lock())
+
+    @staticmethod
+    def _open_part(part_path):
+        try:
+            return open(part_path, "r+b")
+        except FileNotFoundError:  # completed or aborted by another process
+            raise UploadError("Upload session not found", 404) from None
+
+    @staticmethod
+    def clean_filename(filename):
+        if filename is not None and not isinstance(filename, str):
+            raise UploadError("filename must be a string")
+        cleaned = secure_filename(filename or "")
+        if not cleaned:
+            raise UploadError("Invalid filename")
+        return cleaned
+
+    # --- Single-request streaming upload ---
+    def save_stream(self, content_type, filename, stream, length=None):
+        """
+        Streams a whole request body to a staged file in one go.
+
+        Returns:
+            dict: {"filename", "size", "checksum", "path", "staged_path"}; pass it to
+                  publish() or discard().
+        """
+        filename = self.clean_filename(filename)
+        final_path = self.content_path(content_type, filename)
+        temp_path = f"{final_path}.{uuid.uuid4().hex}.tmp"
+        hasher = hashlib.sha256()
+        try:
+            with open(temp_path, "wb") as out_file:
+                size = copy_stream(stream, out_file, length, (hasher,), self.chunk_size)
+            if length is not None and size != length:
+                raise UploadError(f"Request body ended after {size} of {length} bytes")
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return {"filename": filename, "size": size, "checksum": hasher.hexdigest(), "path": final_path,
+                "staged_path": temp_path}
+
+    # --- Staged uploads ---
+    @staticmethod
+    def publish(saved):
+        """Moves a staged upload (from save_stream or complete_session) to its final path."""
+        os.replace(saved["staged_path"], saved["path"])
+
+    @staticmethod
+    def discard(saved):
+        """Deletes a staged upload, e.g. a duplicate of content already stored."""
+        if os.path.exists(saved["staged_path"]):
+            os.remove(saved["staged_path"])
+
+    # --- Resumable upload sessions ---
+    def create_session(self, content_type, filename, total_size=None):
+        if content_type not in CONTENT_TYPES:
+            raise UploadError(f"type must be one of {', '.join(CONTENT_TYPES)}")
+        if total_size is not None and (not isinstance(total_size, int) or total_size < 0):
+            raise UploadError("size must be a non-negative integer")
+        session = {
+            "id": uuid.uuid4().hex,
+            "type": content_type,
+            "filename": self.clean_filename(filename),
+            "total_size": total_size,
+            "offset": 0,
+        }
+        meta_path, part_path = self._session_paths(session["id"])
+        open(part_path, "wb").close()
+        self._write_session(meta_path, session)
+        self._hashers[session["id"]] = (0, hashlib.sha256())
+        return session
+
+    def get_session(self, session_id):
+        meta_path, _ = self._session_paths(session_id)
+        try:
+            with open(meta_path) as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            raise UploadError("Upload session not found", 404) from None
+
+    @staticmethod
+    def _write_session(meta_path, session):
+        temp_path = meta_path + ".tmp"
+        with open(temp_path, "w") as meta_file:
+            json.dump(session, meta_file)
+        os.replace(temp_path, meta_path)
+
+    def _file_hasher(self, session_id, part_path, offset):
+        covered, hasher = self._hashers.get(session_id, (None, None))
+        if covered != offset:
+            # Rebuild the running hash from what's already on disk
+            hasher = hashlib.sha256()
+            with open(part_path, "rb") as part_file:
+                copy_stream(part_file, _NullWriter(), offset, (hasher,), self.chunk_size)
+        return hasher
+
+    def append_chunk(self, session_id, offset, stream, length=None, chunk_checksum=None):
+        """
+        Appends one chunk read from `stream` at `offset`.
+
+        Returns:
+            dict: the updated session.
+        """
+        meta_path, part_path = self._session_paths(session_id)
+        self.get_session(session_id)  # 404 for an unknown session, before taking its lock
+        with self._session_lock(session_id), self._open_part(part_path) as part_file:
+            if fcntl is not None:
+                fcntl.flock(part_file.fileno(), fcntl.LOCK_EX)
+            session = self.get_session(session_id)
+            if offset != session["offset"]:
+                raise UploadError("Offset does not match the upload session", 409, offset=session["offset"])
+            # Bytes left before the declared upload size; None if no size was declared
+            remaining = None if session["total_size"] is None else session["total_size"] - offset
+            if length is not None and remaining is not None and length > remaining:
+                raise UploadError("Chunk extends past the declared upload size", 413, offset=offset)
+
+            file_hasher = self._file_hasher(session_id, part_path, offset)
+            chunk_hasher = hashlib.sha256()
+            # The file hasher is only committed once the chunk is accepted, so work on a copy
+            candidate_hasher = file_hasher.copy()
+            part_file.seek(offset)
+            part_file.truncate()
+            # Without a Content-Length, read one byte past the declared size at most, to tell that it was exceeded
+            limit = length if length is not None or remaining is None else remaining + 1
+            written = copy_stream(stream, part_file, limit, (chunk_hasher, candidate_hasher), self.chunk_size)
+            too_long = remaining is not None and written > remaining
+            if too_long or (length is not None and written != length) or (
+                chunk_checksum and chunk_hasher.hexdigest() != chunk_checksum.lower()
+            ):
+                part_file.truncate(offset)
+                self._hashers[session_id] = (offset, file_hasher)
+                if too_long:
+                    raise UploadError("Chunk extends past the declared upload size", 413, offset=offset)
+                if length is not None and written != length:
+                    raise UploadError(f"Chunk ended after {written} of {length} bytes", offset=offset)
+                raise UploadError("Chunk checksum mismatch", offset=offset)
+
+            part_file.flush()
+            session["offset"] = offset + written
+            self._write_session(meta_path, session)
+            self._hashers[session_id] = (session["offset"], candidate_hasher)
+            return session
+
+    def complete_session(self, session_id, expected_checksum=None):
+        """
+        Verifies a finished session and ends it, leaving its data staged.
+
+        Returns:
+            dict: {"filename", "type", "size", "checksum", "path", "staged_path"}; pass
+                  it to publish() or discard().
+        """
+        meta_path, part_path = self._session_paths(session_id)
+        with self._session_lock(session_id):
+            session = self.get_session(session_id)
+            if session["total_size"] is not None and session["offset"] != session["total_size"]:
+                raise UploadError(
+                    f"Upload incomplete: {session['offset']} of {session['total_size']} bytes received",
+                    409, offset=session["offset"])
+            checksum = self._file_hasher(session_id, part_path, session["offset"]).hexdigest()
+            if expected_checksum and checksum != expected_checksum.lower():
+                raise UploadError("Upload checksum mismatch", checksum=checksum)
+            os.remove(meta_path)
+            self._forget(session_id)
+        return {"filename": session["filename"], "type": session["type"], "size": session["offset"],
+                "checksum": checksum, "path": self.content_path(session["type"], session["filename"]),
+                "staged_path": part_path}
+
+    def abort_session(self, session_id):
+        meta_path, part_path = self._session_paths(session_id)
+        with self._session_lock(session_id):
+            self.get_session(session_id)  # 404 if unknown
+            for path in (meta_path, part_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._forget(session_id)
+
+    def _forget(self, session_id):
+        self._hashers.pop(session_id, None)
+        with self._locks_lock:
+            self._locks.pop(session_id, None)
+
+
+class _NullWriter:
+    """File-like sink used when only the hash of a stream is needed."""
+
+    def write(self, data):
+        return len(data)
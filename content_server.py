@@ -0,0 +1,213 @@
+# content_server.py
+# Serves stored content files with HTTP validators, Range requests and zero-copy transfer.
+#
+# How bytes leave the process, from best to worst:
+#   1. X-Accel-Redirect (when CONTENT_X_ACCEL_PREFIX is set): nginx reads the file
+#      itself with sendfile and handles Range; Python only sends headers.
+#   2. wsgi.file_wrapper: servers such as gunicorn send the wrapped file with
+#      os.sendfile, starting at the file's current position and stopping after
+#      Content-Length bytes. That is used for whole files (on any server) and for
+#      single ranges (on servers known to honour position + Content-Length).
+#   3. Otherwise the range is read in blocks (e.g. Flask's dev server).
+# Multi-range requests (documents only) are answered with multipart/byteranges,
+# built from os.pread() slices. Overlapping and adjacent ranges are coalesced first,
+# and a request for more than MAX_RANGES ranges gets the whole file (RFC 9110 §14.2),
+# so a client can't make one request read the same bytes many times over.
+import mimetypes
+import os
+import re
+import uuid
+
+from flask import Response
+from werkzeug.http import http_date
+
+BLOCK_SIZE = 256 * 1024
+MAX_RANGES = 16  # ranges in one request before the Range header is ignored
+_RANGE_SPEC = re.compile(r"([0-9]*)-([0-9]*)")
+# Servers whose wsgi.file_wrapper sends from the current file position and stops
+# after Content-Length bytes, so a seeked file can carry a single range.
+# asgi_bridge (app_asgi.py) reads the wrapped file in blocks the same way.
+RANGE_SAFE_FILE_WRAPPER_SERVERS = ("gunicorn", "asgi_bridge")
+
+
+class _BoundedFileIterator:
+    """Yields `length` bytes of `file` starting at `offset`, one block at a time."""
+
+    def __init__(self, file, offset, length, block_size=BLOCK_SIZE):
+        self.file = file
+        self.offset = offset
+        self.remaining = length
+        self.block_size = block_size
+
+    def __iter__(self):
+        while self.remaining > 0:
+            data = os.pread(self.file.fileno(), min(self.block_size, self.remaining), self.offset)
+            if not data:
+                break
+            self.offset += len(data)
+            self.remaining -= len(data)
+            yield data
+
+    def close(self):
+        self.file.close()
+
+
+def _file_body(environ, path, offset, length, size):
+    """Returns a WSGI body for bytes [offset, offset + length) of `path`."""
+    file = open(path, "rb")
+    file_wrapper = environ.get("wsgi.file_wrapper")
+    server = environ.get("SERVER_SOFTWARE", "")
+    whole_file = offset == 0 and length == size
+    if file_wrapper is not None and (whole_file or server.startswith(RANGE_SAFE_FILE_WRAPPER_SERVERS)):
+        file.seek(offset)
+        return file_wrapper(file, BLOCK_SIZE)
+    return _BoundedFileIterator(file, offset, length)
+
+
+def _parse_ranges(value):
+    """
+    Parses a "bytes=" Range header into (start, stop) pairs: `stop` is exclusive or
+    None (to the end), and a None `start` makes `stop` a suffix length. Returns None
+    for a header that is malformed or in other units, which is then ignored.
+
+    werkzeug's parse_range_header rejects ranges that are out of order or overlap, but
+    those are valid (RFC 9110 §14.1.1); here they are accepted and coalesced later.
+    """
+    units, _, specs = (value or "").partition("=")
+    if units.strip().lower() != "bytes":
+        return None
+    ranges = []
+    for spec in specs.split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        match = _RANGE_SPEC.fullmatch(spec)
+        if match is None or match.group() == "-":
+            return None
+        first, last = match.groups()
+        if not first:
+            ranges.append((None, int(last)))
+        elif not last:
+            ranges.append((int(first), None))
+        elif int(last) < int(first):
+            return None
+        else:
+            ranges.append((int(first), int(last) + 1))
+    return ranges or None
+
+
+def _normalize_ranges(ranges, size):
+    """
+    Turns parsed ranges into absolute (start, end_exclusive) pairs in file order,
+    dropping ranges that start past the end of the file (and empty suffixes) and
+    merging ranges that overlap or touch.
+    """
+    absolute = []
+    for start, stop in ranges:
+        if start is None:  # suffix range: the last `stop` bytes
+            start, stop = max(size - stop, 0), size
+        elif stop is None or stop > size:
+            stop = size
+        if start < stop:
+            absolute.append((start, stop))
+    absolute.sort()
+    coalesced = absolute[:1]
+    for start, stop in absolute[1:]:
+        last_start, last_stop = coalesced[-1]
+        if start <= last_stop:
+            coalesced[-1] = (last_start, max(last_stop, stop))
+        else:
+            coalesced.append((start, stop))
+    return coalesced
+
+
+def _multipart_byteranges(path, ranges, size, mimetype, boundary):
+    with open(path, "rb") as file:
+        fd = file.fileno()
+        for start, stop in ranges:
+            yield (
+                f"--{boundary}\r\nContent-Type: {mimetype}\r\n"
+                f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n"
+            ).encode()
+            offset = start
+            while offset < stop:
+                data = os.pread(fd, min(BLOCK_SIZE, stop - offset), offset)
+                if not data:
+                    break
+                offset += len(data)
+                yield data
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode()
+
+
+def serve_file(request, path, allow_multi_range=False, x_accel_path=None):
+    """
+    Builds the response for a GET/HEAD of a stored file.
+
+    Args:
+        request: The current Flask request.
+        path: Filesystem path of the file (must exist).
+        allow_multi_range: Answer multi-range requests with multipart/byteranges;
+                           otherwise they are ignored and the whole file is sent.
+        x_accel_path: If set, hand the transfer to nginx via X-Accel-Redirect.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    etag = f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{size:x}"
+
+    if x_accel_path:
+        # nginx answers Range/conditional requests itself from the file on disk
+        response = Response(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = x_accel_path
+        return response
+
+    response = Response(mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers["Last-Modified"] = http_date(stat.st_mtime)
+    response.headers["Accept-Ranges"] = "bytes"
+
+    # If-None-Match / If-Modified-Since: nothing changed, no body
+    if request.if_none_match.contains(etag) or (
+        not request.if_none_match
+        and request.if_modified_since is not None
+        and int(stat.st_mtime) <= request.if_modified_since.timestamp()
+    ):
+        response.status_code = 304
+        return response
+
+    requested = _parse_ranges(request.headers.get("Range"))
+    if requested is not None and "If-Range" in request.headers:
+        # Only honour the Range if the client's copy is still current
+        if_range = request.if_range
+        if if_range.etag != etag and (if_range.date is None or if_range.date.timestamp() < int(stat.st_mtime)):
+            requested = None
+
+    if requested is None or len(requested) > MAX_RANGES:
+        response.response = _file_body(request.environ, path, 0, size, size)
+        response.content_length = size
+        response.direct_passthrough = True
+        return response
+
+    ranges = _normalize_ranges(requested, size)
+    if not ranges:
+        response.status_code = 416
+        response.headers["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if len(ranges) == 1 or not allow_multi_range:
+        start, stop = ranges[0] if len(ranges) == 1 else (0, size)
+        response.status_code = 206 if len(ranges) == 1 else 200
+        if response.status_code == 206:
+            response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+        response.response = _file_body(request.environ, path, start, stop - start, size)
+        response.content_length = stop - start
+        response.direct_passthrough = True
+        return response
+
+    boundary = uuid.uuid4().hex
+    response.status_code = 206
+    response.mimetype = "multipart/byteranges"
+    response.headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+    response.response = _multipart_byteranges(path, ranges, size, mimetype, boundary)
+    return response
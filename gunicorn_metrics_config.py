@@ -0,0 +1,23 @@
+# gunicorn_metrics_config.py
+# gunicorn settings for running app_with_metrics.py with metrics aggregated across workers.
+#
+#   mkdir -p /tmp/prometheus_multiproc
+#   PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus_multiproc \
+#       gunicorn -c gunicorn_metrics_config.py -w 4 -b 0.0.0.0:5000 app_with_metrics:app
+import glob
+import os
+
+from metrics_exposition import mark_worker_dead, multiprocess_dir
+
+
+def on_starting(server):
+    # Files left by a previous run would be added to this run's counters
+    directory = multiprocess_dir()
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    mark_worker_dead(worker.pid)
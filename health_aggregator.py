@@ -0,0 +1,180 @@
+# health_aggregator.py
+# Runs health checks (e.g. those in health_check_utils.py) concurrently and caches
+# their results, so probe endpoints never wait on the backends.
+#
+#   - Every registered check runs on a shared thread pool with its own timeout.
+#   - Results are cached for `ttl` seconds. A background refresher re-runs each check
+#     before its result goes stale, so probes read the cache.
+#   - A check never has more than one run in flight. Probes that find a stale result
+#     while a run is in progress wait for that run instead of starting another, so
+#     probe traffic cannot stampede the database or cache.
+#   - Checks belong to the "liveness" and/or "readiness" view.
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+LIVENESS = "liveness"
+READINESS = "readiness"
+
+
+class CheckResult:
+    __slots__ = ("healthy", "message", "latency", "checked_at", "timed_out")
+
+    def __init__(self, healthy, message, latency, checked_at, timed_out=False):
+        self.healthy = healthy
+        self.message = message
+        self.latency = latency  # seconds the check took (or the timeout, if it timed out)
+        self.checked_at = checked_at  # time.monotonic() when the run finished
+        self.timed_out = timed_out
+
+    def to_dict(self, now):
+        return {
+            "healthy": self.healthy,
+            "message": self.message,
+            "latency_ms": round(self.latency * 1000, 3),
+            "age_s": round(now - self.checked_at, 3),
+            "timed_out": self.timed_out,
+        }
+
+
+class _Check:
+    __slots__ = ("name", "func", "timeout", "ttl", "views", "result", "in_flight", "lock")
+
+    def __init__(self, name, func, timeout, ttl, views):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        self.ttl = ttl
+        self.views = frozenset(views)
+        self.result = None
+        self.in_flight = None  # Future of the run in progress
+        self.lock = threading.Lock()
+
+
+class HealthAggregator:
+    """
+    Args:
+        max_workers: Threads that run checks.
+        refresh_interval: Seconds between background refreshes. Keep it below the
+                          checks' TTL so cached results never go stale.
+    """
+
+    def __init__(self, max_workers=4, refresh_interval=5.0):
+        self.max_workers = max_workers
+        self.refresh_interval = refresh_interval
+        self.checks = {}
+        self._executor = None
+        self._refresher = None
+        self._stop = threading.Event()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def register(self, name, func, timeout=1.0, ttl=10.0, views=(READINESS,)):
+        """
+        Adds a check.
+
+        Args:
+            name: Name shown in the status report.
+            func: Callable returning (healthy: bool, message: str).
+            timeout: Seconds after which a run counts as failed. A timed-out run keeps
+                     its worker thread until it returns; no new run starts meanwhile.
+            ttl: Seconds a result is served from the cache.
+            views: The views (LIVENESS, READINESS) the check counts towards.
+        """
+        self.checks[name] = _Check(name, func, timeout, ttl, views)
+
+    def start(self):
+        """
+        Starts the thread pool and the background refresher. Safe to call repeatedly;
+        after a fork (e.g. gunicorn workers) it starts fresh threads in the child.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="health-check")
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="health-refresher", daemon=True)
+            self._refresher.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._pid = None
+
+    def _refresh_loop(self):
+        while True:
+            self.refresh(wait=True)
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def _submit(self, check):
+        """Returns the Future of the check's current run, starting one if none is in flight."""
+        with check.lock:
+            if check.in_flight is None:
+                check.in_flight = self._executor.submit(self._run, check)
+            return check.in_flight
+
+    @staticmethod
+    def _run(check):
+        started = time.perf_counter()
+        try:
+            healthy, message = check.func()
+        except Exception as e:
+            logger.error(f"Health Check: {check.name} raised: {e}", exc_info=True)
+            healthy, message = False, f"{check.name} check failed: {e}"
+        latency = time.perf_counter() - started
+        result = CheckResult(bool(healthy), message, latency, time.monotonic())
+        # Even a run that outlived its timeout records what it found
+        with check.lock:
+            check.result = result
+            check.in_flight = None
+        return result
+
+    def refresh(self, names=None, wait=True):
+        """Runs the given checks (default: all) concurrently and waits for them, each up to its timeout."""
+        self.start()
+        checks = [self.checks[name] for name in names] if names is not None else list(self.checks.values())
+        futures = [(check, self._submit(check)) for check in checks]
+        if not wait:
+            return
+        deadline_base = time.monotonic()
+        for check, future in futures:
+            remaining = max(0.0, deadline_base + check.timeout - time.monotonic())
+            try:
+                future.result(remaining)
+            except FutureTimeoutError:
+                with check.lock:
+                    # Only record the timeout if the run hasn't finished in the meantime
+                    if check.in_flight is future:
+                        check.result = CheckResult(False, f"{check.name} check timed out after {check.timeout}s",
+                                                   check.timeout, time.monotonic(), timed_out=True)
+
+    def status(self, view=READINESS):
+        """
+        Report for one view: {"status": "ok"|"fail", "checks": {name: {...}}}.
+
+        Cached results are used while fresh. Missing or stale ones (e.g. before the
+        first background refresh) are refreshed before answering.
+        """
+        now = time.monotonic()
+        checks = [check for check in self.checks.values() if view in check.views]
+        stale = [check.name for check in checks if check.result is None or now - check.result.checked_at > check.ttl]
+        if stale:
+            self.refresh(stale)
+            now = time.monotonic()
+        report = {}
+        healthy = True
+        for check in checks:
+            result = check.result
+            report[check.name] = result.to_dict(now)
+            healthy = healthy and result.healthy
+        return {"status": "ok" if healthy else "fail", "checks": report}
@@ -144,4 +144,3 @@ if __name__ == "__main__":
 
     cache_ok_real, cache_msg_real = check_cache_status(my_actual_cache_check)
     print(f"Real Cache Status: {'OK' if cache_ok_real else 'FAIL'} - {cache_msg_real}")
-```
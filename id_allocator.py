@@ -0,0 +1,56 @@
+# id_allocator.py
+# Concurrency-safe integer id allocation for the in-memory storage backend.
+import threading
+
+
+class BlockIdAllocator:
+    """
+    Hands out unique, positive integer ids to many threads.
+
+    Each thread reserves a block of ids from a shared counter (the only step that
+    takes a lock) and then allocates from its own block without locking. Block sizes
+    start at 1 and double every time a thread exhausts its block, up to
+    `max_block_size`. This means:
+      - Threads from a long-lived pool (gunicorn gthread, waitress) quickly move to
+        large blocks and almost never touch the shared lock.
+      - Servers that start a new thread per request (Flask's dev server) only
+        reserve one id per thread, so ids stay dense (1, 2, 3, ...).
+
+    Ids are unique but, with several threads, not handed out in global order.
+    """
+
+    def __init__(self, start=1, max_block_size=256):
+        self._next = start
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.max_block_size = max_block_size
+
+    def allocate(self):
+        """Returns one new id."""
+        local = self._local
+        next_id = getattr(local, "next_id", 0)
+        if next_id >= getattr(local, "block_end", 0):
+            block_size = min(getattr(local, "block_size", 0) * 2 or 1, self.max_block_size)
+            next_id = self.reserve(block_size)
+            local.block_end = next_id + block_size
+            local.block_size = block_size
+        local.next_id = next_id + 1
+        return next_id
+
+    def reserve(self, count):
+        """Reserves `count` contiguous ids and returns the first one."""
+        with self._lock:
+            first = self._next
+            self._next += count
+        return first
+
+    @property
+    def high_water_mark(self):
+        """The lowest id that has never been reserved."""
+        return self._next
+
+    def advance_to(self, value):
+        """Makes sure no id below `value` is handed out again (e.g. after loading saved data)."""
+        with self._lock:
+            if value > self._next:
+                self._next = value
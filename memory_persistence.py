@@ -0,0 +1,539 @@
+# memory_persistence.py
+# Durability for the in-memory storage backend: binary snapshots plus a write-ahead log.
+#
+# PersistentMemoryStorage is a MemoryStorage that survives restarts:
+#   - Every create/update/delete appends a record to an append-only log (WAL) while
+#     the storage lock is held, so log order is apply order. Records hold the
+#     resulting entities (redo records), not the requests.
+#   - A writer thread writes the log with group commit. All records queued while
+#     the previous fsync ran are written and fsynced together. With sync="commit"
+#     (the default) a request returns only once its record is on disk. With
+#     sync="interval" requests don't wait, and the log is fsynced every
+#     `flush_interval` seconds.
+#     If a write or fsync fails (disk full, I/O error) the writer stops, and the
+#     waiting write and every later one raise LogWriteError, so requests get a 500
+#     until the process is restarted from what is on disk.
+#   - A background thread writes a snapshot of every table every `snapshot_interval`
+#     seconds (if anything changed). Only the snapshot's log position and the id
+#     lists are taken under the lock. Entities are then pickled in small chunks, so
+#     requests keep running between chunks. Log segments older than the snapshot
+#     are then deleted.
+#   - On startup the latest snapshot is loaded and the log tail after it is replayed.
+#
+# Snapshots are fuzzy: an entity may be captured in a state newer than the
+# snapshot's log position. Replaying a put or delete over such a state is harmless, so
+# the tail replay always converges. The one additive record, quiz statistics, is
+# captured exactly under the lock instead.
+#
+# A directory belongs to one process (it is locked). Use it with a single worker, or
+# give each worker its own directory.
+import gc
+import glob
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from quiz_analytics import QuizStats
+from storage import MemoryStorage
+
+FRAME_HEADER = struct.Struct("<II")  # payload length, crc32
+SNAPSHOT_MAGIC = b"CCSNAP2\n"
+SNAPSHOT_CHUNK = 2000  # entities per snapshot frame
+TABLES = ("lessons", "content", "quizzes", "assignments", "submissions")
+ALLOCATORS = {
+    "lessons": "lesson_id_allocator",
+    "quizzes": "quiz_id_allocator",
+    "assignments": "assignment_id_allocator",
+    "submissions": "submission_id_allocator",
+}
+
+
+class CorruptLogError(Exception):
+    """A damaged record before the end of the log, or an incomplete snapshot."""
+
+
+class LogWriteError(Exception):
+    """The log writer failed (disk full, I/O error). Later writes fail too until a restart."""
+
+
+def _frame(payload):
+    return FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(path, offset=0):
+    """
+    Yields (payload, end offset) for each intact frame of a file, starting at `offset`.
+    Stops at the first incomplete or damaged frame (a write torn by a crash).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    while offset + FRAME_HEADER.size <= len(data):
+        length, crc = FRAME_HEADER.unpack_from(data, offset)
+        start, end = offset + FRAME_HEADER.size, offset + FRAME_HEADER.size + length
+        payload = data[start:end]
+        if end > len(data) or zlib.crc32(payload) != crc:
+            return
+        offset = end
+        yield payload, offset
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """
+    Append-only log split in segments named wal-<first sequence number>.log.
+
+    Args:
+        directory: Where the segments live.
+        next_seq: Sequence number of the first record appended.
+        sync: "commit" (appenders can wait for their record to be fsynced) or "interval".
+        flush_interval: Seconds between writes with sync="interval".
+    """
+
+    def __init__(self, directory, next_seq=1, sync="commit", flush_interval=0.05):
+        if sync not in ("commit", "interval"):
+            raise ValueError(f"Unknown WAL sync mode: {sync!r}")
+        self.directory = directory
+        self.sync = sync
+        self.flush_interval = flush_interval
+        self._seq = next_seq - 1
+        self.durable_seq = next_seq - 1
+        self._pending = []  # frames, and ints: "start a new segment with this sequence number"
+        self._pending_seq = next_seq - 1
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error = None  # what stopped the writer thread
+        self._file = self._open_segment(next_seq)
+        self._thread = threading.Thread(target=self._run, name="wal-writer", daemon=True)
+        self._thread.start()
+
+    def _open_segment(self, first_seq):
+        path = os.path.join(self.directory, f"wal-{first_seq:020d}.log")
+        f = open(path, "ab")
+        _fsync_dir(self.directory)
+        return f
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def append(self, op, args):
+        """Queues a record and returns its sequence number. Callers serialize appends (storage lock)."""
+        self._raise_if_failed()
+        self._seq += 1
+        frame = _frame(pickle.dumps((self._seq, op, args), protocol=pickle.HIGHEST_PROTOCOL))
+        with self._condition:
+            self._pending.append(frame)
+            self._pending_seq = self._seq
+            self._condition.notify_all()
+        return self._seq
+
+    def rotate(self):
+        """Starts a new segment after the last appended record; returns that record's sequence number."""
+        with self._condition:
+            self._pending.append(self._seq + 1)  # first sequence number of the new segment
+            self._condition.notify_all()
+        return self._seq
+
+    def wait(self, seq):
+        """Blocks until record `seq` is on disk (sync="commit" only). Raises LogWriteError if it never will be."""
+        if self.sync != "commit" or self.durable_seq >= seq:
+            return
+        with self._condition:
+            while self.durable_seq < seq and not self._closed and self._error is None:
+                self._condition.wait()
+        if self.durable_seq < seq:
+            self._raise_if_failed()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise LogWriteError(f"Writing the log failed: {self._error}") from self._error
+
+    def _run(self):
+        try:
+            self._write_pending()
+        except Exception as e:
+            # Waiters would otherwise block forever on a record that is never written
+            with self._condition:
+                self._error = e
+                self._condition.notify_all()
+
+    def _write_pending(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+            if self.sync == "interval" and not self._closed:
+                time.sleep(self.flush_interval)
+            with self._condition:
+                pending, self._pending = self._pending, []
+                last_seq = self._pending_seq
+            # Everything queued during the previous fsync goes out in one write and one fsync
+            group = []
+            for item in pending:
+                if isinstance(item, bytes):
+                    group.append(item)
+                    continue
+                self._write(group)
+                group = []
+                self._file.close()
+                self._file = self._open_segment(item)
+            self._write(group)
+            with self._condition:
+                self.durable_seq = last_seq
+                self._condition.notify_all()
+
+    def _write(self, frames):
+        if frames:
+            self._file.write(b"".join(frames))
+            self._file.flush()
+            os.fdatasync(self._file.fileno())
+
+    @staticmethod
+    def segments(directory):
+        """[(first sequence number, path)] of a directory's segments, oldest first."""
+        paths = glob.glob(os.path.join(directory, "wal-*.log"))
+        return sorted((int(os.path.basename(path)[4:-4]), path) for path in paths)
+
+    def remove_segments_through(self, seq):
+        """Deletes segments whose records all have sequence numbers <= `seq`."""
+        segments = self.segments(self.directory)
+        for (_, path), (next_first_seq, _) in zip(segments, segments[1:]):
+            if next_first_seq <= seq + 1:
+                os.remove(path)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        try:
+            self._file.close()
+        except OSError:
+            # Closing flushes what a failed write left buffered, and fails the same way
+            if self._error is None:
+                raise
+
+
+# --- Snapshots ---
+def _snapshot_path(directory, seq):
+    return os.path.join(directory, f"snapshot-{seq:020d}.bin")
+
+
+def latest_snapshot(directory):
+    """(sequence number, path) of the newest snapshot, or (0, None)."""
+    paths = glob.glob(os.path.join(directory, "snapshot-*.bin"))
+    if not paths:
+        return 0, None
+    path = max(paths)
+    return int(os.path.basename(path)[9:-4]), path
+
+
+def write_snapshot(storage, directory):
+    """
+    Writes a snapshot of `storage` (a PersistentMemoryStorage) and deletes the log
+    segments it covers. Returns the snapshot's sequence number.
+
+    Format: SNAPSHOT_MAGIC, then frames of pickled ("meta", {...}), (table, [entities])
+    and a final ("end", seq). A snapshot without its end frame is ignored.
+    """
+    db = storage.db
+    with storage._lock:
+        seq = storage.wal.rotate()
+        # Key lists are quick C-level copies; entities are read later, outside the lock
+        keys = {table: list(db[table]) for table in TABLES}
+        quiz_stats = {quiz_id: stats.to_dict() for quiz_id, stats in db["quiz_stats"].items()}
+        high_water_marks = {table: getattr(storage, name).high_water_mark for table, name in ALLOCATORS.items()}
+
+    tmp_path = _snapshot_path(directory, seq) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        meta = {"seq": seq, "high_water_marks": high_water_marks, "quiz_stats": quiz_stats}
+        f.write(_frame(pickle.dumps(("meta", meta), protocol=pickle.HIGHEST_PROTOCOL)))
+        for table in TABLES:
+            rows = db[table]
+            table_keys = keys[table]
+            for start in range(0, len(table_keys), SNAPSHOT_CHUNK):
+                # Entities deleted since the key list was taken are skipped (the log replays the delete)
+                chunk = [entity for entity in map(rows.get, table_keys[start:start + SNAPSHOT_CHUNK]) if entity is not None]
+                f.write(_frame(pickle.dumps((table, chunk), protocol=pickle.HIGHEST_PROTOCOL)))
+                # Let request threads run between chunks
+                time.sleep(0)
+        f.write(_frame(pickle.dumps(("end", seq), protocol=pickle.HIGHEST_PROTOCOL)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _snapshot_path(directory, seq))
+    _fsync_dir(directory)
+
+    for path in glob.glob(os.path.join(directory, "snapshot-*.bin")):
+        if path != _snapshot_path(directory, seq):
+            os.remove(path)
+    storage.wal.remove_segments_through(seq)
+    return seq
+
+
+# --- Loading ---
+def _apply(storage, op, args):
+    """Applies one log record (or snapshot chunk) to `storage`'s tables. Idempotent except "quiz_stats"."""
+    db = storage.db
+    if op == "lessons":
+        # Records carry their version, so replaying one restores it too
+        lessons = db["lessons"]
+        for lesson in args:
+            previous = lessons.get(lesson.id)
+            if previous is not None and previous.course_id != lesson.course_id:
+                storage._unindex_lesson(previous)
+            lessons[lesson.id] = lesson
+            storage._index_lesson(lesson)
+    elif op == "lesson_delete":
+        lesson = db["lessons"].pop(args, None)
+        if lesson is not None:
+            storage._unindex_lesson(lesson)
+    elif op == "content":
+        for entry in args:
+            storage._store_content(entry)
+        storage._bump_version(*storage.CONTENT_REGISTRY)
+    elif op in ("quizzes", "assignments"):
+        table = db[op]
+        for record in args:
+            indexed = record.id in table  # a record is replayed again if a snapshot overlaps the log
+            table[record.id] = record
+            if not indexed:
+                storage._index_linked(op, record)
+    elif op == "submissions":
+        submissions = db["submissions"]
+        for submission in args:
+            submissions[submission["id"]] = submission
+        if args:
+            storage.submission_id_allocator.advance_to(max(submission["id"] for submission in args) + 1)
+        return
+    elif op == "graded":
+        # Submissions and their statistics in one record, so they are replayed together
+        quiz_id, submissions, stats = args
+        _apply(storage, "submissions", submissions)
+        if stats is not None:
+            current = db["quiz_stats"].get(quiz_id)
+            stats = QuizStats.from_dict(stats)
+            db["quiz_stats"][quiz_id] = current.merge(stats) if current is not None else stats
+        return
+    else:
+        raise CorruptLogError(f"Unknown log record: {op!r}")
+    if op in ALLOCATORS and args:
+        getattr(storage, ALLOCATORS[op]).advance_to(max(record.id for record in args) + 1)
+
+
+def _load_snapshot(storage, path):
+    with open(path, "rb") as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise CorruptLogError(f"Not a snapshot: {path}")
+    seq = None
+    for payload, _ in _read_frames(path, offset=len(SNAPSHOT_MAGIC)):
+        kind, value = pickle.loads(payload)
+        if kind == "meta":
+            for table, mark in value["high_water_marks"].items():
+                getattr(storage, ALLOCATORS[table]).advance_to(mark)
+            storage.db["quiz_stats"] = {quiz_id: QuizStats.from_dict(stats) for quiz_id, stats in value["quiz_stats"].items()}
+        elif kind == "end":
+            seq = value
+        else:
+            _apply(storage, kind, value)
+    if seq is None:
+        raise CorruptLogError(f"Incomplete snapshot: {path}")
+    return seq
+
+
+def _replay(storage, directory, after_seq):
+    """Applies log records after `after_seq`; truncates a torn write at the end of the last segment."""
+    segments = WriteAheadLog.segments(directory)
+    last_seq = after_seq
+    for index, (_, path) in enumerate(segments):
+        good_offset = 0
+        for payload, good_offset in _read_frames(path):
+            seq, op, args = pickle.loads(payload)
+            if seq > after_seq:
+                _apply(storage, op, args)
+                last_seq = seq
+        if good_offset < os.path.getsize(path):
+            if index != len(segments) - 1:
+                raise CorruptLogError(f"Damaged record in {path} at offset {good_offset}")
+            with open(path, "r+b") as f:
+                f.truncate(good_offset)
+                os.fsync(f.fileno())
+    return last_seq
+
+
+class PersistentMemoryStorage(MemoryStorage):
+    """
+    MemoryStorage persisted to `directory` (see the module comment).
+
+    Args:
+        directory: Snapshots and log segments; created if missing.
+        sync: "commit" (requests wait for their log record's fsync) or "interval".
+        flush_interval: Seconds between log fsyncs with sync="interval".
+        snapshot_interval: Seconds between background snapshots; None disables them
+                           (call snapshot() yourself).
+    """
+
+    def __init__(self, directory, sync="commit", flush_interval=0.05, snapshot_interval=300.0):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, "LOCK"), "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise RuntimeError(f"{directory} is in use by another process") from None
+
+        started = time.perf_counter()
+        # Loading creates millions of long-lived objects; collecting during it only costs time
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            snapshot_seq, path = latest_snapshot(directory)
+            if path is not None:
+                snapshot_seq = _load_snapshot(self, path)
+            last_seq = _replay(self, directory, snapshot_seq)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        self.load_seconds = time.perf_counter() - started
+        self.replayed = last_seq - snapshot_seq
+
+        self.wal = WriteAheadLog(directory, last_seq + 1, sync=sync, flush_interval=flush_interval)
+        self._snapshot_seq = snapshot_seq
+        self._snapshot_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshot_thread = None
+        if snapshot_interval:
+            self._snapshot_thread = threading.Thread(
+                target=self._snapshot_loop, args=(snapshot_interval,), name="snapshot-writer", daemon=True)
+            self._snapshot_thread.start()
+
+    def _snapshot_loop(self, interval):
+        while not self._stop.wait(interval):
+            if self.wal.last_seq > self._snapshot_seq:
+                self.snapshot()
+
+    def snapshot(self):
+        """Writes a snapshot now; returns its sequence number."""
+        with self._snapshot_lock:
+            self._snapshot_seq = write_snapshot(self, self.directory)
+            return self._snapshot_seq
+
+    # --- Logged writes ---
+    # Each write is applied and appended to the log under the storage lock, then waits
+    # for its record to be durable after releasing the lock, so concurrent requests
+    # share fsyncs. The log holds the stored records (records.py), not the dicts the
+    # methods return.
+    def _records(self, table, entities):
+        rows = self.db[table]
+        return [rows[entity["id"]] for entity in entities]
+
+    def create_lesson(self, course_id, title, content_ids):
+        with self._lock:
+            lesson = super().create_lesson(course_id, title, content_ids)
+            seq = self.wal.append("lessons", [self.db["lessons"][lesson["id"]]])
+        self.wal.wait(seq)
+        return lesson
+
+    def update_lesson(self, lesson_id, changes):
+        with self._lock:
+            lesson = super().update_lesson(lesson_id, changes)
+            if lesson is None:
+                return None
+            seq = self.wal.append("lessons", [self.db["lessons"][lesson_id]])
+        self.wal.wait(seq)
+        return lesson
+
+    def delete_lesson(self, lesson_id):
+        with self._lock:
+            if not super().delete_lesson(lesson_id):
+                return False
+            seq = self.wal.append("lesson_delete", lesson_id)
+        self.wal.wait(seq)
+        return True
+
+    def create_lessons(self, course_id, items):
+        with self._lock:
+            lessons = super().create_lessons(course_id, items)
+            seq = self.wal.append("lessons", self._records("lessons", lessons))
+        self.wal.wait(seq)
+        return lessons
+
+    def update_lessons(self, updates):
+        with self._lock:
+            lessons = super().update_lessons(updates)
+            if lessons is None:
+                return None
+            seq = self.wal.append("lessons", self._records("lessons", lessons))
+        self.wal.wait(seq)
+        return lessons
+
+    def register_content(self, content_type, upload_data, url):
+        with self._lock:
+            entry, duplicate = super().register_content(content_type, upload_data, url)
+            if duplicate:
+                return entry, True
+            seq = self.wal.append("content", [entry])
+        self.wal.wait(seq)
+        return entry, False
+
+    def create_quiz(self, title, questions, lesson_id):
+        with self._lock:
+            quiz = super().create_quiz(title, questions, lesson_id)
+            seq = self.wal.append("quizzes", [self.db["quizzes"][quiz["id"]]])
+        self.wal.wait(seq)
+        return quiz
+
+    def create_quizzes(self, items):
+        with self._lock:
+            quizzes = super().create_quizzes(items)
+            seq = self.wal.append("quizzes", self._records("quizzes", quizzes))
+        self.wal.wait(seq)
+        return quizzes
+
+    def create_assignment(self, title, description, lesson_id):
+        with self._lock:
+            assignment = super().create_assignment(title, description, lesson_id)
+            seq = self.wal.append("assignments", [self.db["assignments"][assignment["id"]]])
+        self.wal.wait(seq)
+        return assignment
+
+    def create_assignments(self, items):
+        with self._lock:
+            assignments = super().create_assignments(items)
+            seq = self.wal.append("assignments", self._records("assignments", assignments))
+        self.wal.wait(seq)
+        return assignments
+
+    def create_submissions(self, quiz_id, items, stats=None):
+        with self._lock:
+            submissions = super().create_submissions(quiz_id, items, stats)
+            seq = self.wal.append("graded", (quiz_id, submissions, stats.to_dict() if stats is not None else None))
+        self.wal.wait(seq)
+        return submissions
+
+    def close(self):
+        """Stops the background snapshots and flushes the log. Does not write a final snapshot."""
+        self._stop.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        self.wal.close()
+        self._lock_file.close()
@@ -0,0 +1,109 @@
+# metrics_cardinality.py
+# Keeps the number of series of a labelled Prometheus metric bounded.
+#
+# A SeriesLimiter hands out bound children of one metric:
+#   - At most `max_series` distinct label sets are admitted. Once the cap is
+#     reached, observations for new label sets are recorded under an overflow label
+#     set (by default every label "other") and counted in a "dropped" counter.
+#   - Label sets not used for `idle_seconds` are removed from the metric, which
+#     frees room under the cap for new ones.
+# Memory and /metrics output therefore stay bounded however many distinct label
+# values clients can produce (arbitrary paths, methods, ids...).
+#
+# A removed counter restarts from zero if its label set comes back. Prometheus'
+# rate() treats that as a counter reset. In multiprocess mode, removing a series
+# does not delete its values from the workers' mmap files. The cap still bounds
+# each worker, but idle series only disappear when the server restarts.
+import threading
+
+OVERFLOW_VALUE = "other"
+
+
+class SeriesLimiter:
+    """
+    Args:
+        metric: A labelled Counter/Histogram/Gauge/Summary.
+        max_series: Most distinct label sets admitted (overflow label sets excluded).
+        idle_seconds: Remove label sets unused for this long (None: never).
+        overflow: Callable mapping a refused label tuple to the tuple to record it
+                  under; defaults to every label OVERFLOW_VALUE. Its results should
+                  take few distinct values.
+        dropped: A Counter with one label (the metric name) incremented per
+                 observation redirected to the overflow label set, or None.
+    """
+
+    def __init__(self, metric, max_series=1000, idle_seconds=None, overflow=None, dropped=None):
+        self.metric = metric
+        self.max_series = max_series
+        self.idle_seconds = idle_seconds
+        self.overflow = overflow or (lambda labels: (OVERFLOW_VALUE,) * len(labels))
+        self.dropped = dropped.labels(metric.describe()[0].name) if dropped is not None else None
+        self._series = {}  # label tuple -> [bound child, last used], overflow label sets included
+        self._admitted = 0
+        self._overflow_keys = set()
+        self._lock = threading.Lock()
+        self._next_sweep = None
+
+    def child(self, labels, now):
+        """
+        Returns the bound child for `labels`, or for the overflow label set if the
+        metric is full.
+
+        Args:
+            labels: Tuple of label values, in the metric's label order.
+            now: A time.perf_counter()/time.monotonic() reading, used for idle expiry.
+        """
+        entry = self._series.get(labels)
+        if entry is None:
+            entry = self._add(labels, now)
+        entry[1] = now
+        if self.idle_seconds is not None and now >= self._next_sweep:
+            self._sweep(now)
+        return entry[0]
+
+    def _add(self, labels, now):
+        with self._lock:
+            entry = self._series.get(labels)
+            if entry is not None:
+                return entry
+            if self._next_sweep is None and self.idle_seconds is not None:
+                self._next_sweep = now + self.idle_seconds
+            if self._admitted < self.max_series:
+                self._admitted += 1
+                entry = self._series[labels] = [self.metric.labels(*labels), now]
+                return entry
+            # Refused: record it under the overflow label set
+            overflow_labels = self.overflow(labels)
+            overflow_entry = self._series.get(overflow_labels)
+            if overflow_entry is None:
+                overflow_entry = self._series[overflow_labels] = [self.metric.labels(*overflow_labels), now]
+                self._overflow_keys.add(overflow_labels)
+            if self.dropped is not None:
+                self.dropped.inc()
+            # Refused label sets are not cached (remembering them would be unbounded),
+            # so each of their observations comes back here and is counted
+            return overflow_entry
+
+    def _sweep(self, now):
+        """Removes label sets idle for longer than idle_seconds."""
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            # Sweeping a quarter of the idle time apart keeps expiry within 1.25x idle_seconds
+            self._next_sweep = now + self.idle_seconds / 4
+            cutoff = now - self.idle_seconds
+            for labels in [labels for labels, entry in self._series.items() if entry[1] < cutoff]:
+                del self._series[labels]
+                try:
+                    self.metric.remove(*labels)
+                except KeyError:
+                    pass
+                if labels in self._overflow_keys:
+                    self._overflow_keys.discard(labels)
+                else:
+                    self._admitted -= 1
+
+    def __len__(self):
+        """Label sets currently held, overflow label sets included."""
+        return len(self._series)
+
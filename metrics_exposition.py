@@ -0,0 +1,75 @@
+# metrics_exposition.py
+# Renders the Prometheus /metrics output, aggregated across worker processes and
+# cached for a short TTL.
+#
+# Multiprocess mode (gunicorn -w N): every worker writes its metric values to
+# mmap-backed files in PROMETHEUS_MULTIPROC_DIR, and a scrape served by any worker
+# reads all of them, so each scrape sees the whole server's totals instead of a
+# random worker's. PROMETHEUS_MULTIPROC_DIR must be set (to an empty directory)
+# before prometheus_client is imported, i.e. in the environment that starts
+# gunicorn. gunicorn_metrics_config.py clears the directory at startup and cleans up
+# after workers that exit.
+#
+# Rendering reads every series once per scrape. Its cost depends on the number of
+# series, not on request volume, and the cached output lets repeated or concurrent
+# scrapes within `ttl` seconds share one rendering.
+import os
+import threading
+import time
+
+from prometheus_client import REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def multiprocess_dir():
+    """The multiprocess metrics directory, or None when running single-process."""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+
+class CachedExposition:
+    """
+    Args:
+        ttl: Seconds a rendered output is reused. 0 renders on every scrape.
+        registry: Registry to render in single-process mode.
+    """
+
+    def __init__(self, ttl=1.0, registry=REGISTRY):
+        self.ttl = ttl
+        self.registry = registry
+        self._body = None
+        self._rendered_at = 0.0
+        self._lock = threading.Lock()
+
+    def _collect_registry(self):
+        if multiprocess_dir():
+            # A fresh registry per render: MultiProcessCollector reads the files at collect time
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return registry
+        return self.registry
+
+    def render(self):
+        """Returns the exposition text (bytes), rendering it only if the cached copy expired."""
+        body = self._body
+        if body is not None and time.monotonic() - self._rendered_at < self.ttl:
+            return body
+        # One thread renders; scrapes arriving meanwhile wait for and reuse its output
+        with self._lock:
+            if self._body is not None and time.monotonic() - self._rendered_at < self.ttl:
+                return self._body
+            self._body = generate_latest(self._collect_registry())
+            self._rendered_at = time.monotonic()
+            return self._body
+
+
+def mark_worker_dead(pid):
+    """
+    Cleans up after an exited worker (call from gunicorn's child_exit hook).
+
+    Live-mode gauges ("livesum", "liveall", ...) drop the worker's values; counters
+    and histograms keep them, so totals never go backwards.
+    """
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,222 @@
+# otel_sampling.py
+# Sampling for app_with_otel.py that keeps tracing overhead proportional to what is exported.
+#
+#   - Head sampling: a per-route trace-id ratio (keyed on the `http.route` attribute
+#     the Flask instrumentation sets, e.g. "/user/<user_id>"), wrapped in ParentBased
+#     so child spans and downstream services follow the root's decision.
+#   - Rate limiting: at most `max_per_second` new sampled traces per second (token bucket).
+#   - Tail keep: traces the head sampler dropped are still recorded (not exported) and
+#     buffered until their local root span ends. If any span failed, or the root took
+#     longer than `slow_threshold`, the whole trace is exported anyway. The buffer is
+#     bounded.
+#
+# Unsampled traces cost span creation only when tail keep is on. Without it they are
+# non-recording and nearly free.
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF,
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    StaticSampler,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import SpanContext, StatusCode, TraceFlags
+
+HTTP_ROUTE = "http.route"
+
+
+class RouteRatioSampler(Sampler):
+    """
+    Samples a `ratio` of traces by trace id, with per-route overrides.
+
+    Args:
+        default_ratio: Ratio for routes without an override (and unmatched requests).
+        route_ratios: {route template: ratio}, e.g. {"/user/<user_id>": 0.5}.
+    """
+
+    def __init__(self, default_ratio=1.0, route_ratios=None):
+        self._default = TraceIdRatioBased(default_ratio)
+        self._by_route = {route: TraceIdRatioBased(ratio) for route, ratio in (route_ratios or {}).items()}
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        sampler = self._by_route.get(attributes.get(HTTP_ROUTE), self._default) if attributes else self._default
+        return sampler.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+
+    def get_description(self):
+        routes = ",".join(f"{route}={sampler.rate}" for route, sampler in self._by_route.items())
+        return f"RouteRatioSampler{{default={self._default.rate},{routes}}}"
+
+
+class RateLimitingSampler(Sampler):
+    """Samples what `delegate` samples, but at most `max_per_second` traces per second."""
+
+    def __init__(self, delegate, max_per_second):
+        self.delegate = delegate
+        self.max_per_second = max_per_second
+        self._tokens = float(max_per_second)
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take_token(self):
+        with self._lock:
+            now = time.monotonic()
+            # Up to one second's worth of tokens can accumulate, which allows short bursts
+            self._tokens = min(self.max_per_second, self._tokens + (now - self._refilled_at) * self.max_per_second)
+            self._refilled_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        result = self.delegate.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        if result.decision.is_sampled() and not self._take_token():
+            return SamplingResult(Decision.DROP, trace_state=result.trace_state)
+        return result
+
+    def get_description(self):
+        return f"RateLimitingSampler{{{self.max_per_second}/s,{self.delegate.get_description()}}}"
+
+
+class RecordUnsampled(Sampler):
+    """Turns `delegate`'s DROP decisions into RECORD_ONLY, so TailKeepSpanProcessor sees those spans."""
+
+    def __init__(self, delegate):
+        self.delegate = delegate
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        result = self.delegate.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        if result.decision is Decision.DROP:
+            return SamplingResult(Decision.RECORD_ONLY, result.attributes, result.trace_state)
+        return result
+
+    def get_description(self):
+        return f"RecordUnsampled{{{self.delegate.get_description()}}}"
+
+
+def build_sampler(default_ratio=1.0, route_ratios=None, max_per_second=None, tail_keep=False):
+    """
+    The parent-based sampler for the app's TracerProvider.
+
+    Local children of a recorded-but-unsampled root are recorded too when tail_keep
+    is on, so a kept trace is complete. Traces a remote caller decided not to sample
+    are never recorded.
+    """
+    root = RouteRatioSampler(default_ratio, route_ratios)
+    if max_per_second:
+        root = RateLimitingSampler(root, max_per_second)
+    if not tail_keep:
+        return ParentBased(root)
+    return ParentBased(
+        RecordUnsampled(root),
+        remote_parent_not_sampled=ALWAYS_OFF,
+        local_parent_not_sampled=StaticSampler(Decision.RECORD_ONLY),
+    )
+
+
+def _as_sampled(span):
+    """A copy of a finished recorded-only span, flagged as sampled so exporters accept it."""
+    context = span.context
+    return ReadableSpan(
+        name=span.name,
+        context=SpanContext(context.trace_id, context.span_id, context.is_remote,
+                            TraceFlags(TraceFlags.SAMPLED), context.trace_state),
+        parent=span.parent,
+        resource=span.resource,
+        attributes={**(span.attributes or {}), "sampling.tail_kept": True},
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class TailKeepSpanProcessor(SpanProcessor):
+    """
+    Passes sampled spans to `delegate` and exports unsampled traces only if they failed or were slow.
+
+    Args:
+        delegate: The exporting processor (e.g. a BatchSpanProcessor).
+        slow_threshold: Seconds; a local root span at least this long keeps its trace.
+        max_pending_traces: Unsampled traces buffered at once. When full, the oldest
+                            is discarded (counted in `discarded`).
+    """
+
+    def __init__(self, delegate, slow_threshold=0.5, max_pending_traces=2048):
+        self.delegate = delegate
+        self.slow_threshold_ns = int(slow_threshold * 1e9)
+        self.max_pending_traces = max_pending_traces
+        self._pending = OrderedDict()  # trace id -> finished spans
+        self._lock = threading.Lock()
+        self.kept = 0
+        self.discarded = 0
+
+    def on_start(self, span, parent_context=None):
+        self.delegate.on_start(span, parent_context)
+
+    def on_end(self, span):
+        if span.context.trace_flags.sampled:
+            self.delegate.on_end(span)
+            return
+        trace_id = span.context.trace_id
+        local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._pending.pop(trace_id, None) or []
+            spans.append(span)
+            if not local_root:
+                self._pending[trace_id] = spans
+                if len(self._pending) > self.max_pending_traces:
+                    self._pending.popitem(last=False)
+                    self.discarded += 1
+                return
+        keep = span.end_time - span.start_time >= self.slow_threshold_ns or any(
+            finished.status.status_code is StatusCode.ERROR for finished in spans
+        )
+        if keep:
+            self.kept += 1
+            for finished in spans:
+                self.delegate.on_end(_as_sampled(finished))
+
+    def shutdown(self):
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self.delegate.force_flush(timeout_millis)
+
+
+def tuned_batch_processor(exporter):
+    """
+    BatchSpanProcessor sized for production traffic. The standard OTEL_BSP_* variables
+    still override each setting.
+
+    A larger queue than the SDK default (2048) absorbs bursts instead of dropping spans.
+    Larger batches (default 512) mean fewer export calls. A 2 s delay (default 5 s)
+    keeps the queue short between exports.
+    """
+    return BatchSpanProcessor(
+        exporter,
+        max_queue_size=int(os.environ.get("OTEL_BSP_MAX_QUEUE_SIZE", 8192)),
+        schedule_delay_millis=float(os.environ.get("OTEL_BSP_SCHEDULE_DELAY", 2000)),
+        max_export_batch_size=int(os.environ.get("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", 1024)),
+        export_timeout_millis=float(os.environ.get("OTEL_BSP_EXPORT_TIMEOUT", 10000)),
+    )
+
+
+def parse_route_ratios(value):
+    """Parses "route=ratio,route=ratio" (e.g. "/=0.01,/user/<user_id>=0.5") into a dict."""
+    ratios = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        route, _, ratio = item.rpartition("=")
+        ratios[route] = float(ratio)
+    return ratios
@@ -0,0 +1,135 @@
+# prometheus_middleware.py
+# WSGI middleware that records Prometheus request metrics for every route of a Flask app.
+#
+#   metrics = PrometheusMiddleware(app)
+#
+# Per request it records:
+#   - <prefix>_requests_total{method, endpoint, status_code}
+#   - <prefix>_request_latency_seconds{method, endpoint}   (histogram)
+#   - <prefix>_requests_in_progress                         (gauge)
+#
+# `endpoint` is the matched URL rule template ("/user/<user_id>"), never the raw path,
+# so the number of series is bounded by the number of routes. Requests that match no
+# route are recorded as endpoint="<unmatched>", and methods outside KNOWN_METHODS as
+# method="other". On top of that, each metric is capped at `max_series` label sets
+# and idle label sets expire (metrics_cardinality.py). Overflow is recorded under
+# endpoint="other" and counted in <prefix>_metric_series_dropped_total{metric}.
+#
+# Overhead budget: at most 25 us per request on top of the app itself, measured by
+# benchmarks/bench_metrics_middleware.py (~19 us on a machine where a bare Flask
+# request takes ~130 us; about half of that is prometheus_client's own locked
+# inc/observe calls). To stay within it:
+#   - Bound label children are cached in a plain dict (by the SeriesLimiters), so
+#     .labels() (label validation, tuple building and a lock) runs once per label
+#     set, not per request.
+#   - Timing uses time.perf_counter().
+#   - The route template Flask already matched is handed over through the WSGI
+#     environ, instead of matching the URL a second time. It is captured by a
+#     before_request function placed ahead of the app's own, so it runs for every
+#     request, even one that a later before_request function answers.
+#
+# Latency is measured until the app returns its response iterable. For streamed
+# responses that is the time to the first byte, not the time to send the whole body.
+import time
+
+from flask.globals import request_ctx
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+
+from metrics_cardinality import OVERFLOW_VALUE, SeriesLimiter
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, float("inf"))
+UNMATCHED_ENDPOINT = "<unmatched>"
+ENDPOINT_ENVIRON_KEY = "prometheus_middleware.endpoint"
+KNOWN_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+
+class PrometheusMiddleware:
+    """
+    Wraps `app.wsgi_app` on construction.
+
+    Args:
+        app: The Flask app to instrument.
+        prefix: Metric name prefix.
+        buckets: Latency histogram buckets, in seconds.
+        registry: Registry the metrics are registered in.
+        excluded_paths: Raw paths that are not instrumented (e.g. the /metrics route itself).
+        max_series: Label sets kept per metric before new ones go to endpoint="other".
+        series_idle_seconds: Label sets unused for this long are removed (None: never).
+    """
+
+    def __init__(self, app, prefix="myflaskapp", buckets=DEFAULT_BUCKETS, registry=REGISTRY,
+                 excluded_paths=("/metrics",), max_series=1000, series_idle_seconds=3600):
+        self.wsgi_app = app.wsgi_app
+        self.excluded_paths = frozenset(excluded_paths)
+        self.requests_total = Counter(
+            f"{prefix}_requests_total",
+            "Total number of HTTP requests processed",
+            ["method", "endpoint", "status_code"],
+            registry=registry,
+        )
+        self.request_latency = Histogram(
+            f"{prefix}_request_latency_seconds",
+            "HTTP request latency in seconds",
+            ["method", "endpoint"],
+            buckets=buckets,
+            registry=registry,
+        )
+        self.in_progress = Gauge(
+            f"{prefix}_requests_in_progress",
+            "HTTP requests currently being processed",
+            registry=registry,
+            # Summed over live workers in multiprocess mode (metrics_exposition.py)
+            multiprocess_mode="livesum",
+        )
+        self.series_dropped = Counter(
+            f"{prefix}_metric_series_dropped",
+            "Observations recorded under endpoint=\"other\" because the metric reached its series cap",
+            ["metric"],
+            registry=registry,
+        )
+        self._requests_series = SeriesLimiter(
+            self.requests_total, max_series, series_idle_seconds,
+            overflow=lambda labels: (labels[0], OVERFLOW_VALUE, labels[2]), dropped=self.series_dropped,
+        )
+        self._latency_series = SeriesLimiter(
+            self.request_latency, max_series, series_idle_seconds,
+            overflow=lambda labels: (labels[0], OVERFLOW_VALUE), dropped=self.series_dropped,
+        )
+        # First of the app-wide before_request functions, so it runs even when a later one answers the request
+        app.before_request_funcs.setdefault(None, []).insert(0, self._remember_endpoint)
+        app.wsgi_app = self
+
+    def _remember_endpoint(self):
+        request = request_ctx.request
+        rule = request.url_rule
+        if rule is not None:
+            request.environ[ENDPOINT_ENVIRON_KEY] = rule.rule
+
+    def record(self, method, endpoint, status, elapsed, now):
+        """Records one request. `now` is a time.perf_counter() reading (used for series expiry)."""
+        if method not in KNOWN_METHODS:
+            method = OVERFLOW_VALUE
+        self._requests_series.child((method, endpoint, status), now).inc()
+        self._latency_series.child((method, endpoint), now).observe(elapsed)
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") in self.excluded_paths:
+            return self.wsgi_app(environ, start_response)
+
+        status_holder = []
+
+        def recording_start_response(status, headers, exc_info=None):
+            status_holder.append(status)
+            return start_response(status, headers, exc_info)
+
+        self.in_progress.inc()
+        started = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, recording_start_response)
+        finally:
+            finished = time.perf_counter()
+            self.in_progress.dec()
+            # No status means the app raised before responding; the server answers 500
+            status = status_holder[-1][:3] if status_holder else "500"
+            self.record(environ.get("REQUEST_METHOD", "GET"), environ.get(ENDPOINT_ENVIRON_KEY, UNMATCHED_ENDPOINT),
+                        status, finished - started, finished)
@@ -0,0 +1,151 @@
+# quiz_analytics.py
+# Per-question quiz analytics kept as running sums, updated as submissions are graded.
+#
+# For each quiz, QuizStats holds:
+#   - n, Σscore and Σscore² over all submissions
+#   - per question: Σcorrect, Σanswered and Σ(score · correct)
+#   - a histogram of scores
+# Every statistic is a function of these sums. Reading them is O(questions + bins) no
+# matter how many submissions there are:
+#   difficulty      p_j = Σcorrect_j / n (the share of students who got it right)
+#   discrimination  the point-biserial correlation between getting question j right
+#                   and the total score. For binary x: r = (nΣxy - ΣxΣy) /
+#                   sqrt((nΣx - (Σx)²)(nΣy² - (Σy)²)).
+# Sums add, so accumulators from different batches, workers or processes merge by
+# addition (merge(), to_dict()/from_dict()).
+import math
+
+import numpy as np
+
+MAX_HISTOGRAM_BINS = 20
+
+
+def histogram_edges(max_score):
+    """Bin edges over [0, max_score]: one bin per point for small integer maxima, else MAX_HISTOGRAM_BINS bins."""
+    if float(max_score).is_integer() and max_score + 1 <= MAX_HISTOGRAM_BINS:
+        return np.arange(int(max_score) + 2, dtype=np.float64) - 0.5
+    return np.linspace(0, max_score, MAX_HISTOGRAM_BINS + 1)
+
+
+def _question_label(questions, index):
+    question = questions[index] if questions and index < len(questions) else None
+    return question.get("q") if isinstance(question, dict) else None
+
+
+class QuizStats:
+    """Mergeable accumulators for one quiz with `num_questions` questions and scores in [0, max_score]."""
+
+    def __init__(self, num_questions, max_score):
+        self.num_questions = num_questions
+        self.max_score = max_score
+        self.n = 0
+        self.score_sum = 0.0
+        self.score_sq_sum = 0.0
+        self.correct = np.zeros(num_questions, dtype=np.int64)
+        self.answered = np.zeros(num_questions, dtype=np.int64)
+        self.score_correct_sum = np.zeros(num_questions, dtype=np.float64)
+        self.histogram = np.zeros(len(histogram_edges(max_score)) - 1, dtype=np.int64)
+
+    @classmethod
+    def from_graded(cls, graded, num_questions):
+        """Accumulators for one quiz_grading.GradedBatch, computed with array operations."""
+        stats = cls(num_questions, graded.max_score)
+        scores = graded.scores.astype(np.float64)
+        stats.n = len(scores)
+        stats.score_sum = float(scores.sum())
+        stats.score_sq_sum = float(scores @ scores)
+        stats.correct = graded.correct.sum(axis=0, dtype=np.int64)
+        stats.answered = graded.answered.sum(axis=0, dtype=np.int64)
+        stats.score_correct_sum = scores @ graded.correct
+        # Clip so scores at the edges land in the first/last bin
+        edges = histogram_edges(graded.max_score)
+        stats.histogram = np.histogram(np.clip(scores, edges[0], edges[-1]), bins=edges)[0].astype(np.int64)
+        return stats
+
+    def merge(self, other):
+        """Adds `other`'s submissions to this accumulator (same quiz)."""
+        if other.num_questions != self.num_questions or other.max_score != self.max_score:
+            raise ValueError("Cannot merge statistics of different quizzes")
+        self.n += other.n
+        self.score_sum += other.score_sum
+        self.score_sq_sum += other.score_sq_sum
+        self.correct += other.correct
+        self.answered += other.answered
+        self.score_correct_sum += other.score_correct_sum
+        self.histogram += other.histogram
+        return self
+
+    def copy(self):
+        return QuizStats(self.num_questions, self.max_score).merge(self)
+
+    # --- Reading ---
+    def _point_biserial(self):
+        n, sum_y = self.n, self.score_sum
+        sum_x = self.correct.astype(np.float64)
+        score_var = n * self.score_sq_sum - sum_y * sum_y
+        item_var = n * sum_x - sum_x * sum_x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = (n * self.score_correct_sum - sum_x * sum_y) / np.sqrt(item_var * score_var)
+        # Undefined when everyone (or no one) got the question right, or all scores are equal
+        return [None if not math.isfinite(value) else round(value, 4) for value in r.tolist()]
+
+    def report(self, questions=None):
+        """
+        The analytics, as a JSON-ready dict.
+
+        Args:
+            questions: The quiz's question dicts, to label each question with its "q" text.
+                       Questions that are not dicts (quizzes stored before the API
+                       validated them) get no label.
+        """
+        n = self.n
+        mean = self.score_sum / n if n else None
+        variance = max(self.score_sq_sum / n - mean * mean, 0.0) if n else None
+        discrimination = self._point_biserial() if n else [None] * self.num_questions
+        edges = histogram_edges(self.max_score)
+        return {
+            "submissions": n,
+            "max_score": self.max_score,
+            "mean_score": round(mean, 4) if n else None,
+            "score_stdev": round(math.sqrt(variance), 4) if n else None,
+            "score_distribution": [
+                {"min": round(max(low, 0), 4), "max": round(min(high, self.max_score), 4), "count": count}
+                for low, high, count in zip(edges[:-1].tolist(), edges[1:].tolist(), self.histogram.tolist())
+            ],
+            "questions": [
+                {
+                    "index": j,
+                    "q": _question_label(questions, j),
+                    "difficulty": round(correct / n, 4) if n else None,
+                    "discrimination": discrimination[j],
+                    "answered": answered,
+                }
+                for j, (correct, answered) in enumerate(zip(self.correct.tolist(), self.answered.tolist()))
+            ],
+        }
+
+    # --- Serialization (SQLite storage, cross-process merging) ---
+    def to_dict(self):
+        return {
+            "num_questions": self.num_questions,
+            "max_score": self.max_score,
+            "n": self.n,
+            "score_sum": self.score_sum,
+            "score_sq_sum": self.score_sq_sum,
+            "correct": self.correct.tolist(),
+            "answered": self.answered.tolist(),
+            "score_correct_sum": self.score_correct_sum.tolist(),
+            "histogram": self.histogram.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data["num_questions"], data["max_score"])
+        stats.n = data["n"]
+        stats.score_sum = data["score_sum"]
+        stats.score_sq_sum = data["score_sq_sum"]
+        stats.correct = np.array(data["correct"], dtype=np.int64)
+        stats.answered = np.array(data["answered"], dtype=np.int64)
+        stats.score_correct_sum = np.array(data["score_correct_sum"], dtype=np.float64)
+        stats.histogram = np.array(data["histogram"], dtype=np.int64)
+        return stats
@@ -0,0 +1,136 @@
+# quiz_grading.py
+# Grades quiz submissions in batches with NumPy.
+#
+# A quiz's answer key is compiled once: every accepted answer (normalized: whitespace
+# collapsed, case-folded) gets an integer code, and the key becomes one int32 code per
+# question. Grading a batch encodes all submitted answers into an (n submissions x
+# n questions) code matrix and compares it with the key row in one vectorized
+# operation. The result is the per-question correctness matrix, and the scores are a
+# matrix-vector product with the question points.
+#
+# Encoding is the only per-answer Python work: one dict lookup per answer, done in C
+# by map(). Raw answers seen before are cached, so only new spellings get normalized.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+WRONG = -1       # answered, but not any question's accepted answer
+UNANSWERED = -2  # missing or null
+NO_KEY = -3      # key code of a question without an "a": no submitted answer matches it
+MAX_CACHED_SPELLINGS = 65536
+
+
+def normalize_answer(value):
+    """"  Four " -> "four"; 4 -> "4". Booleans are compared as "true"/"false"."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return " ".join(str(value).split()).casefold()
+
+
+class GradedBatch:
+    """
+    Attributes:
+        correct: bool array (n submissions, n questions).
+        answered: bool array of the same shape; False where no answer was given.
+        scores: Points per submission (ints if every question's points are ints).
+        max_score: Points for a perfect submission.
+    """
+
+    __slots__ = ("correct", "answered", "scores", "max_score")
+
+    def __init__(self, correct, answered, scores, max_score):
+        self.correct = correct
+        self.answered = answered
+        self.scores = scores
+        self.max_score = max_score
+
+
+class CompiledQuiz:
+    """
+    A quiz's answer key, ready for batch grading.
+
+    Questions are the quiz's `{"q", "a"}` dicts; an optional "points" (default 1)
+    weights a question. A question without an "a" is never answered correctly.
+    """
+
+    def __init__(self, quiz):
+        questions = quiz["questions"]
+        self.quiz_id = quiz["id"]
+        self.num_questions = len(questions)
+        self._codes = {}  # normalized accepted answer -> code
+        self.key = np.array(
+            [self._codes.setdefault(normalize_answer(question["a"]), len(self._codes)) if "a" in question else NO_KEY
+             for question in questions],
+            dtype=np.int32,
+        )
+        self.points = np.array([question.get("points", 1) for question in questions])
+        self.max_score = self.points.sum().item() if self.num_questions else 0
+        # Raw answer -> code, for every spelling seen so far (bounded)
+        self._spellings = dict(self._codes)
+        self._spellings[None] = UNANSWERED
+        self._lock = threading.Lock()
+
+    def _encode(self, answers_batch):
+        """Returns the int32 code matrix for a list of answer lists (shorter lists are padded as unanswered)."""
+        width = self.num_questions
+        flat = []
+        for answers in answers_batch:
+            flat.extend(answers)
+            if len(answers) < width:
+                flat.extend([None] * (width - len(answers)))
+        codes = list(map(self._spellings.get, flat))
+        if None in codes:
+            with self._lock:
+                for i, code in enumerate(codes):
+                    if code is None:
+                        answer = flat[i]
+                        code = codes[i] = self._codes.get(normalize_answer(answer), WRONG)
+                        # Only strings: True == 1 == 1.0 would share a cache entry
+                        if type(answer) is str and len(self._spellings) < MAX_CACHED_SPELLINGS:
+                            self._spellings[answer] = code
+        return np.array(codes, dtype=np.int32).reshape(len(answers_batch), width)
+
+    def grade(self, answers_batch):
+        """
+        Grades a batch of submissions.
+
+        Args:
+            answers_batch: One list of answers per submission, in question order. Answers
+                           are strings, numbers, booleans or None (unanswered); each list
+                           has at most num_questions items.
+
+        Returns:
+            GradedBatch.
+        """
+        codes = self._encode(answers_batch)
+        correct = codes == self.key
+        scores = correct.astype(self.points.dtype) @ self.points
+        return GradedBatch(correct, codes != UNANSWERED, scores, self.max_score)
+
+
+class CompiledQuizCache:
+    """Compiled quizzes keyed by (quiz id, version), least recently used evicted first."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id, version, load_quiz):
+        """Returns the CompiledQuiz for this version, compiling `load_quiz()` on a miss (None if it returns None)."""
+        key = (quiz_id, version)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+        quiz = load_quiz()
+        if quiz is None:
+            return None
+        compiled = CompiledQuiz(quiz)
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
@@ -0,0 +1,143 @@
+# records.py
+# Compact record types for the entities MemoryStorage keeps in memory.
+#
+# A catalog of millions of lessons is mostly per-object overhead. As a dict, a
+# lesson costs a hash table with four key slots plus a list for its content ids, and
+# MemoryStorage.versions held another (kind, id) tuple and dict entry per entity.
+# The records here are __slots__ classes instead:
+#   - no per-instance __dict__, the fields sit in fixed slots
+#   - the entity's version is a slot, so there is no separate version table
+#   - list fields become tuples, and short repeated strings (content ids such as
+#     "intro.mp4", question keys, common answers) are shared through a bounded pool
+#   - a course's lesson index is a sorted array('q') of ids, 8 bytes per lesson
+#
+# Records stay inside the storage: MemoryStorage hands out to_dict() copies with the
+# same shape as before, so handlers and responses don't change. Records pickle as
+# (class, field tuple), which keeps snapshots and log records compact and pools
+# the strings again when they are loaded.
+from array import array
+
+MAX_POOLED_LENGTH = 64
+MAX_POOLED_STRINGS = 1 << 20
+
+
+class StringPool:
+    """
+    Shares one object per distinct short string.
+
+    Unlike sys.intern, the pool is bounded: once it holds max_entries strings, new
+    ones are returned as they are. Request data can't grow it without limit.
+    """
+
+    def __init__(self, max_entries=MAX_POOLED_STRINGS):
+        self.max_entries = max_entries
+        self._strings = {}
+
+    def __call__(self, value):
+        if type(value) is not str or len(value) > MAX_POOLED_LENGTH:
+            return value
+        pooled = self._strings.get(value)
+        if pooled is not None:
+            return pooled
+        if len(self._strings) >= self.max_entries:
+            return value
+        # setdefault is atomic, so racing threads agree on one object
+        return self._strings.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._strings)
+
+
+pool = StringPool()
+
+
+def compact_list(value):
+    # Lists become tuples of pooled items. JSON never produces tuples, so to_dict()
+    # can tell them apart from other values the API accepted (validation is loose).
+    # (Tuples are pooled again when a record is unpickled.)
+    return tuple(map(pool, value)) if type(value) in (list, tuple) else value
+
+
+def _expand_list(value):
+    return list(value) if type(value) is tuple else value
+
+
+def _expand_questions(questions):
+    # A fresh list of fresh question dicts: callers may edit what to_dict() returns
+    if type(questions) is not list:
+        return questions
+    return [dict(question) if type(question) is dict else question for question in questions]
+
+
+def _compact_questions(questions):
+    if type(questions) is not list:
+        return questions
+    return [
+        {pool(key): pool(answer) if key == "a" else answer for key, answer in question.items()}
+        if type(question) is dict else question
+        for question in questions
+    ]
+
+
+class LessonRecord:
+    __slots__ = ("id", "course_id", "title", "content_ids", "version")
+
+    def __init__(self, id, course_id, title, content_ids, version=1):
+        self.id = id
+        self.course_id = course_id
+        self.title = title
+        self.content_ids = compact_list(content_ids)
+        self.version = version
+
+    def __reduce__(self):
+        return LessonRecord, (self.id, self.course_id, self.title, self.content_ids, self.version)
+
+    def to_dict(self):
+        return {"id": self.id, "course_id": self.course_id, "title": self.title,
+                "content_ids": _expand_list(self.content_ids)}
+
+
+class QuizRecord:
+    __slots__ = ("id", "title", "questions", "lesson_id", "version")
+
+    def __init__(self, id, title, questions, lesson_id, version=1):
+        self.id = id
+        self.title = title
+        self.questions = _compact_questions(questions)
+        self.lesson_id = lesson_id
+        self.version = version
+
+    def __reduce__(self):
+        return QuizRecord, (self.id, self.title, self.questions, self.lesson_id, self.version)
+
+    def to_dict(self):
+        return {"id": self.id, "title": self.title, "questions": _expand_questions(self.questions),
+                "lesson_id": self.lesson_id}
+
+
+class AssignmentRecord:
+    __slots__ = ("id", "title", "description", "lesson_id", "version")
+
+    def __init__(self, id, title, description, lesson_id, version=1):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.lesson_id = lesson_id
+        self.version = version
+
+    def __reduce__(self):
+        return AssignmentRecord, (self.id, self.title, self.description, self.lesson_id, self.version)
+
+    def to_dict(self):
+        return {"id": self.id, "title": self.title, "description": self.description, "lesson_id": self.lesson_id}
+
+
+class CourseRecord:
+    """A course and its lesson index: the ids of its lessons, kept sorted in an array('q')."""
+
+    __slots__ = ("id", "name", "lesson_ids")
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+        self.lesson_ids = array("q")
@@ -0,0 +1,84 @@
+# response_cache.py
+# In-process cache of serialized JSON response bodies, invalidated by entity versions.
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class VersionedResponseCache:
+    """
+    LRU cache of serialized response bodies with a memory cap.
+
+    Callers put the versions of everything a response depends on into the cache key,
+    e.g. ("quiz", quiz_id, quiz_version). When storage bumps a version on write, the
+    next read builds a new key, misses, and the stale entry is evicted later by LRU.
+    Nothing has to be invalidated explicitly, which also keeps workers that share an
+    SQLite database correct: they all read the same versions.
+
+    Each entry stores the body together with a strong ETag (a hash of the body).
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (body bytes, etag)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def make_etag(body):
+        return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+    def get(self, key):
+        """Returns (body, etag) for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        """Caches `body` under `key` and returns (body, etag)."""
+        entry = (body, self.make_etag(body))
+        if len(body) > self.max_bytes:
+            return entry  # never cacheable; don't flush everything else for it
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (evicted_body, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted_body)
+                self.evictions += 1
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
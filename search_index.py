@@ -0,0 +1,411 @@
+# search_index.py
+# In-process full-text search over lessons, quizzes and assignments, ranked with BM25.
+#
+# What is indexed:
+#   lesson      its title (results can be limited to one course)
+#   quiz        its title and the text ("q") of each question
+#   assignment  its title and description
+# Text is split into lowercase word tokens (\w+, so Unicode letters and digits). There
+# is no stemming and there are no stop words.
+#
+# Layout (an inverted index):
+#   - Every indexed version of an entity gets the next document number (docno).
+#     Per-docno metadata (kind, entity id, course id, token count, live flag) is kept
+#     in NumPy arrays that double in size as they grow.
+#   - Each term has a posting list of (docno, term frequency) pairs in docno order.
+#     Docnos only increase, so indexing a document appends to the lists of its terms.
+#   - Postings are compressed in blocks of BLOCK_SIZE. Docno deltas use the narrowest
+#     of uint8/uint16/uint32 that fits the block, and frequencies are uint8. Blocks of
+#     the same width are stored back to back, so decoding a whole list takes a few
+#     vectorized calls, however long it is. The newest postings, less than a block,
+#     stay uncompressed.
+#   - An update indexes the new version under a new docno and marks the old docno
+#     dead. A delete only marks it dead. Queries skip dead postings. compact() drops
+#     them and renumbers the documents, and it runs once dead documents outnumber live
+#     ones. Until then, document frequencies include dead postings, as in Lucene.
+#
+# Scoring: BM25 (k1=1.2, b=0.75), summed over the query's terms. A document matches if
+# it contains any of the terms.
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+BLOCK_SIZE = 128
+K1 = 1.2
+B = 0.75
+KINDS = ("lesson", "quiz", "assignment")
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+# Block delta widths, narrowest first
+_DELTA_TYPES = (np.dtype(np.uint8), np.dtype(np.uint16), np.dtype(np.uint32))
+MIN_DEAD_TO_COMPACT = 10000
+INDEX_BATCH_SIZE = 10000  # documents tokenized per lock acquisition in add_many()
+TOP_SAMPLE_STRIDE = 64  # see _top()
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.casefold())
+
+
+def document_text(kind, entity):
+    """The searchable text of a lesson, quiz or assignment dict. Non-string fields are skipped."""
+    parts = [entity.get("title")]
+    if kind == "quiz":
+        questions = entity.get("questions")
+        if isinstance(questions, list):
+            parts.extend(question.get("q") for question in questions if isinstance(question, dict))
+    elif kind == "assignment":
+        parts.append(entity.get("description"))
+    return " ".join(part for part in parts if isinstance(part, str))
+
+
+class _PostingList:
+    """One term's postings: compressed blocks grouped by delta width, plus an uncompressed tail."""
+
+    __slots__ = ("count", "tail", "blocks")
+
+    def __init__(self):
+        self.count = 0  # document frequency, dead postings included
+        self.tail = array("I")  # docno, frequency, docno, frequency, ... not yet in a block
+        self.blocks = None  # delta dtype char -> [bases array("I"), deltas bytearray, frequencies bytearray]
+
+    def append(self, docno, frequency):
+        self.tail.append(docno)
+        self.tail.append(min(frequency, 255))
+        self.count += 1
+        if len(self.tail) == 2 * BLOCK_SIZE:
+            pairs = np.array(self.tail, dtype=np.int64).reshape(BLOCK_SIZE, 2)
+            self._add_blocks(pairs[:, 0].reshape(1, BLOCK_SIZE), pairs[:, 1].reshape(1, BLOCK_SIZE))
+            self.tail = array("I")
+
+    def _add_blocks(self, docnos, frequencies):
+        """Compresses full blocks: `docnos` and `frequencies` are (n blocks, BLOCK_SIZE) arrays."""
+        if self.blocks is None:
+            self.blocks = {}
+        deltas = np.diff(docnos, axis=1, prepend=docnos[:, :1])
+        widest = deltas.max(axis=1)
+        for dtype in _DELTA_TYPES:
+            rows = widest <= np.iinfo(dtype).max
+            if rows.any():
+                group = self.blocks.setdefault(dtype.char, [array("I"), bytearray(), bytearray()])
+                group[0].extend(docnos[rows, 0].tolist())
+                group[1] += deltas[rows].astype(dtype).tobytes()
+                group[2] += frequencies[rows].astype(np.uint8).tobytes()
+                widest = np.where(rows, np.iinfo(np.uint32).max + 1, widest)
+
+    @classmethod
+    def from_arrays(cls, docnos, frequencies):
+        """A posting list holding sorted `docnos` with their frequencies (used by compaction)."""
+        postings = cls()
+        postings.count = len(docnos)
+        full = len(docnos) // BLOCK_SIZE * BLOCK_SIZE
+        if full:
+            postings._add_blocks(docnos[:full].reshape(-1, BLOCK_SIZE), frequencies[:full].reshape(-1, BLOCK_SIZE))
+        tail = np.empty((len(docnos) - full, 2), dtype=np.uint32)
+        tail[:, 0] = docnos[full:]
+        tail[:, 1] = frequencies[full:]
+        postings.tail = array("I", tail.tobytes())
+        return postings
+
+    def decode(self):
+        """
+        Returns (docnos as int32, frequencies as float32), unordered across blocks. Callers
+        hold the index lock. Scoring a common term touches every posting, so the narrow
+        types halve the memory it streams through.
+        """
+        docnos = []
+        frequencies = []
+        for char, (bases, deltas, block_frequencies) in (self.blocks or {}).items():
+            block_deltas = np.frombuffer(deltas, dtype=char).reshape(-1, BLOCK_SIZE)
+            starts = np.frombuffer(bases, dtype=np.uint32).astype(np.int32)
+            docnos.append((np.cumsum(block_deltas, axis=1, dtype=np.int32) + starts[:, None]).ravel())
+            frequencies.append(np.frombuffer(block_frequencies, dtype=np.uint8).astype(np.float32))
+        if self.tail:
+            pairs = np.frombuffer(self.tail, dtype=np.uint32).reshape(-1, 2)
+            docnos.append(pairs[:, 0].astype(np.int32))
+            frequencies.append(pairs[:, 1].astype(np.float32))
+        if len(docnos) == 1:
+            return docnos[0], frequencies[0]
+        return np.concatenate(docnos), np.concatenate(frequencies)
+
+
+def _top(scores, limit, docnos=None):
+    """
+    Indices of the `limit` highest of `scores` (more than `limit` of them), in no order.
+    Ties at the cut go to the lowest `docnos` (default: the lowest indices).
+    """
+    # The limit-th best of a strided sample is a lower bound for the limit-th best
+    # overall, so a single comparison pass narrows the selection to a few candidates
+    sample = scores[::TOP_SAMPLE_STRIDE]
+    if len(sample) > limit:
+        candidates = np.flatnonzero(scores >= np.partition(sample, len(sample) - limit)[len(sample) - limit])
+    else:
+        candidates = np.arange(len(scores))
+    candidate_scores = scores[candidates]
+    cut = np.partition(candidate_scores, len(candidates) - limit)[len(candidates) - limit]
+    above = candidates[candidate_scores > cut]
+    tied = candidates[candidate_scores == cut]
+    if docnos is not None:
+        tied = tied[np.argsort(docnos[tied], kind="stable")]
+    return np.concatenate([above, tied[:limit - len(above)]])
+
+
+def _course_key(course_id):
+    """A lesson's course id as stored in the int64 course array: -1 unless it is an int that fits."""
+    if type(course_id) is int and 0 <= course_id <= np.iinfo(np.int64).max:
+        return course_id
+    return -1
+
+
+def _and(mask, condition):
+    return condition if mask is None else mask & condition
+
+
+def _grown(values, size, fill):
+    """`values`, or a copy at least twice as large if it can't hold `size` items."""
+    if size <= len(values):
+        return values
+    grown = np.full(max(size, 2 * len(values)), fill, dtype=values.dtype)
+    grown[:len(values)] = values
+    return grown
+
+
+class SearchIndex:
+    """
+    BM25 full-text index of lessons, quizzes and assignments.
+
+    Writers (add/remove) are serialized by a lock. Queries hold it only while decoding
+    posting lists, then score against the metadata arrays as they were: writes only
+    append past those documents or clear live flags, and compaction swaps in new arrays.
+    """
+
+    def __init__(self, k1=K1, b=B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._terms = {}  # term -> _PostingList
+        self._size = 0  # docnos handed out
+        self._kinds = np.zeros(1024, dtype=np.int8)
+        self._entity_ids = np.zeros(1024, dtype=np.int64)
+        self._course_ids = np.full(1024, -1, dtype=np.int64)
+        self._lengths = np.zeros(1024, dtype=np.int32)
+        self._live = np.zeros(1024, dtype=bool)
+        self._docnos = {kind: np.full(1024, -1, dtype=np.int64) for kind in KINDS}  # entity id -> live docno
+        self.live_documents = 0
+        self.dead_documents = 0
+        self._live_tokens = 0
+
+    def __len__(self):
+        return self.live_documents
+
+    # --- Indexing ---
+    def add(self, kind, entity):
+        """Indexes (or re-indexes) one entity dict of `kind` ("lesson", "quiz" or "assignment")."""
+        self.add_many(kind, [entity])
+
+    def add_many(self, kind, entities):
+        """Indexes an iterable of entity dicts of one kind, in batches."""
+        entities = iter(entities)
+        while True:
+            batch = list(islice(entities, INDEX_BATCH_SIZE))
+            if not batch:
+                return
+            self._add_batch(kind, batch)
+
+    def _add_batch(self, kind, entities):
+        # Tokenizing is the expensive part and needs no lock. Everything that could fail
+        # (course ids included) is checked here too: the storage has already committed
+        # these entities, and an error under the lock would leave a batch half indexed.
+        documents = [
+            (entity["id"], Counter(tokenize(document_text(kind, entity))),
+             _course_key(entity.get("course_id")) if kind == "lesson" else -1)
+            for entity in entities
+        ]
+        code = _KIND_CODES[kind]
+        with self._lock:
+            for entity_id, counts, course_id in documents:
+                self._remove(kind, entity_id)
+                docno = self._size
+                self._size += 1
+                self._reserve(docno + 1)
+                length = sum(counts.values())
+                self._kinds[docno] = code
+                self._entity_ids[docno] = entity_id
+                self._course_ids[docno] = course_id
+                self._lengths[docno] = length
+                self._live[docno] = True
+                docnos = self._docnos[kind] = _grown(self._docnos[kind], entity_id + 1, -1)
+                docnos[entity_id] = docno
+                terms = self._terms
+                for term, frequency in counts.items():
+                    postings = terms.get(term)
+                    if postings is None:
+                        postings = terms[term] = _PostingList()
+                    postings.append(docno, frequency)
+                self.live_documents += 1
+                self._live_tokens += length
+            if self.dead_documents > max(self.live_documents, MIN_DEAD_TO_COMPACT):
+                self._compact()
+
+    def remove(self, kind, entity_id):
+        """Removes an entity from the index (no-op if it isn't indexed)."""
+        with self._lock:
+            self._remove(kind, entity_id)
+            if self.dead_documents > max(self.live_documents, MIN_DEAD_TO_COMPACT):
+                self._compact()
+
+    def _remove(self, kind, entity_id):
+        docnos = self._docnos[kind]
+        if entity_id >= len(docnos) or docnos[entity_id] < 0:
+            return
+        docno = docnos[entity_id]
+        docnos[entity_id] = -1
+        self._live[docno] = False
+        self.live_documents -= 1
+        self.dead_documents += 1
+        self._live_tokens -= int(self._lengths[docno])
+
+    def _reserve(self, size):
+        self._kinds = _grown(self._kinds, size, 0)
+        self._entity_ids = _grown(self._entity_ids, size, 0)
+        self._course_ids = _grown(self._course_ids, size, -1)
+        self._lengths = _grown(self._lengths, size, 0)
+        self._live = _grown(self._live, size, False)
+
+    def compact(self):
+        """Drops dead postings and renumbers documents densely."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        live = self._live[:self._size]
+        renumbered = np.cumsum(live) - 1  # old docno -> new docno, for live documents
+        # Most terms are rare and have only a tail; those are rewritten without NumPy
+        live_flags = live.tobytes()
+        new_docnos = array("q", renumbered.tobytes())
+        for term, postings in list(self._terms.items()):
+            if postings.blocks is None:
+                tail = postings.tail
+                rewritten = array("I")
+                for i in range(0, len(tail), 2):
+                    if live_flags[tail[i]]:
+                        rewritten.append(new_docnos[tail[i]])
+                        rewritten.append(tail[i + 1])
+                if rewritten:
+                    postings.tail = rewritten
+                    postings.count = len(rewritten) // 2
+                else:
+                    del self._terms[term]
+                continue
+            docnos, frequencies = postings.decode()
+            keep = live[docnos]
+            if keep.any():
+                order = np.argsort(docnos[keep])
+                self._terms[term] = _PostingList.from_arrays(
+                    renumbered[docnos[keep]][order], frequencies[keep][order].astype(np.int64))
+            else:
+                del self._terms[term]
+        size = int(live.sum())
+        self._kinds = self._kinds[:self._size][live].copy()
+        self._entity_ids = self._entity_ids[:self._size][live].copy()
+        self._course_ids = self._course_ids[:self._size][live].copy()
+        self._lengths = self._lengths[:self._size][live].copy()
+        self._live = np.ones(size, dtype=bool)
+        for kind, docnos in self._docnos.items():
+            indexed = docnos >= 0
+            docnos[indexed] = renumbered[docnos[indexed]]
+        self._size = size
+        self.dead_documents = 0
+
+    # --- Querying ---
+    def search(self, query, kinds=None, course_id=None, limit=20):
+        """
+        Ranks the documents matching any token of `query`.
+
+        Args:
+            kinds: Only return these kinds ("lesson", "quiz", "assignment"); None for all.
+            course_id: Only return lessons of this course.
+            limit: Maximum number of results.
+
+        Returns:
+            tuple: (number of matching documents, list of (kind, entity id, score)
+                   tuples, best first).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if course_id is not None and _course_key(course_id) < 0:
+            return 0, []  # no lesson can be in a course the index can't store
+        with self._lock:
+            decoded = [(self._terms[term].count, *self._terms[term].decode()) for term in terms if term in self._terms]
+            # Documents ever indexed but not compacted away; df counts their postings too
+            total_documents = self.live_documents + self.dead_documents
+            any_dead = self.dead_documents > 0
+            average_length = self._live_tokens / self.live_documents if self.live_documents else 1.0
+            size = self._size
+            kind_codes, entity_ids, course_ids = self._kinds, self._entity_ids, self._course_ids
+            lengths, live = self._lengths, self._live
+        if not decoded:
+            return 0, []
+
+        k1, b = self.k1, self.b
+        kind_filter = None if kinds is None else [_KIND_CODES[kind] for kind in kinds]
+        docnos = []
+        scores = []
+        for document_frequency, term_docnos, frequencies in decoded:
+            # Filter before scoring, so a course's lessons cost only their own postings
+            keep = live[term_docnos] if any_dead else None
+            if kind_filter is not None:
+                keep = _and(keep, np.isin(kind_codes[term_docnos], kind_filter))
+            if course_id is not None:
+                keep = _and(keep, course_ids[term_docnos] == course_id)
+            if keep is not None and not keep.all():
+                term_docnos, frequencies = term_docnos[keep], frequencies[keep]
+            idf = math.log(1 + (total_documents - document_frequency + 0.5) / (document_frequency + 0.5))
+            norms = lengths[term_docnos].astype(np.float32)
+            norms *= np.float32(k1 * b / max(average_length, 1e-9))
+            norms += np.float32(k1 * (1 - b))
+            norms += frequencies
+            term_scores = frequencies * np.float32(idf * (k1 + 1))
+            term_scores /= norms
+            docnos.append(term_docnos)
+            scores.append(term_scores)
+        if len(decoded) == 1:
+            docnos, scores = docnos[0], scores[0]
+            total = len(docnos)
+        else:
+            # Sum each document's scores over the terms it contains
+            docnos = np.concatenate(docnos)
+            scores = np.concatenate(scores)
+            if len(docnos) * 16 > size:
+                # Scores are positive, so the accumulator's nonzero slots are the matches
+                dense = np.bincount(docnos, weights=scores, minlength=size)
+                total = int(np.count_nonzero(dense))
+                if total > limit:
+                    docnos = _top(dense, limit)
+                else:
+                    docnos = np.flatnonzero(dense)
+                scores = dense[docnos]
+            else:
+                docnos, inverse = np.unique(docnos, return_inverse=True)
+                scores = np.bincount(inverse, weights=scores)
+                total = len(docnos)
+
+        if len(docnos) > limit:
+            top = _top(scores, limit, docnos)
+            docnos, scores = docnos[top], scores[top]
+        # Best first; ties in index order
+        order = np.lexsort((docnos, -scores))
+        results = [
+            (KINDS[kind], entity_id, round(score, 4))
+            for kind, entity_id, score in zip(
+                kind_codes[docnos[order]].tolist(), entity_ids[docnos[order]].tolist(), scores[order].tolist())
+        ]
+        return total, results
+
+    def stats(self):
+        with self._lock:
+            return {"documents": self.live_documents, "dead_documents": self.dead_documents, "terms": len(self._terms)}
@@ -0,0 +1,976 @@
+# storage.py
+# Storage backends for the course API in app.py.
+#
+# Route handlers talk to a `Storage` object instead of touching a module-global dict,
+# so the same handlers can run against:
+#   - MemoryStorage: the original in-process dict (fast, not durable, one copy per worker)
+#   - SQLiteStorage: a durable SQLite database in WAL mode that several worker
+#                    processes (e.g. `gunicorn -w 4`) can share.
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from array import array
+from itertools import islice
+
+from id_allocator import BlockIdAllocator
+from quiz_analytics import QuizStats
+from records import AssignmentRecord, CourseRecord, LessonRecord, QuizRecord, compact_list
+
+
+class Storage:
+    """
+    Interface implemented by every storage backend.
+
+    Entities are returned as plain dicts with the same shape the API serializes:
+      lesson:     {"id", "course_id", "title", "content_ids"}
+      content:    {"id", "type", "filename", "size", "checksum", "url"}
+      quiz:       {"id", "title", "questions", "lesson_id"}
+      assignment: {"id", "title", "description", "lesson_id"}
+      submission: {"id", "quiz_id", "student_id", "answers", "score", "max_score", "correct"}
+    """
+
+    # --- Lessons ---
+    def create_lesson(self, course_id, title, content_ids):
+        raise NotImplementedError
+
+    def get_lesson(self, lesson_id):
+        raise NotImplementedError
+
+    def update_lesson(self, lesson_id, changes):
+        """
+        Applies `changes` (title, content_ids, course_id) and returns the lesson, or None
+        if missing. Raises ValueError, changing nothing, if course_id is not an integer.
+        """
+        raise NotImplementedError
+
+    def delete_lesson(self, lesson_id):
+        """Returns True if the lesson existed and was deleted."""
+        raise NotImplementedError
+
+    def list_course_lessons(self, course_id):
+        """Returns every lesson of a course, ordered by lesson id."""
+        raise NotImplementedError
+
+    def iter_course_lessons(self, course_id, after_id=None, batch_size=500):
+        """
+        Yields a course's lessons ordered by lesson id, starting after `after_id`.
+
+        Lessons are fetched lazily (at most `batch_size` at a time for backends that
+        page through a database), so callers can stream large courses.
+        """
+        raise NotImplementedError
+
+    def list_course_lessons_page(self, course_id, after_id=None, limit=100):
+        """
+        Returns up to `limit` lessons after `after_id` (keyset pagination on lesson id).
+
+        Returns:
+            tuple: (list of lessons, bool) where the bool is True if more lessons follow.
+        """
+        page = list(islice(self.iter_course_lessons(course_id, after_id, batch_size=limit + 1), limit + 1))
+        return page[:limit], len(page) > limit
+
+    def create_lessons(self, course_id, items):
+        """
+        Creates several lessons in one course as a single atomic batch.
+
+        Args:
+            items: list of (title, content_ids) tuples, already validated.
+
+        Returns:
+            list: the created lessons, in the same order as `items`.
+        """
+        raise NotImplementedError
+
+    def update_lessons(self, updates):
+        """
+        Applies several lesson updates as a single atomic batch.
+
+        Args:
+            updates: list of (lesson_id, changes) tuples, already validated, with no
+                     lesson_id repeated.
+
+        Returns:
+            list: the updated lessons in the same order as `updates`, or None, changing
+                  nothing, if any of the lessons is missing.
+        """
+        raise NotImplementedError
+
+    # --- Content registry ---
+    def register_content(self, content_type, upload_data, url):
+        """
+        Adds an upload to the content registry, keyed by filename.
+
+        Returns:
+            tuple: (content entry, bool) where the bool is True if an existing entry
+                   of the same type and checksum was found and returned instead.
+        """
+        raise NotImplementedError
+
+    def get_contents(self, content_ids):
+        """Returns {content_id: entry} for the ids that are registered, in one batched lookup."""
+        raise NotImplementedError
+
+    # --- Quizzes and assignments ---
+    def create_quiz(self, title, questions, lesson_id):
+        raise NotImplementedError
+
+    def get_quiz(self, quiz_id):
+        raise NotImplementedError
+
+    def create_assignment(self, title, description, lesson_id):
+        raise NotImplementedError
+
+    def get_assignment(self, assignment_id):
+        raise NotImplementedError
+
+    def create_quizzes(self, items):
+        """Atomic batch version of create_quiz; `items` is a list of (title, questions, lesson_id)."""
+        raise NotImplementedError
+
+    def create_assignments(self, items):
+        """Atomic batch version of create_assignment; `items` is a list of (title, description, lesson_id)."""
+        raise NotImplementedError
+
+    def get_lesson_quizzes(self, lesson_ids):
+        """Returns {lesson_id: [quiz, ...]} (in quiz id order) for the given lessons that have quizzes, in one batched lookup."""
+        raise NotImplementedError
+
+    def get_lesson_assignments(self, lesson_ids):
+        """Returns {lesson_id: [assignment, ...]} (in id order) for the given lessons that have assignments, in one batched lookup."""
+        raise NotImplementedError
+
+    # --- Quiz submissions ---
+    def create_submissions(self, quiz_id, items, stats=None):
+        """
+        Stores graded submissions of one quiz as a single atomic batch.
+
+        Args:
+            items: list of (student_id, answers, score, max_score, correct) tuples,
+                   where `correct` is the per-question list of booleans.
+            stats: quiz_analytics.QuizStats of this batch, merged into the quiz's
+                   running statistics atomically with the submissions.
+
+        Returns:
+            list: the created submissions, in the same order as `items`.
+        """
+        raise NotImplementedError
+
+    def get_submission(self, submission_id):
+        raise NotImplementedError
+
+    def get_quiz_stats(self, quiz_id):
+        """Returns a snapshot of the quiz's running QuizStats, or None if nothing was submitted."""
+        raise NotImplementedError
+
+    def iter_entities(self, kind):
+        """Yields every lesson, quiz or assignment (`kind` "lesson", "quiz" or "assignment"), e.g. to build an index."""
+        raise NotImplementedError
+
+    # --- Entity versions ---
+    # Every write bumps the version of the entity it touches: "lesson" and "quiz" per
+    # id, "assignment" per id, and a single "content" version (id 0) for the whole
+    # content registry. Readers use versions to key cached responses. Submissions are
+    # write-once and never cached, so they have no versions.
+    CONTENT_REGISTRY = ("content", 0)
+
+    def get_version(self, kind, entity_id):
+        """
+        Returns the current version of an entity, or None if it never existed. A deleted
+        entity may keep its last version (backends that reuse ids must, so a new entity
+        under the same id never repeats an old version).
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryStorage(Storage):
+    """
+    The original in-memory dict storage. Each process gets its own copy.
+
+    Lessons, quizzes, assignments and courses are kept as compact records
+    (records.py); every read returns a fresh dict in the shape the API serializes.
+
+    Locking discipline (Flask serves requests from several threads):
+      - Ids come from per-entity BlockIdAllocators, outside of any lock.
+      - Every mutation of `db` happens while holding `self._lock`, so a lesson and
+        its course index entry are always added/moved/removed together.
+      - Reads take no lock. Single dict lookups are atomic, and anything that
+        iterates shared state first snapshots it with list() (or an array copy).
+    """
+
+    # kind -> table of records that carry their own version
+    RECORD_VERSIONS = {"lesson": "lessons", "quiz": "quizzes", "assignment": "assignments"}
+    # table -> reverse index of the records' lesson_id
+    LESSON_LINKS = {"quizzes": "lesson_quizzes", "assignments": "lesson_assignments"}
+
+    def __init__(self):
+        self.db = {
+            "courses": {},  # course_id -> CourseRecord
+            "lessons": {},  # lesson_id -> LessonRecord
+            "quizzes": {},  # quiz_id -> QuizRecord
+            "assignments": {},  # assignment_id -> AssignmentRecord
+            # Reverse indexes: lesson_id -> sorted array('q') of the quiz/assignment ids linking to it
+            "lesson_quizzes": {},
+            "lesson_assignments": {},
+            "submissions": {},
+            "quiz_stats": {},  # quiz_id -> QuizStats
+            # Content registry: content_id -> {"id", "type", "filename", "size", "checksum", "url"}
+            "content": {},
+            # (type, checksum) -> content_id, so duplicate uploads are found in constant
+            # time. Keyed by type too: a document with a video's bytes is not that video.
+            "content_by_checksum": {},
+        }
+        self.lesson_id_allocator = BlockIdAllocator()
+        self.quiz_id_allocator = BlockIdAllocator()
+        self.assignment_id_allocator = BlockIdAllocator()
+        self.submission_id_allocator = BlockIdAllocator()
+        self.versions = {}  # (kind, id) -> version, for versions not kept on a record
+        self._lock = threading.RLock()
+
+    # --- Course -> Lesson Index ---
+    # Each course's lesson_ids is a sorted array('q'). Ids mostly arrive in increasing
+    # order, so adding one is usually an append; a removal shifts the ids after it
+    # (a memmove). Reads get the ids in order without sorting.
+    def _ensure_course(self, course_id):
+        # Simulate adding the course if it doesn't exist for simplicity
+        course = self.db["courses"].get(course_id)
+        if course is None:
+            course = CourseRecord(course_id, f"Course {course_id}")
+            self.db["courses"][course_id] = course
+        return course
+
+    def _bump_version(self, kind, entity_id):
+        # Callers hold self._lock
+        key = (kind, entity_id)
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def get_version(self, kind, entity_id):
+        table = self.RECORD_VERSIONS.get(kind)
+        if table is None:
+            return self.versions.get((kind, entity_id))
+        record = self.db[table].get(entity_id)
+        # Ids are never reused, so a deleted entity's version is gone for good
+        return record.version if record is not None else None
+
+    def _index_lesson(self, lesson):
+        _insert_id(self._ensure_course(lesson.course_id).lesson_ids, lesson.id)
+
+    def _unindex_lesson(self, lesson):
+        course = self.db["courses"].get(lesson.course_id)
+        if course is not None:
+            position = bisect.bisect_left(course.lesson_ids, lesson.id)
+            if position < len(course.lesson_ids) and course.lesson_ids[position] == lesson.id:
+                del course.lesson_ids[position]
+
+    # --- Lesson -> Quiz/Assignment Indexes ---
+    # Quizzes and assignments link to a lesson through an optional lesson_id, which
+    # may name a lesson that doesn't exist (yet). The reverse indexes are keyed by that
+    # id alone, so a lesson created or deleted later doesn't touch them, and they are
+    # rebuilt from the records when persisted storage is loaded.
+    def _index_linked(self, table, record):
+        # Callers hold self._lock. Only integer ids can match a lesson.
+        if type(record.lesson_id) is int:
+            _insert_id(self.db[self.LESSON_LINKS[table]].setdefault(record.lesson_id, array("q")), record.id)
+
+    def _linked(self, table, lesson_ids):
+        index = self.db[self.LESSON_LINKS[table]]
+        rows = self.db[table]
+        linked = {}
+        for lesson_id in lesson_ids:
+            ids = index.get(lesson_id)
+            if ids:
+                # The array copy is a snapshot, as for course lesson ids
+                linked[lesson_id] = [rows[entity_id].to_dict() for entity_id in ids[:]]
+        return linked
+
+    # --- Lessons ---
+    def create_lesson(self, course_id, title, content_ids):
+        # content_ids: e.g., IDs of uploaded videos/docs
+        new_lesson = LessonRecord(self.lesson_id_allocator.allocate(), course_id, title, content_ids)
+        with self._lock:
+            self.db["lessons"][new_lesson.id] = new_lesson
+            self._index_lesson(new_lesson)
+        return new_lesson.to_dict()
+
+    def get_lesson(self, lesson_id):
+        lesson = self.db["lessons"].get(lesson_id)
+        return lesson.to_dict() if lesson is not None else None
+
+    def update_lesson(self, lesson_id, changes):
+        with self._lock:
+            lesson = self.db["lessons"].get(lesson_id)
+            if lesson is None:
+                return None
+            self._check_lesson_changes(lesson, changes)
+            self._apply_lesson_changes(lesson, changes)
+            return lesson.to_dict()
+
+    @staticmethod
+    def _check_lesson_changes(lesson, changes):
+        # Checked before anything changes: a lesson must never be left out of its
+        # course's index, or half updated
+        if type(changes.get("course_id", lesson.course_id)) is not int:
+            raise ValueError("course_id must be an integer")
+
+    def _apply_lesson_changes(self, lesson, changes):
+        if "title" in changes:
+            lesson.title = changes["title"]
+        if "content_ids" in changes:
+            lesson.content_ids = compact_list(changes["content_ids"])
+        if "course_id" in changes and changes["course_id"] != lesson.course_id:
+            # Moving a lesson between courses keeps both course indexes in step
+            self._unindex_lesson(lesson)
+            lesson.course_id = changes["course_id"]
+            self._index_lesson(lesson)
+        lesson.version += 1
+
+    def delete_lesson(self, lesson_id):
+        with self._lock:
+            lesson = self.db["lessons"].pop(lesson_id, None)
+            if lesson is None:
+                return False
+            # Remove lesson_id from the course's lesson index
+            self._unindex_lesson(lesson)
+            return True
+
+    def list_course_lessons(self, course_id):
+        course = self.db["courses"].get(course_id)
+        if course is None:
+            return []
+        lessons = self.db["lessons"]
+        snapshot = [lessons.get(lesson_id) for lesson_id in self._sorted_lesson_ids(course)]
+        return [lesson.to_dict() for lesson in snapshot if lesson is not None]
+
+    def iter_course_lessons(self, course_id, after_id=None, batch_size=500):
+        course = self.db["courses"].get(course_id)
+        if course is None:
+            return
+        lesson_ids = self._sorted_lesson_ids(course)
+        start = bisect.bisect_right(lesson_ids, after_id) if after_id is not None else 0
+        lessons = self.db["lessons"]
+        for lesson_id in islice(lesson_ids, start, None):
+            lesson = lessons.get(lesson_id)
+            if lesson is not None:
+                yield lesson.to_dict()
+
+    @staticmethod
+    def _sorted_lesson_ids(course):
+        # Copying the array (a single memcpy) snapshots the index so a concurrent
+        # create/delete can't break iteration; a lesson deleted after the snapshot is
+        # skipped by the callers.
+        return course.lesson_ids[:]
+
+    def create_lessons(self, course_id, items):
+        # One contiguous id block for the whole batch; the records are built before
+        # taking the lock, and inserting them can't fail halfway.
+        first_id = self.lesson_id_allocator.reserve(len(items))
+        new_lessons = [
+            LessonRecord(first_id + i, course_id, title, content_ids)
+            for i, (title, content_ids) in enumerate(items)
+        ]
+        with self._lock:
+            for new_lesson in new_lessons:
+                self.db["lessons"][new_lesson.id] = new_lesson
+                self._index_lesson(new_lesson)
+        return [lesson.to_dict() for lesson in new_lessons]
+
+    def update_lessons(self, updates):
+        with self._lock:
+            lessons = [self.db["lessons"].get(lesson_id) for lesson_id, _ in updates]
+            if any(lesson is None for lesson in lessons):
+                return None
+            # Every item is checked before the first one is applied
+            for lesson, (_, changes) in zip(lessons, updates):
+                self._check_lesson_changes(lesson, changes)
+            for lesson, (_, changes) in zip(lessons, updates):
+                self._apply_lesson_changes(lesson, changes)
+            return [lesson.to_dict() for lesson in lessons]
+
+    # --- Content registry ---
+    def register_content(self, content_type, upload_data, url):
+        with self._lock:
+            checksum = upload_data.get("checksum")
+            if checksum:
+                existing_id = self.db["content_by_checksum"].get((content_type, checksum))
+                if existing_id is not None and existing_id in self.db["content"]:
+                    return self.db["content"][existing_id], True
+
+            content_id = upload_data["filename"]
+            entry = {
+                "id": content_id,
+                "type": content_type,
+                "filename": content_id,
+                "size": upload_data.get("size"),
+                "checksum": checksum,
+                "url": url,
+            }
+            self._store_content(entry)
+            self._bump_version(*self.CONTENT_REGISTRY)
+            return entry, False
+
+    def _store_content(self, entry):
+        previous = self.db["content"].get(entry["id"])
+        if previous is not None and previous["checksum"]:
+            # Re-uploading under the same name replaces the old checksum mapping
+            self.db["content_by_checksum"].pop((previous["type"], previous["checksum"]), None)
+        self.db["content"][entry["id"]] = entry
+        if entry["checksum"]:
+            self.db["content_by_checksum"][(entry["type"], entry["checksum"])] = entry["id"]
+
+    def get_contents(self, content_ids):
+        registry = self.db["content"]
+        # Content ids are filenames; anything else (e.g. a list stored before lessons
+        # were validated) can't be registered and would not even hash
+        return {content_id: registry[content_id] for content_id in content_ids
+                if isinstance(content_id, str) and content_id in registry}
+
+    # --- Quizzes and assignments ---
+    def create_quiz(self, title, questions, lesson_id):
+        # questions: expecting a list of question objects; lesson_id optionally links the quiz to a lesson
+        new_quiz = QuizRecord(self.quiz_id_allocator.allocate(), title, questions, lesson_id)
+        with self._lock:
+            self.db["quizzes"][new_quiz.id] = new_quiz
+            self._index_linked("quizzes", new_quiz)
+        return new_quiz.to_dict()
+
+    def get_quiz(self, quiz_id):
+        quiz = self.db["quizzes"].get(quiz_id)
+        return quiz.to_dict() if quiz is not None else None
+
+    def create_assignment(self, title, description, lesson_id):
+        # lesson_id optionally links the assignment to a lesson
+        new_assignment = AssignmentRecord(self.assignment_id_allocator.allocate(), title, description, lesson_id)
+        with self._lock:
+            self.db["assignments"][new_assignment.id] = new_assignment
+            self._index_linked("assignments", new_assignment)
+        return new_assignment.to_dict()
+
+    def get_assignment(self, assignment_id):
+        assignment = self.db["assignments"].get(assignment_id)
+        return assignment.to_dict() if assignment is not None else None
+
+    def create_quizzes(self, items):
+        first_id = self.quiz_id_allocator.reserve(len(items))
+        new_quizzes = [
+            QuizRecord(first_id + i, title, questions, lesson_id)
+            for i, (title, questions, lesson_id) in enumerate(items)
+        ]
+        with self._lock:
+            for quiz in new_quizzes:
+                self.db["quizzes"][quiz.id] = quiz
+                self._index_linked("quizzes", quiz)
+        return [quiz.to_dict() for quiz in new_quizzes]
+
+    def create_assignments(self, items):
+        first_id = self.assignment_id_allocator.reserve(len(items))
+        new_assignments = [
+            AssignmentRecord(first_id + i, title, description, lesson_id)
+            for i, (title, description, lesson_id) in enumerate(items)
+        ]
+        with self._lock:
+            for assignment in new_assignments:
+                self.db["assignments"][assignment.id] = assignment
+                self._index_linked("assignments", assignment)
+        return [assignment.to_dict() for assignment in new_assignments]
+
+    def get_lesson_quizzes(self, lesson_ids):
+        return self._linked("quizzes", lesson_ids)
+
+    def get_lesson_assignments(self, lesson_ids):
+        return self._linked("assignments", lesson_ids)
+
+    # --- Quiz submissions ---
+    def create_submissions(self, quiz_id, items, stats=None):
+        first_id = self.submission_id_allocator.reserve(len(items))
+        new_submissions = [
+            {"id": first_id + i, "quiz_id": quiz_id, "student_id": student_id, "answers": answers,
+             "score": score, "max_score": max_score, "correct": correct}
+            for i, (student_id, answers, score, max_score, correct) in enumerate(items)
+        ]
+        with self._lock:
+            submissions = self.db["submissions"]
+            for submission in new_submissions:
+                submissions[submission["id"]] = submission
+            if stats is not None:
+                current = self.db["quiz_stats"].get(quiz_id)
+                if current is None:
+                    self.db["quiz_stats"][quiz_id] = stats.copy()
+                else:
+                    current.merge(stats)
+        return new_submissions
+
+    def get_submission(self, submission_id):
+        return self.db["submissions"].get(submission_id)
+
+    def iter_entities(self, kind):
+        records = list(self.db[self.RECORD_VERSIONS[kind]].values())
+        for record in records:
+            yield record.to_dict()
+
+    def get_quiz_stats(self, quiz_id):
+        # Copied under the lock so a reader never sees a half-applied merge
+        with self._lock:
+            stats = self.db["quiz_stats"].get(quiz_id)
+            return stats.copy() if stats is not None else None
+
+
+def _insert_id(ids, entity_id):
+    """Adds `entity_id` to the sorted array `ids` (usually an append, since ids mostly increase)."""
+    if not ids or ids[-1] < entity_id:
+        ids.append(entity_id)
+        return
+    position = bisect.bisect_left(ids, entity_id)
+    if position == len(ids) or ids[position] != entity_id:
+        ids.insert(position, entity_id)
+
+
+# --- SQLite Backend ---
+# Schema notes:
+#   - INTEGER PRIMARY KEY columns are rowid aliases, so SQLite allocates ids for us
+#     and concurrent workers never hand out the same id.
+#     Without AUTOINCREMENT, the id of the newest row can be reused after it is
+#     deleted, so entity_versions rows are kept (and bumped) on delete.
+#   - The "foreign key" columns used for lookups (lesson.course_id, quiz.lesson_id,
+#     assignment.lesson_id) are indexed. They are not declared as REFERENCES because
+#     the API allows quizzes/assignments to point at lessons that don't exist (yet).
+#   - List/dict columns (content_ids, questions, answers, correct) are stored as JSON text.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    content_ids TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lessons_course_id ON lessons (course_id, id);
+CREATE TABLE IF NOT EXISTS content (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER,
+    checksum TEXT,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_content_checksum ON content (checksum) WHERE checksum IS NOT NULL;
+CREATE TABLE IF NOT EXISTS quizzes (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    questions TEXT NOT NULL,
+    lesson_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_quizzes_lesson_id ON quizzes (lesson_id);
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    lesson_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_assignments_lesson_id ON assignments (lesson_id);
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY,
+    quiz_id INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    score REAL NOT NULL,
+    max_score REAL NOT NULL,
+    correct TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_quiz_id ON submissions (quiz_id);
+CREATE TABLE IF NOT EXISTS quiz_stats (
+    quiz_id INTEGER PRIMARY KEY,
+    stats TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entity_versions (
+    kind TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (kind, entity_id)
+) WITHOUT ROWID;
+"""
+
+# Statements are module constants: sqlite3 keeps a per-connection cache of compiled
+# statements keyed by SQL text, so each one is prepared once per pooled connection.
+SQL_INSERT_COURSE = "INSERT OR IGNORE INTO courses (id, name) VALUES (?, ?)"
+SQL_INSERT_LESSON = "INSERT INTO lessons (course_id, title, content_ids) VALUES (?, ?, ?)"
+SQL_SELECT_LESSON = "SELECT id, course_id, title, content_ids FROM lessons WHERE id = ?"
+SQL_UPDATE_LESSON = "UPDATE lessons SET course_id = ?, title = ?, content_ids = ? WHERE id = ?"
+SQL_DELETE_LESSON = "DELETE FROM lessons WHERE id = ?"
+SQL_SELECT_COURSE_LESSONS = "SELECT id, course_id, title, content_ids FROM lessons WHERE course_id = ? ORDER BY id"
+SQL_SELECT_COURSE_LESSONS_AFTER = (
+    "SELECT id, course_id, title, content_ids FROM lessons WHERE course_id = ? AND id > ? ORDER BY id LIMIT ?"
+)
+SQL_SELECT_ENTITIES_AFTER = {
+    "lesson": "SELECT id, course_id, title, content_ids FROM lessons WHERE id > ? ORDER BY id LIMIT ?",
+    "quiz": "SELECT id, title, questions, lesson_id FROM quizzes WHERE id > ? ORDER BY id LIMIT ?",
+    "assignment": "SELECT id, title, description, lesson_id FROM assignments WHERE id > ? ORDER BY id LIMIT ?",
+}
+# The quizzes/assignments linked to a batch of lessons, through the lesson_id indexes;
+# formatted with one placeholder per lesson id, at most MAX_IN_PARAMETERS at a time
+SQL_SELECT_LINKED = {
+    "quizzes": "SELECT id, title, questions, lesson_id FROM quizzes WHERE lesson_id IN ({}) ORDER BY lesson_id, id",
+    "assignments": (
+        "SELECT id, title, description, lesson_id FROM assignments WHERE lesson_id IN ({}) ORDER BY lesson_id, id"
+    ),
+}
+MAX_IN_PARAMETERS = 500
+# Also formatted with at most MAX_IN_PARAMETERS placeholders
+SQL_SELECT_CONTENTS = "SELECT id, type, filename, size, checksum, url FROM content WHERE id IN ({})"
+SQL_SELECT_CONTENT_BY_CHECKSUM = "SELECT id, type, filename, size, checksum, url FROM content WHERE checksum = ? AND type = ?"
+SQL_UPSERT_CONTENT = "INSERT OR REPLACE INTO content (id, type, filename, size, checksum, url) VALUES (?, ?, ?, ?, ?, ?)"
+SQL_INSERT_QUIZ = "INSERT INTO quizzes (title, questions, lesson_id) VALUES (?, ?, ?)"
+SQL_SELECT_QUIZ = "SELECT id, title, questions, lesson_id FROM quizzes WHERE id = ?"
+SQL_INSERT_ASSIGNMENT = "INSERT INTO assignments (title, description, lesson_id) VALUES (?, ?, ?)"
+SQL_SELECT_ASSIGNMENT = "SELECT id, title, description, lesson_id FROM assignments WHERE id = ?"
+SQL_INSERT_SUBMISSION = (
+    "INSERT INTO submissions (quiz_id, student_id, answers, score, max_score, correct) VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_SELECT_SUBMISSION = "SELECT id, quiz_id, student_id, answers, score, max_score, correct FROM submissions WHERE id = ?"
+SQL_SELECT_QUIZ_STATS = "SELECT stats FROM quiz_stats WHERE quiz_id = ?"
+SQL_UPSERT_QUIZ_STATS = "INSERT OR REPLACE INTO quiz_stats (quiz_id, stats) VALUES (?, ?)"
+SQL_BUMP_VERSION = (
+    "INSERT INTO entity_versions (kind, entity_id, version) VALUES (?, ?, 1) "
+    "ON CONFLICT (kind, entity_id) DO UPDATE SET version = version + 1"
+)
+SQL_SELECT_VERSION = "SELECT version FROM entity_versions WHERE kind = ? AND entity_id = ?"
+
+
+def _lesson_row(row):
+    return {"id": row[0], "course_id": row[1], "title": row[2], "content_ids": json.loads(row[3])}
+
+
+def _quiz_row(row):
+    return {"id": row[0], "title": row[1], "questions": json.loads(row[2]), "lesson_id": row[3]}
+
+
+def _assignment_row(row):
+    return {"id": row[0], "title": row[1], "description": row[2], "lesson_id": row[3]}
+
+
+ENTITY_ROWS = {"lesson": _lesson_row, "quiz": _quiz_row, "assignment": _assignment_row}
+
+
+def _number(value):
+    # REAL columns give back 7.0 for a score stored as 7
+    return int(value) if value == int(value) else value
+
+
+def _content_row(row):
+    return {"id": row[0], "type": row[1], "filename": row[2], "size": row[3], "checksum": row[4], "url": row[5]}
+
+
+class SQLiteStorage(Storage):
+    """
+    Durable storage in a SQLite database running in WAL mode.
+
+    WAL lets readers proceed while a writer commits, so several worker processes can
+    share one database file. Each thread gets its own pooled connection (sqlite3
+    connections must not be shared across threads), created lazily and reused for
+    every request that thread serves.
+    """
+
+    def __init__(self, path, busy_timeout_ms=5000, cached_statements=256):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: autocommit, write transactions are opened explicitly
+            conn = sqlite3.connect(
+                self.path,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=self.cached_statements,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            # NORMAL is durable across application crashes in WAL mode; only an OS crash
+            # or power loss can lose the most recent commits.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write(self):
+        return _WriteTransaction(self._connection())
+
+    @staticmethod
+    def _bump_version(conn, kind, entity_id):
+        # Runs inside the caller's write transaction, so the version changes atomically with the data
+        conn.execute(SQL_BUMP_VERSION, (kind, str(entity_id)))
+
+    def get_version(self, kind, entity_id):
+        row = self._connection().execute(SQL_SELECT_VERSION, (kind, str(entity_id))).fetchone()
+        return row[0] if row else None
+
+    # --- Lessons ---
+    def create_lesson(self, course_id, title, content_ids):
+        with self._write() as conn:
+            conn.execute(SQL_INSERT_COURSE, (course_id, f"Course {course_id}"))
+            cursor = conn.execute(SQL_INSERT_LESSON, (course_id, title, json.dumps(content_ids)))
+            new_lesson_id = cursor.lastrowid
+            self._bump_version(conn, "lesson", new_lesson_id)
+        return {"id": new_lesson_id, "course_id": course_id, "title": title, "content_ids": content_ids}
+
+    def get_lesson(self, lesson_id):
+        row = self._connection().execute(SQL_SELECT_LESSON, (lesson_id,)).fetchone()
+        return _lesson_row(row) if row else None
+
+    def update_lesson(self, lesson_id, changes):
+        with self._write() as conn:
+            row = conn.execute(SQL_SELECT_LESSON, (lesson_id,)).fetchone()
+            if row is None:
+                return None
+            return self._update_lesson_row(conn, _lesson_row(row), changes)
+
+    def _update_lesson_row(self, conn, lesson, changes):
+        # SQLite would store "2" as 2 rather than fail; match the memory backend
+        if type(changes.get("course_id", lesson["course_id"])) is not int:
+            raise ValueError("course_id must be an integer")
+        for field in ("title", "content_ids", "course_id"):
+            if field in changes:
+                lesson[field] = changes[field]
+        conn.execute(SQL_INSERT_COURSE, (lesson["course_id"], f"Course {lesson['course_id']}"))
+        conn.execute(SQL_UPDATE_LESSON, (lesson["course_id"], lesson["title"], json.dumps(lesson["content_ids"]), lesson["id"]))
+        self._bump_version(conn, "lesson", lesson["id"])
+        return lesson
+
+    def delete_lesson(self, lesson_id):
+        with self._write() as conn:
+            if conn.execute(SQL_DELETE_LESSON, (lesson_id,)).rowcount == 0:
+                return False
+            # The version row is kept and bumped: SQLite can hand a deleted rowid to the
+            # next lesson, which then continues the count instead of restarting at 1
+            # and matching responses cached for the deleted lesson.
+            self._bump_version(conn, "lesson", lesson_id)
+            return True
+
+    def list_course_lessons(self, course_id):
+        rows = self._connection().execute(SQL_SELECT_COURSE_LESSONS, (course_id,)).fetchall()
+        return [_lesson_row(row) for row in rows]
+
+    def iter_course_lessons(self, course_id, after_id=None, batch_size=500):
+        # Keyset pagination over the (course_id, id) index: each batch is a short,
+        # independent query, so no read transaction stays open while a client streams.
+        last_id = after_id if after_id is not None else 0
+        while True:
+            rows = self._connection().execute(SQL_SELECT_COURSE_LESSONS_AFTER, (course_id, last_id, batch_size)).fetchall()
+            for row in rows:
+                yield _lesson_row(row)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def create_lessons(self, course_id, items):
+        # One transaction for the whole batch: either every row is committed or none is
+        new_lessons = []
+        with self._write() as conn:
+            conn.execute(SQL_INSERT_COURSE, (course_id, f"Course {course_id}"))
+            for title, content_ids in items:
+                cursor = conn.execute(SQL_INSERT_LESSON, (course_id, title, json.dumps(content_ids)))
+                self._bump_version(conn, "lesson", cursor.lastrowid)
+                new_lessons.append({"id": cursor.lastrowid, "course_id": course_id, "title": title, "content_ids": content_ids})
+        return new_lessons
+
+    def update_lessons(self, updates):
+        # Every lesson is read before the first is written; an error in any item rolls back the batch
+        with self._write() as conn:
+            rows = [conn.execute(SQL_SELECT_LESSON, (lesson_id,)).fetchone() for lesson_id, _ in updates]
+            if any(row is None for row in rows):
+                return None
+            return [self._update_lesson_row(conn, _lesson_row(row), changes) for row, (_, changes) in zip(rows, updates)]
+
+    # --- Content registry ---
+    def register_content(self, content_type, upload_data, url):
+        checksum = upload_data.get("checksum")
+        with self._write() as conn:
+            if checksum:
+                row = conn.execute(SQL_SELECT_CONTENT_BY_CHECKSUM, (checksum, content_type)).fetchone()
+                if row is not None:
+                    return _content_row(row), True
+            content_id = upload_data["filename"]
+            entry = {
+                "id": content_id,
+                "type": content_type,
+                "filename": content_id,
+                "size": upload_data.get("size"),
+                "checksum": checksum,
+                "url": url,
+            }
+            conn.execute(SQL_UPSERT_CONTENT, (content_id, content_type, content_id, entry["size"], checksum, url))
+            self._bump_version(conn, *self.CONTENT_REGISTRY)
+        return entry, False
+
+    def get_contents(self, content_ids):
+        # Only strings can be registered content ids (see MemoryStorage.get_contents)
+        unique_ids = list(dict.fromkeys(content_id for content_id in content_ids if isinstance(content_id, str)))
+        conn = self._connection()
+        contents = {}
+        # Chunked like _linked: an outline page can reference more ids than SQLite
+        # allows as parameters in one statement
+        for start in range(0, len(unique_ids), MAX_IN_PARAMETERS):
+            chunk = unique_ids[start:start + MAX_IN_PARAMETERS]
+            for row in conn.execute(SQL_SELECT_CONTENTS.format(",".join("?" * len(chunk))), chunk):
+                contents[row[0]] = _content_row(row)
+        return contents
+
+    # --- Quizzes and assignments ---
+    def create_quiz(self, title, questions, lesson_id):
+        with self._write() as conn:
+            cursor = conn.execute(SQL_INSERT_QUIZ, (title, json.dumps(questions), lesson_id))
+            self._bump_version(conn, "quiz", cursor.lastrowid)
+        return {"id": cursor.lastrowid, "title": title, "questions": questions, "lesson_id": lesson_id}
+
+    def get_quiz(self, quiz_id):
+        row = self._connection().execute(SQL_SELECT_QUIZ, (quiz_id,)).fetchone()
+        return _quiz_row(row) if row else None
+
+    def create_assignment(self, title, description, lesson_id):
+        with self._write() as conn:
+            cursor = conn.execute(SQL_INSERT_ASSIGNMENT, (title, description, lesson_id))
+            self._bump_version(conn, "assignment", cursor.lastrowid)
+        return {"id": cursor.lastrowid, "title": title, "description": description, "lesson_id": lesson_id}
+
+    def get_assignment(self, assignment_id):
+        row = self._connection().execute(SQL_SELECT_ASSIGNMENT, (assignment_id,)).fetchone()
+        return _assignment_row(row) if row else None
+
+    def create_quizzes(self, items):
+        new_quizzes = []
+        with self._write() as conn:
+            for title, questions, lesson_id in items:
+                cursor = conn.execute(SQL_INSERT_QUIZ, (title, json.dumps(questions), lesson_id))
+                self._bump_version(conn, "quiz", cursor.lastrowid)
+                new_quizzes.append({"id": cursor.lastrowid, "title": title, "questions": questions, "lesson_id": lesson_id})
+        return new_quizzes
+
+    def create_assignments(self, items):
+        new_assignments = []
+        with self._write() as conn:
+            for title, description, lesson_id in items:
+                cursor = conn.execute(SQL_INSERT_ASSIGNMENT, (title, description, lesson_id))
+                self._bump_version(conn, "assignment", cursor.lastrowid)
+                new_assignments.append({"id": cursor.lastrowid, "title": title, "description": description, "lesson_id": lesson_id})
+        return new_assignments
+
+    def get_lesson_quizzes(self, lesson_ids):
+        return self._linked("quizzes", _quiz_row, lesson_ids)
+
+    def get_lesson_assignments(self, lesson_ids):
+        return self._linked("assignments", _assignment_row, lesson_ids)
+
+    def _linked(self, table, row_factory, lesson_ids):
+        unique_ids = list(dict.fromkeys(lesson_ids))
+        conn = self._connection()
+        linked = {}
+        for start in range(0, len(unique_ids), MAX_IN_PARAMETERS):
+            chunk = unique_ids[start:start + MAX_IN_PARAMETERS]
+            rows = conn.execute(SQL_SELECT_LINKED[table].format(",".join("?" * len(chunk))), chunk).fetchall()
+            for row in rows:
+                linked.setdefault(row[3], []).append(row_factory(row))
+        return linked
+
+    # --- Quiz submissions ---
+    def create_submissions(self, quiz_id, items, stats=None):
+        new_submissions = []
+        with self._write() as conn:
+            for student_id, answers, score, max_score, correct in items:
+                cursor = conn.execute(SQL_INSERT_SUBMISSION, (
+                    quiz_id, str(student_id), json.dumps(answers), score, max_score, json.dumps(correct)))
+                new_submissions.append({"id": cursor.lastrowid, "quiz_id": quiz_id, "student_id": student_id,
+                                        "answers": answers, "score": score, "max_score": max_score,
+                                        "correct": correct})
+            if stats is not None:
+                # Merged in the same transaction, so every worker's submissions are counted exactly once
+                row = conn.execute(SQL_SELECT_QUIZ_STATS, (quiz_id,)).fetchone()
+                merged = QuizStats.from_dict(json.loads(row[0])).merge(stats) if row else stats
+                conn.execute(SQL_UPSERT_QUIZ_STATS, (quiz_id, json.dumps(merged.to_dict())))
+        return new_submissions
+
+    def get_submission(self, submission_id):
+        row = self._connection().execute(SQL_SELECT_SUBMISSION, (submission_id,)).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "quiz_id": row[1], "student_id": row[2], "answers": json.loads(row[3]),
+                "score": _number(row[4]), "max_score": _number(row[5]), "correct": json.loads(row[6])}
+
+    def iter_entities(self, kind, batch_size=1000):
+        # Keyset pages, like iter_course_lessons
+        last_id = 0
+        while True:
+            rows = self._connection().execute(SQL_SELECT_ENTITIES_AFTER[kind], (last_id, batch_size)).fetchall()
+            yield from map(ENTITY_ROWS[kind], rows)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def get_quiz_stats(self, quiz_id):
+        row = self._connection().execute(SQL_SELECT_QUIZ_STATS, (quiz_id,)).fetchone()
+        return QuizStats.from_dict(json.loads(row[0])) if row else None
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class _WriteTransaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block of writes."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        # IMMEDIATE takes the write lock up front so read-then-write blocks
+        # (update_lesson, register_content) can't interleave with another writer.
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def create_storage(backend=None, sqlite_path=None):
+    """
+    Builds the storage backend selected by arguments or environment variables.
+
+    Args:
+        backend: "memory" or "sqlite". Defaults to $STORAGE_BACKEND, then "memory".
+        sqlite_path: Database file for the SQLite backend. Defaults to $SQLITE_PATH,
+                     then "course_api.db".
+
+    The memory backend is persisted (snapshots plus a write-ahead log, see
+    memory_persistence.py) when $MEMORY_PERSIST_DIR is set. $MEMORY_WAL_SYNC
+    ("commit" or "interval") and $MEMORY_SNAPSHOT_INTERVAL (seconds) tune it.
+    """
+    backend = backend or os.environ.get("STORAGE_BACKEND", "memory")
+    if backend == "memory":
+        persist_dir = os.environ.get("MEMORY_PERSIST_DIR")
+        if persist_dir:
+            from memory_persistence import PersistentMemoryStorage  # imports this module
+            return PersistentMemoryStorage(
+                persist_dir,
+                sync=os.environ.get("MEMORY_WAL_SYNC", "commit"),
+                snapshot_interval=float(os.environ.get("MEMORY_SNAPSHOT_INTERVAL", 300)),
+            )
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(sqlite_path or os.environ.get("SQLITE_PATH", "course_api.db"))
+    raise ValueError(f"Unknown storage backend: {backend!r}")
@@ -0,0 +1,50 @@
+# tests/conftest.py
+# Shared fixtures: the Flask app from app.py, run against each storage backend (and the
+# memory backend with its write-ahead log) with fresh storage, caches and upload
+# directory per test.
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py creates its upload store at import; keep it out of the working tree
+os.environ.setdefault("CONTENT_STORAGE_DIR", tempfile.mkdtemp(prefix="course_api_tests_"))
+
+import app as course_api  # noqa: E402
+from chunked_upload import UploadStore  # noqa: E402
+from memory_persistence import PersistentMemoryStorage  # noqa: E402
+from quiz_grading import CompiledQuizCache  # noqa: E402
+from response_cache import VersionedResponseCache  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+from storage import create_storage  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "persistent", "sqlite"])
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def api(backend, tmp_path, monkeypatch):
+    """The app module, wired to a fresh `backend` storage and fresh caches."""
+    if backend == "persistent":
+        storage = PersistentMemoryStorage(str(tmp_path / "memory"), snapshot_interval=0)
+    else:
+        storage = create_storage(backend, str(tmp_path / "course_api.db"))
+    monkeypatch.setattr(course_api, "storage", storage)
+    monkeypatch.setattr(course_api, "upload_store", UploadStore(str(tmp_path / "content")))
+    monkeypatch.setattr(course_api, "response_cache", VersionedResponseCache())
+    monkeypatch.setattr(course_api, "compiled_quizzes", CompiledQuizCache())
+    monkeypatch.setattr(course_api, "search_index", SearchIndex())
+    monkeypatch.setattr(course_api, "SEARCH_LOADERS", {
+        "lesson": storage.get_lesson, "quiz": storage.get_quiz, "assignment": storage.get_assignment})
+    yield course_api
+    storage.close()
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
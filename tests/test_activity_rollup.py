@@ -0,0 +1,160 @@
+# tests/test_activity_rollup.py
+# Activity rollups: the Misra-Gries error bound, time buckets and windows, retention,
+# and resuming from a checkpoint.
+import json
+import random
+from collections import Counter
+
+import pytest
+
+from activity_rollup import ActivityLogReader, ActivityRollup, HeavyHitters, event_timestamp
+
+
+def _event(timestamp, verb="login", status="success", actor="u1", ip="10.0.0.1", target_type=None):
+    return {
+        "event_type": "user_activity",
+        "timestamp": timestamp,
+        "actor": {"id": actor},
+        "action": {"verb": verb, "status": status},
+        "target": {"type": target_type, "id": None},
+        "network": {"ip_address": ip, "user_agent": "test"},
+        "details": {},
+    }
+
+
+def _skewed_stream(length, seed):
+    rng = random.Random(seed)
+    # A few heavy keys on top of a long tail of rare ones
+    return [f"heavy{rng.randrange(5)}" if rng.random() < 0.3 else f"key{rng.randrange(5000)}" for _ in range(length)]
+
+
+def _assert_within_bound(sketch, truth, capacity):
+    total = sum(truth.values())
+    assert sketch.total == total
+    assert sketch.error <= total / (capacity + 1)
+    assert len(sketch.counts) <= 2 * capacity
+    for key, true_count in truth.items():
+        estimate = sketch.counts.get(key, 0)
+        assert true_count - sketch.error <= estimate <= true_count
+        if true_count > total / (capacity + 1):
+            assert key in sketch.counts
+
+
+@pytest.mark.parametrize("capacity", [5, 50])
+def test_heavy_hitters_undercount_by_at_most_the_error(capacity):
+    stream = _skewed_stream(20000, seed=capacity)
+    sketch = HeavyHitters(capacity)
+    for key in stream:
+        sketch.add(key)
+    assert sketch.error > 0  # the sketch did have to shrink
+    _assert_within_bound(sketch, Counter(stream), capacity)
+
+
+def test_heavy_keys_top_the_sketch():
+    sketch = HeavyHitters(50)
+    for key in _skewed_stream(20000, seed=0):
+        sketch.add(key)
+    assert {key for key, _ in sketch.top(5)} == {f"heavy{i}" for i in range(5)}
+
+
+def test_merged_sketches_keep_the_bound():
+    capacity = 20
+    first, second = _skewed_stream(10000, seed=1), _skewed_stream(10000, seed=2)
+    merged = HeavyHitters(capacity)
+    for stream in (first, second):
+        sketch = HeavyHitters(capacity)
+        for key in stream:
+            sketch.add(key)
+        merged.merge(sketch)
+    _assert_within_bound(merged, Counter(first) + Counter(second), capacity)
+
+
+def test_sketch_round_trips_through_json():
+    sketch = HeavyHitters(2)
+    for key in [("1.2.3.4", "login", "failure")] * 3 + [("5.6.7.8", "login", "success"), "a", "b", "c"]:
+        sketch.add(key)
+    restored = HeavyHitters.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert restored.counts == sketch.counts
+    assert (restored.total, restored.error, restored.capacity) == (sketch.total, sketch.error, sketch.capacity)
+
+
+def test_timestamps():
+    assert event_timestamp({"timestamp": 90.5}) == 90.5
+    assert event_timestamp({"@timestamp": "1970-01-01T00:01:40.123456+00:00"}) == 100
+    assert event_timestamp({"time": "1970-01-01T01:00:00+01:00"}) == 0
+    assert event_timestamp({"asctime": "1970-01-01T00:00:10"}) == 10  # naive means UTC
+    assert event_timestamp({"timestamp": "yesterday"}) is None
+    assert event_timestamp({}) is None
+
+
+def test_events_are_counted_in_their_bucket_and_window():
+    rollup = ActivityRollup(bucket_seconds=60, retention_buckets=10)
+    for timestamp, verb, status in [(0, "login", "success"), (59, "login", "failure"), (60, "login", "failure"),
+                                    (130, "view", "success"), (179, "login", "failure")]:
+        assert rollup.add(_event(timestamp, verb, status))
+    assert not rollup.add({"event_type": "other", "timestamp": 0})
+    assert not rollup.add({"event_type": "user_activity"})
+    assert (rollup.events, rollup.skipped_lines) == (5, 2)
+
+    assert rollup.counts() == [
+        {"bucket": 0, "count": 2, "by_verb_status": {"login/success": 1, "login/failure": 1}},
+        {"bucket": 60, "count": 1, "by_verb_status": {"login/failure": 1}},
+        {"bucket": 120, "count": 2, "by_verb_status": {"view/success": 1, "login/failure": 1}},
+    ]
+    # A bucket is in [since, until) if any part of it is
+    assert [row["bucket"] for row in rollup.counts(since=59, until=120)] == [0, 60]
+    assert [row["count"] for row in rollup.counts(since=60, verb="login", status="failure")] == [1, 1]
+
+
+def test_top_ips_for_failures_are_not_crowded_out_by_successes():
+    rollup = ActivityRollup(bucket_seconds=60, sketch_capacity=2)
+    for i in range(300):
+        rollup.add(_event(i % 60, ip=f"10.0.0.{i % 50}"))
+    for _ in range(3):
+        rollup.add(_event(30, status="failure", ip="203.0.113.9"))
+    assert rollup.top_ips(n=1, verb="login", status="failure") == [("203.0.113.9", 3)]
+
+
+def test_top_actors_in_a_window():
+    rollup = ActivityRollup(bucket_seconds=60)
+    for timestamp, actor in [(0, "old"), (0, "old"), (60, "new"), (70, "old")]:
+        rollup.add(_event(timestamp, actor=actor))
+    assert rollup.top_actors_in() == [("old", 3), ("new", 1)]
+    assert sorted(rollup.top_actors_in(since=60)) == [("new", 1), ("old", 1)]
+
+
+def test_buckets_past_retention_are_dropped_and_late_events_counted():
+    rollup = ActivityRollup(bucket_seconds=60, retention_buckets=3)
+    for minute in range(5):
+        rollup.add(_event(minute * 60))
+    assert sorted(rollup.buckets) == [120, 180, 240]
+    assert not rollup.add(_event(60))
+    assert rollup.late_events == 1
+    # An older event still inside the retention window gets its bucket back
+    rollup.buckets.pop(120)
+    assert rollup.add(_event(150))
+    assert sorted(rollup.buckets) == [120, 180, 240]
+
+
+def test_reader_resumes_from_its_checkpoint_without_double_counting(tmp_path):
+    log = tmp_path / "activity.log"
+    checkpoint = tmp_path / "rollup.json"
+    lines = [json.dumps(_event(i)) for i in range(3)]
+    log.write_text("\n".join(lines) + "\nnot json\n" + json.dumps(_event(3))[:20])  # a line still being written
+
+    reader = ActivityLogReader([str(log)], str(checkpoint), bucket_seconds=60)
+    reader.read_available()
+    assert (reader.rollup.events, reader.rollup.skipped_lines) == (3, 1)
+
+    log.write_text(log.read_text() + json.dumps(_event(3))[20:] + "\n")
+    resumed = ActivityLogReader([str(log)], str(checkpoint))
+    assert resumed.rollup.events == 3
+    resumed.read_available()
+    assert resumed.rollup.events == 4
+    assert resumed.rollup.counts()[0]["count"] == 4
+
+    # A rotated (replaced) file is read from the start
+    log.unlink()
+    log.write_text(json.dumps(_event(4)) + "\n")
+    resumed.read_available()
+    assert resumed.rollup.events == 5
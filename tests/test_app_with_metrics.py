@@ -0,0 +1,58 @@
+# tests/test_app_with_metrics.py
+# The metrics app keeps its middleware reachable by name and serves what it records.
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from flask import Blueprint, Flask, abort, request  # noqa: E402
+from prometheus_client import CollectorRegistry  # noqa: E402
+
+import app_with_metrics  # noqa: E402
+from prometheus_middleware import PrometheusMiddleware  # noqa: E402
+
+
+def test_middleware_is_not_shadowed_by_the_metrics_route():
+    assert isinstance(app_with_metrics.metrics_middleware, PrometheusMiddleware)
+    assert app_with_metrics.app.view_functions["metrics"] is app_with_metrics.metrics
+
+
+def test_metrics_endpoint_reports_requests():
+    client = app_with_metrics.app.test_client()
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert b"myflaskapp_requests_total" in response.data
+
+
+def _endpoints(registry):
+    return {sample.labels["endpoint"]: sample.labels["status_code"]
+            for metric in registry.collect() for sample in metric.samples if sample.name == "test_requests_total"}
+
+
+def test_requests_are_labelled_with_their_route_template():
+    app = Flask(__name__)
+    registry = CollectorRegistry()
+    blueprint = Blueprint("users", __name__)
+
+    @blueprint.route("/users/<int:user_id>")
+    def user(user_id):
+        return "ok"
+
+    @app.route("/private/<name>")
+    def private(name):
+        return "secret"
+
+    PrometheusMiddleware(app, prefix="test", registry=registry)
+
+    @app.before_request
+    def deny_private():
+        # Answers before the view; the route is still recorded
+        if request.path.startswith("/private/"):
+            abort(403)
+
+    app.register_blueprint(blueprint)
+    client = app.test_client()
+    assert client.get("/users/42").status_code == 200
+    assert client.get("/private/key").status_code == 403
+    assert client.get("/nowhere").status_code == 404
+    assert _endpoints(registry) == {"/users/<int:user_id>": "200", "/private/<name>": "403", "<unmatched>": "404"}
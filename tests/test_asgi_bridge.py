@@ -0,0 +1,211 @@
+# tests/test_asgi_bridge.py
+# The ASGI bridge: translating requests into WSGI environs and responses into ASGI
+# messages, spooled request bodies, and streamed and file responses.
+import asyncio
+import io
+import json
+
+import pytest
+
+import asgi_bridge
+from asgi_bridge import ASGIBridge, FileWrapper
+
+
+def _scope(method="GET", path="/", query=b"", headers=(), **extra):
+    return {"type": "http", "method": method, "path": path, "query_string": query, "headers": list(headers),
+            "server": ("testserver", 8000), "client": ("10.0.0.1", 5000), "http_version": "1.1", **extra}
+
+
+def _call(bridge, scope, body_messages=({"type": "http.request", "body": b""},)):
+    """Runs one request; returns the messages the bridge sent."""
+    sent = []
+
+    async def run():
+        incoming = asyncio.Queue()
+        for message in body_messages:
+            incoming.put_nowait(message)
+
+        async def send(message):
+            sent.append(message)
+
+        await bridge(scope, incoming.get, send)
+
+    asyncio.run(run())
+    return sent
+
+
+def _response(sent):
+    start, *bodies = sent
+    return start["status"], dict(start["headers"]), b"".join(message["body"] for message in bodies)
+
+
+def _echo_environ(environ, start_response):
+    body = environ["wsgi.input"].read()
+    keys = ("REQUEST_METHOD", "SCRIPT_NAME", "PATH_INFO", "QUERY_STRING", "CONTENT_TYPE", "CONTENT_LENGTH",
+            "SERVER_NAME", "SERVER_PORT", "REMOTE_ADDR", "HTTP_ACCEPT", "HTTP_X_TAG")
+    report = {key: environ.get(key) for key in keys}
+    report["body"] = body.decode()
+    report["input"] = type(environ["wsgi.input"]).__name__
+    start_response("201 Created", [("Content-Type", "application/json"), ("X-Echo", "yes")])
+    return [json.dumps(report).encode()]
+
+
+def test_request_is_translated_into_an_environ():
+    bridge = ASGIBridge(_echo_environ)
+    scope = _scope("POST", "/api/v1/items", b"a=1&b=2", [
+        (b"content-type", b"text/plain"), (b"content-length", b"5"), (b"accept", b"text/html"),
+        (b"x-tag", b"one"), (b"x-tag", b"two")], root_path="/api")
+    status, headers, body = _response(_call(bridge, scope, [{"type": "http.request", "body": b"hello"}]))
+
+    assert status == 201
+    assert headers[b"x-echo"] == b"yes"
+    assert json.loads(body) == {
+        "REQUEST_METHOD": "POST", "SCRIPT_NAME": "/api", "PATH_INFO": "/v1/items", "QUERY_STRING": "a=1&b=2",
+        "CONTENT_TYPE": "text/plain", "CONTENT_LENGTH": "5", "SERVER_NAME": "testserver", "SERVER_PORT": "8000",
+        "REMOTE_ADDR": "10.0.0.1", "HTTP_ACCEPT": "text/html", "HTTP_X_TAG": "one,two",
+        "body": "hello", "input": "SpooledTemporaryFile",
+    }
+
+
+@pytest.mark.parametrize("memory_limit", [4, 1024])
+def test_a_body_in_several_messages_is_spooled_whole(memory_limit):
+    bridge = ASGIBridge(_echo_environ, spool_memory_limit=memory_limit)
+    pieces = [b"chunked ", b"upload ", b"body"]
+    messages = [{"type": "http.request", "body": piece, "more_body": True} for piece in pieces]
+    messages.append({"type": "http.request", "body": b""})
+    # No Content-Length: a chunked upload gets the spooled size
+    status, _, body = _response(_call(bridge, _scope("PUT"), messages))
+    assert status == 201
+    assert json.loads(body)["body"] == "chunked upload body"
+    assert json.loads(body)["CONTENT_LENGTH"] == str(len(b"".join(pieces)))
+
+
+def test_spool_rolls_over_to_disk_past_the_memory_limit():
+    async def spool(pieces, memory_limit):
+        incoming = asyncio.Queue()
+        for piece in pieces:
+            incoming.put_nowait({"type": "http.request", "body": piece, "more_body": True})
+        incoming.put_nowait({"type": "http.request", "body": b""})
+        body = asgi_bridge._SpooledBody(memory_limit)
+
+        async def run(function):
+            return function()
+
+        assert await body.receive(incoming.get, run)
+        return body
+
+    small = asyncio.run(spool([b"abc", b"def"], memory_limit=6))
+    large = asyncio.run(spool([b"abc", b"def", b"g"], memory_limit=6))
+    assert not small.file._rolled
+    assert large.file._rolled
+    assert (small.stream().read(), large.stream().read()) == (b"abcdef", b"abcdefg")
+    small.close()
+    large.close()
+
+
+def test_a_client_that_leaves_before_the_body_ends_gets_no_response():
+    calls = []
+    bridge = ASGIBridge(lambda environ, start_response: calls.append(environ))
+    sent = _call(bridge, _scope("POST"), [{"type": "http.request", "body": b"part", "more_body": True},
+                                          {"type": "http.disconnect"}])
+    assert sent == []
+    assert calls == []
+
+
+def test_a_small_body_is_sent_in_one_message():
+    def app(environ, start_response):
+        write = start_response("200 OK", [("Content-Type", "text/plain")])
+        write(b"written, ")
+        return [b"then ", b"returned"]
+
+    sent = _call(ASGIBridge(app), _scope())
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.body"]
+    assert sent[1]["body"] == b"written, then returned"
+    assert not sent[1].get("more_body")
+
+
+def test_a_long_body_is_streamed_and_closed(monkeypatch):
+    monkeypatch.setattr(asgi_bridge, "RESPONSE_BUFFER_SIZE", 10)
+    closed = []
+
+    class Body:
+        def __iter__(self):
+            for i in range(5):
+                yield f"chunk {i};".encode()
+
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return Body()
+
+    sent = _call(ASGIBridge(app), _scope())
+    bodies = sent[1:]
+    assert len(bodies) > 2
+    assert all(message["more_body"] for message in bodies[:-1])
+    assert bodies[-1] == {"type": "http.response.body", "body": b""}
+    assert _response(sent)[2] == b"".join(f"chunk {i};".encode() for i in range(5))
+    assert closed == [True]
+
+
+def test_a_file_is_sent_from_its_position_for_content_length_bytes(tmp_path, monkeypatch):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(range(256)) * 4)
+
+    def app(environ, start_response):
+        f = open(path, "rb")
+        f.seek(100)
+        start_response("206 Partial Content", [("Content-Length", "600")])
+        return environ["wsgi.file_wrapper"](f, block_size=256)
+
+    sent = _call(ASGIBridge(app), _scope())
+    status, _, body = _response(sent)
+    assert status == 206
+    assert body == path.read_bytes()[100:700]
+    assert [len(message["body"]) for message in sent[1:]] == [256, 256, 88, 0]
+
+
+def test_file_wrapper_iterates_when_middleware_reads_it():
+    assert b"".join(FileWrapper(io.BytesIO(b"x" * 10), block_size=3)) == b"x" * 10
+
+
+def test_lifespan():
+    sent = []
+
+    async def run():
+        incoming = asyncio.Queue()
+        incoming.put_nowait({"type": "lifespan.startup"})
+        incoming.put_nowait({"type": "lifespan.shutdown"})
+
+        async def send(message):
+            sent.append(message["type"])
+
+        await ASGIBridge(_echo_environ)({"type": "lifespan"}, incoming.get, send)
+
+    asyncio.run(run())
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+def test_the_course_api_through_the_bridge(api):
+    bridge = ASGIBridge(api.app)
+    body = json.dumps({"title": "Intro", "content_ids": ["intro.pdf"]}).encode()
+    status, _, created = _response(_call(bridge, _scope("POST", "/api/courses/1/lessons", headers=[
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]),
+        [{"type": "http.request", "body": body[:5], "more_body": True}, {"type": "http.request", "body": body[5:]}]))
+    assert status == 201
+
+    upload = b"%PDF" * 1000
+    status, _, _ = _response(_call(
+        ASGIBridge(api.app, spool_memory_limit=1024),
+        _scope("POST", "/api/content/upload-document", b"filename=intro.pdf",
+               [(b"content-type", b"application/octet-stream")]),
+        [{"type": "http.request", "body": upload[i:i + 500], "more_body": True} for i in range(0, len(upload), 500)]
+        + [{"type": "http.request", "body": b""}]))
+    assert status == 201
+
+    status, headers, content = _response(_call(bridge, _scope("GET", "/api/content/documents/intro.pdf")))
+    assert status == 200
+    assert content == upload
+    status, _, lessons = _response(_call(bridge, _scope("GET", "/api/courses/1/lessons")))
+    assert [lesson["id"] for lesson in json.loads(lessons)] == [json.loads(created)["id"]]
@@ -0,0 +1,144 @@
+# tests/test_async_logging.py
+# The async logging pipeline: batched writes, overflow policies, flushing on stop, and
+# a writer thread that survives failing handlers.
+import io
+import logging
+
+import pytest
+
+from async_logging import BatchingQueueListener, BoundedQueueHandler, attach_async_pipeline
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class _FailingStream(io.StringIO):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def write(self, text):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        return super().write(text)
+
+
+class _ErrorRecordingHandler(logging.StreamHandler):
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.errors = []
+
+    def handleError(self, record):
+        self.errors.append(record.getMessage())
+
+
+@pytest.fixture
+def logger(request):
+    logger = logging.getLogger(f"tests.async_logging.{request.node.name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    yield logger
+    logger.handlers.clear()
+
+
+def test_records_are_written_in_order_by_the_listener(logger):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s %(user)s"))
+    collected = _ListHandler()
+    collected.setLevel(logging.WARNING)
+    queue_handler, listener = attach_async_pipeline(logger, [handler, collected], batch_size=4, flush_interval=0.01)
+    for i in range(10):
+        logger.info("event %d", i, extra={"user": f"u{i}"})
+    logger.warning("last", extra={"user": "admin"})
+    listener.stop()
+
+    assert stream.getvalue().splitlines()[:2] == ["event 0 u0", "event 1 u1"]
+    assert len(stream.getvalue().splitlines()) == 11
+    assert collected.messages == ["last"]
+    assert queue_handler.stats() == {"queued": 11, "dropped": 0, "sampled_out": 0, "flushed": 11, "queue_depth": 0}
+
+
+def test_drop_oldest_keeps_the_newest_records():
+    queue_handler = BoundedQueueHandler(maxsize=3, overflow="drop_oldest")
+    for i in range(5):
+        queue_handler.enqueue(i)
+    assert list(queue_handler.queue) == [2, 3, 4]
+    assert queue_handler.dropped == 2
+
+
+def test_sample_keeps_one_in_rate_above_the_threshold():
+    queue_handler = BoundedQueueHandler(maxsize=10, overflow="sample", sample_rate=2, sample_threshold=0.5)
+    for i in range(12):
+        queue_handler.enqueue(i)
+    # 0-4 go in below the threshold, then every other record until the queue is full
+    assert list(queue_handler.queue) == [0, 1, 2, 3, 4, 6, 8, 10]
+    assert queue_handler.sampled_out == 4
+    assert queue_handler.dropped == 4
+
+
+def test_block_gives_up_after_the_timeout():
+    queue_handler = BoundedQueueHandler(maxsize=1, overflow="block", block_timeout=0.01)
+    queue_handler.enqueue("kept")
+    queue_handler.enqueue("dropped")
+    assert list(queue_handler.queue) == ["kept"]
+    assert queue_handler.dropped == 1
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedQueueHandler(overflow="grow")
+
+
+def _drain_once(logger, handlers, messages, batch_size=2):
+    """Queues `messages` before the listener starts, so the batches are known in advance."""
+    queue_handler = BoundedQueueHandler()
+    logger.addHandler(queue_handler)
+    for message in messages:
+        logger.info(message)
+    listener = BatchingQueueListener(queue_handler, handlers, batch_size=batch_size, flush_interval=0.01)
+    listener.start()
+    listener.stop()
+    return queue_handler
+
+
+def test_a_failing_stream_write_is_reported_and_later_batches_are_written(logger):
+    handler = _ErrorRecordingHandler(_FailingStream(failures=1))
+    queue_handler = _drain_once(logger, [handler], ["lost 1", "lost 2", "written"])
+    assert handler.errors == ["lost 2"]
+    assert handler.stream.getvalue() == "written\n"
+    assert queue_handler.flushed == 3
+
+
+def test_a_handler_that_raises_does_not_stop_the_writer_thread(logger):
+    class Exploding(_ListHandler):
+        def handle(self, record):
+            if record.getMessage() == "boom":
+                raise RuntimeError("handler bug")
+            return super().handle(record)
+
+        def handleError(self, record):
+            self.messages.append(f"error: {record.getMessage()}")
+
+    class BadFilter(logging.Filter):
+        def filter(self, record):
+            if record.getMessage() == "boom":
+                raise RuntimeError("filter bug")
+            return True
+
+    exploding = Exploding()
+    stream_handler = _ErrorRecordingHandler(io.StringIO())
+    stream_handler.addFilter(BadFilter())
+    queue_handler = _drain_once(logger, [exploding, stream_handler], ["first", "boom", "after"])
+
+    assert exploding.messages == ["first", "error: boom", "after"]
+    assert stream_handler.errors == ["boom"]
+    assert stream_handler.stream.getvalue() == "first\nafter\n"
+    assert queue_handler.flushed == 3
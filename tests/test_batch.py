@@ -0,0 +1,71 @@
+# tests/test_batch.py
+# Batch endpoints: every item is validated before anything is written, and a batch is
+# applied whole or not at all.
+from memory_persistence import PersistentMemoryStorage
+
+
+def _lessons(client, course_id=1):
+    return client.get(f"/api/courses/{course_id}/lessons").get_json()
+
+
+def test_create_batch_names_the_bad_item(client):
+    response = client.post("/api/courses/1/lessons/batch", json=[
+        {"title": "Intro"}, {"title": None}, {"title": "Setup", "content_ids": "setup.mp4"}])
+    assert response.status_code == 400
+    assert [result["status"] for result in response.get_json()["results"]] == ["valid", 400, 400]
+    assert _lessons(client) == []
+
+
+def test_quiz_and_assignment_batches_reject_bad_lesson_ids(client):
+    quizzes = client.post("/api/quizzes/batch", json=[{"title": "Quiz", "questions": [], "lesson_id": "1"}])
+    assignments = client.post("/api/assignments/batch", json=[
+        {"title": "Essay", "description": "Write", "lesson_id": 1},
+        {"title": "Essay", "description": "Write", "lesson_id": 1.5}])
+    assert quizzes.status_code == 400
+    assert assignments.status_code == 400
+    assert assignments.get_json()["results"][1]["status"] == 400
+
+
+def test_update_batch(client, api):
+    created = client.post("/api/courses/1/lessons/batch", json=[{"title": "One"}, {"title": "Two"}]).get_json()
+    first, second = (result["lesson"] for result in created["results"])
+
+    response = client.put("/api/lessons/batch", json=[
+        {"id": first["id"], "title": "One, revised"},
+        {"id": second["id"], "course_id": 2, "content_ids": ["b.mp4"]},
+    ])
+    assert response.status_code == 200
+    assert response.get_json()["updated"] == 2
+    assert [lesson["title"] for lesson in _lessons(client)] == ["One, revised"]
+    assert _lessons(client, 2) == [{"id": second["id"], "course_id": 2, "title": "Two", "content_ids": ["b.mp4"]}]
+    assert api.search_index.search("revised")[0] == 1
+
+
+def test_update_batch_is_all_or_nothing(client, api):
+    lesson = client.post("/api/courses/1/lessons", json={"title": "Intro"}).get_json()
+
+    missing = client.put("/api/lessons/batch", json=[{"id": lesson["id"], "title": "Changed"}, {"id": 999, "title": "X"}])
+    assert missing.status_code == 404
+    assert [result["status"] for result in missing.get_json()["results"]] == ["valid", 404]
+
+    invalid = client.put("/api/lessons/batch", json=[
+        {"id": lesson["id"], "title": "Changed"}, {"id": lesson["id"], "title": "Again"}, {"id": "2", "title": "X"},
+        {"id": 3}, {"id": 4, "course_id": "1"}])
+    assert invalid.status_code == 400
+    assert [result["status"] for result in invalid.get_json()["results"]] == ["valid", 400, 400, 400, 400]
+
+    assert api.storage.get_lesson(lesson["id"]) == lesson
+
+
+def test_persistent_update_batch_survives_reopen(tmp_path):
+    storage = PersistentMemoryStorage(str(tmp_path), snapshot_interval=0)
+    lessons = storage.create_lessons(1, [("One", []), ("Two", [])])
+    storage.update_lessons([(lessons[0]["id"], {"title": "One, revised"}), (lessons[1]["id"], {"course_id": 2})])
+    storage.close()
+
+    reopened = PersistentMemoryStorage(str(tmp_path), snapshot_interval=0)
+    try:
+        assert [lesson["title"] for lesson in reopened.list_course_lessons(1)] == ["One, revised"]
+        assert [lesson["id"] for lesson in reopened.list_course_lessons(2)] == [lessons[1]["id"]]
+    finally:
+        reopened.close()
@@ -0,0 +1,30 @@
+# tests/test_cdn_url_helper.py
+# Rebuilding the asset manifest fingerprints source files only, never earlier hashed copies.
+import re
+
+from cdn_url_helper import build_manifest, is_fingerprinted
+
+
+def test_rebuilds_do_not_hash_old_hashed_copies(tmp_path):
+    (tmp_path / "css").mkdir()
+    main = tmp_path / "css" / "main.css"
+    main.write_text("body { color: red }")
+    first = build_manifest(str(tmp_path))
+
+    main.write_text("body { color: blue }")
+    second = build_manifest(str(tmp_path))
+    third = build_manifest(str(tmp_path))
+
+    assert list(first) == list(second) == list(third) == ["css/main.css"]
+    assert second["css/main.css"] != first["css/main.css"]
+    assert third == second
+    names = sorted(path.name for path in (tmp_path / "css").iterdir())
+    assert len(names) == 3  # the source and one copy per version
+    assert not any(re.search(r"\.[0-9a-f]{12}\.[0-9a-f]{12}\.", name) for name in names)
+
+
+def test_is_fingerprinted():
+    assert is_fingerprinted("css/main.3f2a9c1d0b7e.css")
+    assert is_fingerprinted("LICENSE.3f2a9c1d0b7e")
+    assert not is_fingerprinted("css/main.css")
+    assert not is_fingerprinted("js/jquery.min.js")
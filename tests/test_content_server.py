@@ -0,0 +1,128 @@
+# tests/test_content_server.py
+# Content downloads: validators, single and suffix ranges, 416 for unsatisfiable ones,
+# and multi-range responses with coalescing and a cap on the number of ranges.
+import email.parser
+import email.policy
+
+import pytest
+
+from content_server import MAX_RANGES
+
+DOCUMENT = bytes(range(256)) * 4  # 1024 bytes
+
+
+@pytest.fixture
+def document(client):
+    response = client.post("/api/content/upload-document?filename=notes.pdf", data=DOCUMENT,
+                           content_type="application/octet-stream")
+    assert response.status_code == 201
+    return "/api/content/documents/notes.pdf"
+
+
+@pytest.fixture
+def video(client):
+    response = client.post("/api/content/upload-video?filename=clip.mp4", data=DOCUMENT,
+                           content_type="application/octet-stream")
+    assert response.status_code == 201
+    return "/api/content/videos/clip.mp4"
+
+
+def _get(client, path, range_header=None, **headers):
+    if range_header is not None:
+        headers["Range"] = range_header
+    return client.get(path, headers=headers)
+
+
+def _parts(response):
+    """[(Content-Range, body)] of a multipart/byteranges response."""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {response.headers['Content-Type']}\r\n\r\n".encode() + response.get_data())
+    return [(part["Content-Range"], part.get_payload(decode=True)) for part in message.iter_parts()]
+
+
+def test_whole_file_and_validators(client, document):
+    response = _get(client, document)
+    assert response.status_code == 200
+    assert response.get_data() == DOCUMENT
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert _get(client, document, **{"If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert _get(client, "/api/content/documents/missing.pdf").status_code == 404
+
+
+@pytest.mark.parametrize("range_header,content_range,body", [
+    ("bytes=0-99", "bytes 0-99/1024", DOCUMENT[:100]),
+    ("bytes=1000-", "bytes 1000-1023/1024", DOCUMENT[1000:]),
+    ("bytes=1000-5000", "bytes 1000-1023/1024", DOCUMENT[1000:]),
+    ("bytes=-10", "bytes 1014-1023/1024", DOCUMENT[-10:]),
+    ("bytes=-5000", "bytes 0-1023/1024", DOCUMENT),  # a suffix longer than the file is all of it
+])
+def test_single_and_suffix_ranges(client, document, video, range_header, content_range, body):
+    for path in (document, video):
+        response = _get(client, path, range_header)
+        assert response.status_code == 206
+        assert response.headers["Content-Range"] == content_range
+        assert response.get_data() == body
+
+
+@pytest.mark.parametrize("range_header", ["bytes=1024-", "bytes=5000-6000", "bytes=1024-,2000-3000", "bytes=-0"])
+def test_unsatisfiable_ranges_are_416(client, document, range_header):
+    response = _get(client, document, range_header)
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */1024"
+
+
+@pytest.mark.parametrize("range_header", ["bytes=abc", "bytes=-", "bytes=", "items=0-1", "bytes=5-1", "bytes=0-1,x"])
+def test_malformed_ranges_are_ignored(client, document, range_header):
+    response = _get(client, document, range_header)
+    assert response.status_code == 200
+    assert response.get_data() == DOCUMENT
+
+
+def test_stale_if_range_gets_the_whole_file(client, document):
+    etag = _get(client, document).headers["ETag"]
+    assert _get(client, document, "bytes=0-9", **{"If-Range": etag}).status_code == 206
+    response = _get(client, document, "bytes=0-9", **{"If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.get_data() == DOCUMENT
+
+
+def test_multi_range_document(client, document):
+    response = _get(client, document, "bytes=500-509,0-4,-3")
+    assert response.status_code == 206
+    assert response.mimetype == "multipart/byteranges"
+    # Parts come in file order
+    assert _parts(response) == [
+        ("bytes 0-4/1024", DOCUMENT[:5]),
+        ("bytes 500-509/1024", DOCUMENT[500:510]),
+        ("bytes 1021-1023/1024", DOCUMENT[-3:]),
+    ]
+
+
+def test_overlapping_and_adjacent_ranges_are_coalesced(client, document):
+    response = _get(client, document, "bytes=0-9,5-19,20-29,100-109,105-")
+    assert _parts(response) == [("bytes 0-29/1024", DOCUMENT[:30]), ("bytes 100-1023/1024", DOCUMENT[100:])]
+
+    # Ranges that coalesce into one are a plain 206
+    single = _get(client, document, "bytes=10-19,0-9,5-14")
+    assert single.status_code == 206
+    assert single.headers["Content-Range"] == "bytes 0-19/1024"
+    assert single.get_data() == DOCUMENT[:20]
+
+
+def test_more_than_max_ranges_gets_the_whole_file(client, document):
+    allowed = ",".join(f"{i * 10}-{i * 10}" for i in range(MAX_RANGES))
+    assert len(_parts(_get(client, document, f"bytes={allowed}"))) == MAX_RANGES
+
+    too_many = ",".join(f"{i * 10}-{i * 10}" for i in range(MAX_RANGES + 1))
+    response = _get(client, document, f"bytes={too_many}")
+    assert response.status_code == 200
+    assert response.get_data() == DOCUMENT
+    # Repeating one range many times is no way around the cap
+    assert _get(client, document, "bytes=" + ",".join(["0-1023"] * (MAX_RANGES + 1))).status_code == 200
+
+
+def test_videos_answer_multi_range_requests_with_the_whole_file(client, video):
+    response = _get(client, video, "bytes=0-9,100-109")
+    assert response.status_code == 200
+    assert response.get_data() == DOCUMENT
+    assert _get(client, video, "bytes=0-9,10-19").headers["Content-Range"] == "bytes 0-19/1024"
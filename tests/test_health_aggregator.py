@@ -0,0 +1,126 @@
+# tests/test_health_aggregator.py
+# Health probes: liveness and readiness views, cached results, timeouts, and one run
+# per check at a time.
+import threading
+import time
+
+import pytest
+
+from health_aggregator import LIVENESS, READINESS, HealthAggregator
+
+
+class _ProbeDriven(HealthAggregator):
+    """No background refresher, so checks run only when a probe finds them stale."""
+
+    def _refresh_loop(self):
+        pass
+
+
+@pytest.fixture
+def health():
+    aggregator = _ProbeDriven()
+    yield aggregator
+    aggregator.stop()
+
+
+class _Counted:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait()
+        return self.healthy, f"called {self.calls} times"
+
+
+def test_views_only_count_their_own_checks(health):
+    health.register("process", _Counted(), views=(LIVENESS, READINESS))
+    health.register("database", _Counted(healthy=False), views=(READINESS,))
+
+    live = health.status(LIVENESS)
+    assert live["status"] == "ok"
+    assert list(live["checks"]) == ["process"]
+    ready = health.status(READINESS)
+    assert ready["status"] == "fail"
+    assert ready["checks"]["database"]["healthy"] is False
+    assert ready["checks"]["process"]["healthy"] is True
+
+
+def test_results_are_served_from_the_cache_until_stale(health):
+    check = _Counted()
+    health.register("database", check, ttl=0.2)
+    health.status()
+    health.status()
+    assert check.calls == 1  # one run, however many probes
+
+    time.sleep(0.25)
+    report = health.status()
+    assert check.calls == 2
+    assert report["checks"]["database"]["message"] == "called 2 times"
+    assert report["checks"]["database"]["age_s"] < 0.2
+
+
+def test_a_check_that_raises_is_unhealthy(health):
+    def broken():
+        raise ConnectionError("refused")
+
+    health.register("database", broken)
+    report = health.status()
+    assert report["status"] == "fail"
+    assert report["checks"]["database"]["message"] == "database check failed: refused"
+
+
+def test_a_slow_check_times_out_without_blocking_the_probe(health):
+    check = _Counted()
+    check.release.clear()
+    health.register("database", check, timeout=0.05)
+    health.register("cache", _Counted(), timeout=0.05)
+
+    started = time.monotonic()
+    report = health.status()
+    assert time.monotonic() - started < 1
+    assert report["status"] == "fail"
+    assert report["checks"]["database"]["timed_out"] is True
+    assert report["checks"]["database"]["latency_ms"] == 50
+    assert report["checks"]["cache"]["healthy"] is True
+
+    # The late run still records what it found
+    check.release.set()
+    deadline = time.monotonic() + 5
+    while health.checks["database"].in_flight is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert health.checks["database"].result.timed_out is False
+    assert health.checks["database"].result.healthy is True
+
+
+def test_concurrent_probes_share_one_run(health):
+    check = _Counted()
+    check.release.clear()
+    health.register("database", check, timeout=5)
+    reports = []
+    probes = [threading.Thread(target=lambda: reports.append(health.status())) for _ in range(10)]
+    for probe in probes:
+        probe.start()
+    time.sleep(0.05)
+    check.release.set()
+    for probe in probes:
+        probe.join()
+
+    assert check.calls == 1
+    assert [report["status"] for report in reports] == ["ok"] * 10
+
+
+def test_probe_endpoints(client, api, monkeypatch):
+    assert client.get("/health/live").status_code == 200
+    ready = client.get("/health/ready")
+    assert ready.status_code == 200
+    assert set(ready.get_json()["checks"]) == {"database", "cache"}
+
+    monkeypatch.setattr(api.health.checks["database"], "result", None)
+    monkeypatch.setattr(api, "storage", None)  # storage gone: the ping raises
+    ready = client.get("/health/ready")
+    assert ready.status_code == 503
+    assert ready.get_json()["checks"]["database"]["healthy"] is False
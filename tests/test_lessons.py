@@ -0,0 +1,30 @@
+# tests/test_lessons.py
+# Lesson updates: invalid changes are rejected before the lesson or its course index change.
+import pytest
+
+
+@pytest.mark.parametrize("course_id", ["2", [2], {"id": 2}, None, 2.0, True])
+def test_update_rejects_non_integer_course_id(client, api, course_id):
+    lesson = client.post("/api/courses/1/lessons", json={"title": "Intro", "content_ids": []}).get_json()
+
+    response = client.put(f"/api/lessons/{lesson['id']}", json={"course_id": course_id, "title": "Changed"})
+    assert response.status_code == 400
+    assert api.storage.get_lesson(lesson["id"]) == lesson
+    assert [item["id"] for item in client.get("/api/courses/1/lessons").get_json()] == [lesson["id"]]
+
+
+def test_storage_checks_course_id_before_unindexing(api):
+    lesson = api.storage.create_lesson(1, "Intro", [])
+    with pytest.raises(ValueError):
+        api.storage.update_lesson(lesson["id"], {"course_id": "2", "title": "Changed"})
+    assert api.storage.get_lesson(lesson["id"]) == lesson
+    assert [item["id"] for item in api.storage.list_course_lessons(1)] == [lesson["id"]]
+
+
+def test_update_moves_lesson_to_new_course(client):
+    lesson = client.post("/api/courses/1/lessons", json={"title": "Intro", "content_ids": []}).get_json()
+
+    response = client.put(f"/api/lessons/{lesson['id']}", json={"course_id": 2})
+    assert response.status_code == 200
+    assert client.get("/api/courses/1/lessons").get_json() == []
+    assert [item["id"] for item in client.get("/api/courses/2/lessons").get_json()] == [lesson["id"]]
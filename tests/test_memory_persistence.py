@@ -0,0 +1,182 @@
+# tests/test_memory_persistence.py
+# PersistentMemoryStorage restarts: log replay (including after a write torn by a
+# crash) and loading a snapshot plus the log written after it. A failing log write
+# fails the request instead of hanging it.
+import errno
+import os
+
+import pytest
+
+from memory_persistence import CorruptLogError, LogWriteError, PersistentMemoryStorage, WriteAheadLog, latest_snapshot
+
+
+def _open(directory):
+    return PersistentMemoryStorage(str(directory), snapshot_interval=0)
+
+
+def _segments(directory):
+    return [path for _, path in WriteAheadLog.segments(str(directory))]
+
+
+def _state(storage):
+    """Everything a restart must restore, as plain data."""
+    lessons = sorted(storage.iter_entities("lesson"), key=lambda lesson: lesson["id"])
+    return {
+        "lessons": lessons,
+        "courses": {course_id: [lesson["id"] for lesson in storage.list_course_lessons(course_id)] for course_id in (1, 2)},
+        "versions": {lesson["id"]: storage.get_version("lesson", lesson["id"]) for lesson in lessons},
+        "quizzes": sorted(storage.iter_entities("quiz"), key=lambda quiz: quiz["id"]),
+        "content": storage.get_contents(["a.pdf", "b.mp4"]),
+    }
+
+
+def test_replay_restores_every_write(tmp_path):
+    storage = _open(tmp_path)
+    first = storage.create_lesson(1, "Intro", ["a.pdf"])
+    second, third = storage.create_lessons(1, [("Setup", []), ("Extra", [])])
+    storage.update_lesson(first["id"], {"title": "Intro, revised", "course_id": 2})
+    storage.delete_lesson(third["id"])
+    storage.register_content("document", {"filename": "a.pdf", "size": 3, "checksum": "abc"}, "/a.pdf")
+    storage.create_quiz("Quiz", [{"q": "2+2?", "a": "4"}], second["id"])
+    expected = _state(storage)
+    storage.close()
+
+    reopened = _open(tmp_path)
+    try:
+        assert _state(reopened) == expected
+        assert reopened.replayed == 6  # the batch create is one record
+        # Ids continue after the replayed ones
+        assert reopened.create_lesson(1, "Next", [])["id"] > third["id"]
+    finally:
+        reopened.close()
+
+
+def test_replay_stops_at_a_torn_tail_and_truncates_it(tmp_path):
+    storage = _open(tmp_path)
+    kept = [storage.create_lesson(1, f"Lesson {i}", []) for i in range(3)]
+    storage.create_lesson(1, "Torn", [])
+    storage.close()
+    segment, = _segments(tmp_path)
+    intact_size = os.path.getsize(segment)
+    # A crash in the middle of the last record's write
+    with open(segment, "r+b") as f:
+        f.truncate(intact_size - 5)
+
+    reopened = _open(tmp_path)
+    try:
+        assert [lesson["title"] for lesson in reopened.list_course_lessons(1)] == [lesson["title"] for lesson in kept]
+        assert reopened.replayed == 3
+        # The torn bytes are gone, so records appended now are readable on the next start
+        after = reopened.create_lesson(1, "After the crash", [])
+    finally:
+        reopened.close()
+
+    again = _open(tmp_path)
+    try:
+        assert [lesson["id"] for lesson in again.list_course_lessons(1)] == [lesson["id"] for lesson in kept] + [after["id"]]
+    finally:
+        again.close()
+
+
+def test_garbage_after_the_last_record_is_dropped(tmp_path):
+    storage = _open(tmp_path)
+    lesson = storage.create_lesson(1, "Intro", [])
+    storage.close()
+    segment, = _segments(tmp_path)
+    with open(segment, "ab") as f:
+        f.write(b"\x10\x00\x00\x00\xde\xad\xbe\xefnot a record")
+
+    reopened = _open(tmp_path)
+    try:
+        assert reopened.list_course_lessons(1) == [lesson]
+    finally:
+        reopened.close()
+
+
+def test_damage_before_the_last_segment_is_an_error(tmp_path):
+    storage = _open(tmp_path)
+    storage.create_lesson(1, "Intro", [])
+    storage.wal.rotate()
+    storage.create_lesson(1, "Setup", [])
+    storage.close()
+    first_segment = _segments(tmp_path)[0]
+    with open(first_segment, "r+b") as f:
+        f.truncate(os.path.getsize(first_segment) - 1)
+
+    with pytest.raises(CorruptLogError):
+        _open(tmp_path)
+
+
+def test_snapshot_plus_log_tail(tmp_path):
+    storage = _open(tmp_path)
+    before = storage.create_lessons(1, [("Intro", ["a.pdf"]), ("Setup", []), ("Extra", [])])
+    storage.register_content("document", {"filename": "a.pdf", "size": 3, "checksum": "abc"}, "/a.pdf")
+    snapshot_seq = storage.snapshot()
+    # The tail: writes after the snapshot, touching entities it captured
+    storage.update_lesson(before[0]["id"], {"title": "Intro, revised"})
+    storage.update_lessons([(before[1]["id"], {"course_id": 2})])
+    storage.delete_lesson(before[2]["id"])
+    storage.create_lesson(1, "New", [])
+    storage.register_content("video", {"filename": "b.mp4", "size": 3, "checksum": "abc"}, "/b.mp4")
+    expected = _state(storage)
+    storage.close()
+
+    assert latest_snapshot(str(tmp_path))[0] == snapshot_seq
+    reopened = _open(tmp_path)
+    try:
+        assert _state(reopened) == expected
+        assert reopened.replayed == 5
+        # Dedup is by type and checksum after a restart too
+        assert reopened.register_content("video", {"filename": "c.mp4", "checksum": "abc"}, "/c.mp4")[1] is True
+        assert reopened.register_content("document", {"filename": "c.pdf", "checksum": "abc"}, "/c.pdf")[1] is True
+    finally:
+        reopened.close()
+
+
+def test_snapshot_removes_the_log_it_covers(tmp_path):
+    storage = _open(tmp_path)
+    storage.create_lessons(1, [("Intro", []), ("Setup", [])])
+    storage.snapshot()
+    storage.create_lesson(1, "After", [])
+    storage.close()
+
+    # Only the segment started by the snapshot is left, holding the one later record
+    assert len(_segments(tmp_path)) == 1
+    reopened = _open(tmp_path)
+    try:
+        assert reopened.replayed == 1
+        assert [lesson["title"] for lesson in reopened.list_course_lessons(1)] == ["Intro", "Setup", "After"]
+    finally:
+        reopened.close()
+
+
+def _disk_full(fd):
+    raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+
+def test_a_failed_log_write_is_raised_to_the_writer(tmp_path, monkeypatch):
+    storage = _open(tmp_path)
+    kept = storage.create_lesson(1, "Intro", [])
+    monkeypatch.setattr(os, "fdatasync", _disk_full)
+    with pytest.raises(LogWriteError) as failure:
+        storage.create_lesson(1, "Disk full", [])
+    assert failure.value.__cause__.errno == errno.ENOSPC
+    # The writer has stopped, so later writes fail at once even though the disk recovered
+    monkeypatch.undo()
+    with pytest.raises(LogWriteError):
+        storage.update_lesson(kept["id"], {"title": "Intro, revised"})
+    storage.close()
+
+    reopened = _open(tmp_path)
+    try:
+        # Whether the record whose fsync failed survived is unknown; the refused update never reached the log
+        assert reopened.get_lesson(kept["id"]) == kept
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("backend", ["persistent"])
+def test_a_failed_log_write_is_a_500(client, monkeypatch):
+    monkeypatch.setattr(os, "fdatasync", _disk_full)
+    assert client.post("/api/courses/1/lessons", json={"title": "Intro"}).status_code == 500
+    assert client.post("/api/quizzes", json={"title": "Quiz", "questions": []}).status_code == 500
@@ -0,0 +1,86 @@
+# tests/test_metrics_cardinality.py
+# SeriesLimiter: the series cap, the overflow label set and its dropped counter, and
+# expiry of idle label sets.
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from prometheus_client import CollectorRegistry, Counter, Histogram  # noqa: E402
+
+from metrics_cardinality import OVERFLOW_VALUE, SeriesLimiter  # noqa: E402
+
+
+@pytest.fixture
+def registry():
+    return CollectorRegistry()
+
+
+@pytest.fixture
+def requests_total(registry):
+    return Counter("requests", "Requests", ["method", "path"], registry=registry)
+
+
+@pytest.fixture
+def dropped(registry):
+    return Counter("series_dropped", "Dropped", ["metric"], registry=registry)
+
+
+def _series(registry, name):
+    """{label values: value} of a metric's samples named `name`."""
+    return {tuple(sample.labels.values()): sample.value
+            for metric in registry.collect() for sample in metric.samples if sample.name == name}
+
+
+def test_label_sets_past_the_cap_go_to_the_overflow_series(registry, requests_total, dropped):
+    limiter = SeriesLimiter(requests_total, max_series=2, dropped=dropped)
+    for path in ("/a", "/b", "/c", "/d", "/a", "/c"):
+        limiter.child(("GET", path), now=0).inc()
+
+    assert _series(registry, "requests_total") == {
+        ("GET", "/a"): 2, ("GET", "/b"): 1, (OVERFLOW_VALUE, OVERFLOW_VALUE): 3}
+    assert _series(registry, "series_dropped_total") == {("requests",): 3}
+    assert len(limiter) == 3  # the overflow label set is held but not counted against the cap
+
+
+def test_custom_overflow_keeps_some_labels(registry, requests_total):
+    limiter = SeriesLimiter(requests_total, max_series=1, overflow=lambda labels: (labels[0], OVERFLOW_VALUE))
+    for method, path in (("GET", "/a"), ("GET", "/b"), ("POST", "/c"), ("POST", "/d")):
+        limiter.child((method, path), now=0).inc()
+    assert _series(registry, "requests_total") == {
+        ("GET", "/a"): 1, ("GET", OVERFLOW_VALUE): 1, ("POST", OVERFLOW_VALUE): 2}
+
+
+def test_idle_label_sets_are_removed_and_free_room(registry, requests_total, dropped):
+    limiter = SeriesLimiter(requests_total, max_series=2, idle_seconds=10, dropped=dropped)
+    limiter.child(("GET", "/a"), now=0).inc()
+    limiter.child(("GET", "/b"), now=0).inc()
+    limiter.child(("GET", "/c"), now=1).inc()  # refused: full
+    limiter.child(("GET", "/b"), now=9).inc()
+
+    # /a and the overflow series went idle; /b was used recently
+    limiter.child(("GET", "/b"), now=12).inc()
+    assert _series(registry, "requests_total") == {("GET", "/b"): 3}
+    assert len(limiter) == 1
+
+    limiter.child(("GET", "/c"), now=13).inc()  # admitted now
+    assert _series(registry, "requests_total") == {("GET", "/b"): 3, ("GET", "/c"): 1}
+    assert _series(registry, "series_dropped_total") == {("requests",): 1}
+
+
+def test_expiry_happens_within_a_quarter_of_the_idle_time(registry, requests_total):
+    limiter = SeriesLimiter(requests_total, idle_seconds=8)
+    limiter.child(("GET", "/a"), now=0).inc()
+    limiter.child(("GET", "/b"), now=8).inc()  # first sweep: /a is not yet past the cutoff
+    assert len(limiter) == 2
+    limiter.child(("GET", "/b"), now=9).inc()  # sweeps are 2s apart
+    assert len(limiter) == 2
+    limiter.child(("GET", "/b"), now=10).inc()
+    assert _series(registry, "requests_total") == {("GET", "/b"): 3}
+
+
+def test_histograms_are_limited_too(registry):
+    latency = Histogram("latency", "Latency", ["path"], buckets=(1.0,), registry=registry)
+    limiter = SeriesLimiter(latency, max_series=1)
+    limiter.child(("/a",), now=0).observe(0.5)
+    limiter.child(("/b",), now=0).observe(2.0)
+    assert _series(registry, "latency_count") == {("/a",): 1, (OVERFLOW_VALUE,): 1}
@@ -0,0 +1,86 @@
+# tests/test_metrics_exposition.py
+# /metrics rendering: values merged across worker processes' files, cleanup after a
+# worker exits, and the render cache.
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+from prometheus_client import CollectorRegistry, Counter  # noqa: E402
+
+import metrics_exposition  # noqa: E402
+from metrics_exposition import CachedExposition, mark_worker_dead  # noqa: E402
+
+WORKER = textwrap.dedent("""
+    import os, sys
+    from prometheus_client import Counter, Gauge
+    requests = Counter("worker_requests", "Requests", ["path"])
+    requests.labels("/").inc(int(sys.argv[1]))
+    Gauge("worker_in_flight", "In flight", multiprocess_mode="livesum").set(int(sys.argv[2]))
+    print(os.getpid())
+""")
+
+
+def _run_worker(directory, requests, in_flight):
+    """Runs a process that records metrics into `directory` and exits; returns its pid."""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(directory)}
+    output = subprocess.run([sys.executable, "-c", WORKER, str(requests), str(in_flight)], check=True,
+                            capture_output=True, text=True, env=env)
+    return int(output.stdout)
+
+
+def _sample(body, name):
+    for line in body.decode().splitlines():
+        if line.startswith(name):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+@pytest.fixture
+def multiproc_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_scrapes_merge_every_workers_values(multiproc_dir):
+    _run_worker(multiproc_dir, requests=3, in_flight=2)
+    _run_worker(multiproc_dir, requests=4, in_flight=5)
+    body = CachedExposition(ttl=0).render()
+    assert _sample(body, 'worker_requests_total{path="/"}') == 7
+    assert _sample(body, "worker_in_flight") == 7
+
+
+def test_a_dead_workers_live_gauges_are_dropped_but_counters_kept(multiproc_dir):
+    _run_worker(multiproc_dir, requests=3, in_flight=2)
+    exited = _run_worker(multiproc_dir, requests=4, in_flight=5)
+    mark_worker_dead(exited)
+    body = CachedExposition(ttl=0).render()
+    assert _sample(body, 'worker_requests_total{path="/"}') == 7
+    assert _sample(body, "worker_in_flight") == 2
+
+
+def test_the_legacy_lowercase_variable_is_honoured(tmp_path, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    assert metrics_exposition.multiprocess_dir() is None
+    monkeypatch.setenv("prometheus_multiproc_dir", str(tmp_path))
+    assert metrics_exposition.multiprocess_dir() == str(tmp_path)
+
+
+def test_rendering_is_cached_for_the_ttl(monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    monkeypatch.delenv("prometheus_multiproc_dir", raising=False)
+    registry = CollectorRegistry()
+    counter = Counter("cached_requests", "Requests", registry=registry)
+    cached, uncached = CachedExposition(ttl=0.5, registry=registry), CachedExposition(ttl=0, registry=registry)
+    first = cached.render()
+    counter.inc()
+    assert cached.render() is first
+    assert _sample(uncached.render(), "cached_requests_total") == 1
+
+    time.sleep(0.5)
+    assert _sample(cached.render(), "cached_requests_total") == 1
@@ -0,0 +1,118 @@
+# tests/test_otel_sampling.py
+# Trace sampling: per-route ratios, the rate limit, and tail keep of failed or slow
+# traces the head sampler dropped.
+import random
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter  # noqa: E402
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON  # noqa: E402
+from opentelemetry.trace import Status, StatusCode, set_span_in_context  # noqa: E402
+
+from otel_sampling import (  # noqa: E402
+    HTTP_ROUTE,
+    RateLimitingSampler,
+    RouteRatioSampler,
+    TailKeepSpanProcessor,
+    build_sampler,
+    parse_route_ratios,
+)
+
+
+def _sampled_share(sampler, route=None, traces=4000):
+    rng = random.Random(0)
+    attributes = {HTTP_ROUTE: route} if route else None
+    sampled = sum(sampler.should_sample(None, rng.getrandbits(128), "GET", attributes=attributes).decision.is_sampled()
+                  for _ in range(traces))
+    return sampled / traces
+
+
+def test_route_ratios():
+    sampler = RouteRatioSampler(0.25, {"/health": 0.0, "/user/<user_id>": 1.0})
+    assert _sampled_share(sampler) == pytest.approx(0.25, abs=0.03)
+    assert _sampled_share(sampler, "/unlisted") == pytest.approx(0.25, abs=0.03)
+    assert _sampled_share(sampler, "/health") == 0
+    assert _sampled_share(sampler, "/user/<user_id>") == 1
+
+
+def test_rate_limit():
+    sampler = RateLimitingSampler(ALWAYS_ON, max_per_second=5)
+    decisions = [sampler.should_sample(None, trace_id, "GET").decision.is_sampled() for trace_id in range(1, 21)]
+    assert decisions == [True] * 5 + [False] * 15
+
+
+def test_parse_route_ratios():
+    assert parse_route_ratios(" /=0.01, /user/<user_id>=0.5 ,") == {"/": 0.01, "/user/<user_id>": 0.5}
+    assert parse_route_ratios(None) == {}
+
+
+def _tracing(default_ratio, tail_keep=True, **processor_options):
+    exporter = InMemorySpanExporter()
+    processor = TailKeepSpanProcessor(SimpleSpanProcessor(exporter), **processor_options)
+    provider = TracerProvider(sampler=build_sampler(default_ratio, tail_keep=tail_keep))
+    provider.add_span_processor(processor)
+    return provider.get_tracer(__name__), processor, exporter
+
+
+def _trace(tracer, duration_ns=1000, child_status=None):
+    root = tracer.start_span("GET /", start_time=0)
+    with tracer.start_as_current_span("db", context=set_span_in_context(root)) as child:
+        if child_status is not None:
+            child.set_status(Status(child_status))
+    root.end(end_time=duration_ns)
+    return root
+
+
+def test_head_sampled_traces_are_exported_as_they_are():
+    tracer, processor, exporter = _tracing(1.0)
+    _trace(tracer)
+    spans = exporter.get_finished_spans()
+    assert [span.name for span in spans] == ["db", "GET /"]
+    assert all("sampling.tail_kept" not in span.attributes for span in spans)
+    assert processor.kept == 0
+
+
+def test_unsampled_fast_traces_are_not_exported():
+    tracer, processor, exporter = _tracing(0.0, slow_threshold=0.5)
+    _trace(tracer, duration_ns=10**6)
+    assert exporter.get_finished_spans() == ()
+    assert processor.kept == 0
+
+
+@pytest.mark.parametrize("duration_ns,child_status", [
+    (10**6, StatusCode.ERROR),  # a failed span
+    (5 * 10**8, None),  # a root at the slow threshold
+])
+def test_failed_or_slow_unsampled_traces_are_kept_whole(duration_ns, child_status):
+    tracer, processor, exporter = _tracing(0.0, slow_threshold=0.5)
+    root = _trace(tracer, duration_ns, child_status)
+    spans = exporter.get_finished_spans()
+    assert [span.name for span in spans] == ["db", "GET /"]
+    assert {span.context.trace_id for span in spans} == {root.context.trace_id}
+    assert all(span.context.trace_flags.sampled and span.attributes["sampling.tail_kept"] for span in spans)
+    assert processor.kept == 1
+
+
+def test_without_tail_keep_unsampled_spans_are_not_recorded():
+    tracer, processor, exporter = _tracing(0.0, tail_keep=False)
+    root = _trace(tracer, 10**9, StatusCode.ERROR)
+    assert not root.is_recording()
+    assert exporter.get_finished_spans() == ()
+
+
+def test_pending_traces_are_bounded():
+    tracer, processor, exporter = _tracing(0.0, max_pending_traces=1)
+    roots = [tracer.start_span("GET /", start_time=0) for _ in range(2)]
+    for root in roots:
+        child = tracer.start_span("db", context=set_span_in_context(root))
+        child.set_status(Status(StatusCode.ERROR))
+        child.end()
+    assert processor.discarded == 1
+    for root in roots:
+        root.end(end_time=1000)
+    # The first trace's failed child was discarded, so only the second trace is kept
+    assert {span.context.trace_id for span in exporter.get_finished_spans()} == {roots[1].context.trace_id}
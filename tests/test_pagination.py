@@ -0,0 +1,42 @@
+# tests/test_pagination.py
+# Keyset pagination over a course's lessons, and cursors that must be rejected up front.
+import base64
+
+import pytest
+
+
+def _cursor(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def test_pages_follow_the_cursor(client):
+    client.post("/api/courses/1/lessons/batch", json=[{"title": f"Lesson {i}"} for i in range(5)])
+    titles, path = [], "/api/courses/1/lessons?limit=2"
+    while path:
+        page = client.get(path).get_json()
+        titles += [lesson["title"] for lesson in page["lessons"]]
+        path = f"/api/courses/1/lessons?limit=2&after={page['next_cursor']}" if page["next_cursor"] else None
+    assert titles == [f"Lesson {i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("cursor", [
+    _cursor(f"lesson:{2**64}"),
+    _cursor(f"lesson:{2**63}"),
+    _cursor("lesson:-1"),
+    _cursor("quiz:1"),
+    "not base64!",
+])
+@pytest.mark.parametrize("query", ["", "&limit=10", "&stream=1"])
+def test_bad_cursors_are_400(client, cursor, query):
+    client.post("/api/courses/1/lessons", json={"title": "Intro"})
+    for path in (f"/api/courses/1/lessons?after={cursor}{query}", f"/api/courses/1/outline?after={cursor}"):
+        response = client.get(path)
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Invalid cursor"}
+
+
+def test_stream_after_the_largest_cursor_is_empty(client):
+    client.post("/api/courses/1/lessons", json={"title": "Intro"})
+    response = client.get(f"/api/courses/1/lessons?stream=1&after={_cursor(f'lesson:{2**63 - 1}')}")
+    assert response.status_code == 200
+    assert response.get_json() == []
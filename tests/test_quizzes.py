@@ -0,0 +1,64 @@
+# tests/test_quizzes.py
+# Quiz questions are checked when the quiz is created, so grading and analytics can
+# rely on their shape.
+import pytest
+
+from quiz_analytics import QuizStats
+
+BAD_QUESTIONS = [
+    {"q": "2+2?"},
+    ["2+2?", "4"],
+    ["2+2?"],
+    [{"q": "2+2?", "a": "4", "points": "2"}],
+    [{"q": "2+2?", "a": "4", "points": True}],
+    [{"q": "2+2?", "a": "4", "points": None}],
+    [{"q": "2+2?", "a": "4", "points": -1}],
+    [{"q": "2+2?", "a": "4", "points": float("inf")}],
+    [{"q": "2+2?", "a": ["4"]}],
+    [{"q": {"text": "2+2?"}, "a": "4"}],
+]
+
+
+@pytest.mark.parametrize("questions", BAD_QUESTIONS)
+def test_malformed_questions_are_rejected(client, questions):
+    assert client.post("/api/quizzes", json={"title": "Quiz", "questions": questions}).status_code == 400
+    batch = client.post("/api/quizzes/batch", json=[{"title": "Fine", "questions": []}, {"title": "Quiz", "questions": questions}])
+    assert batch.status_code == 400
+    assert [result["status"] for result in batch.get_json()["results"]] == ["valid", 400]
+
+
+def test_weighted_quiz_grades_and_reports(client):
+    quiz = client.post("/api/quizzes", json={"title": "Quiz", "questions": [
+        {"q": "2+2?", "a": "4", "points": 2.5}, {"q": "Capital of France?", "a": "Paris"}]}).get_json()
+
+    submission = client.post(f"/api/quizzes/{quiz['id']}/submissions", json={"student_id": 1, "answers": ["4", "Rome"]})
+    assert submission.status_code == 201
+    assert submission.get_json()["score"] == 2.5
+
+    analytics = client.get(f"/api/quizzes/{quiz['id']}/analytics")
+    assert analytics.status_code == 200
+    report = analytics.get_json()
+    assert report["max_score"] == 3.5
+    assert [question["q"] for question in report["questions"]] == ["2+2?", "Capital of France?"]
+
+
+def test_report_tolerates_questions_stored_before_validation():
+    report = QuizStats(3, 3).report([{"q": "2+2?", "a": "4"}, "What is 3+3?"])
+    assert [question["q"] for question in report["questions"]] == ["2+2?", None, None]
+
+
+def test_editing_a_returned_quiz_leaves_the_stored_one_alone(api):
+    created = api.storage.create_quiz("Quiz", [{"q": "2+2?", "a": "4"}], None)
+    created["questions"][0]["a"] = "5"
+    fetched = api.storage.get_quiz(created["id"])
+    fetched["questions"].append({"q": "3+3?", "a": "6"})
+    assert api.storage.get_quiz(created["id"])["questions"] == [{"q": "2+2?", "a": "4"}]
+
+
+@pytest.mark.parametrize("answer", ["", "   ", None, "anything"])
+def test_a_question_without_an_answer_is_never_correct(client, answer):
+    quiz = client.post("/api/quizzes", json={"title": "Quiz", "questions": [{"q": "Discuss."}, {"q": "2+2?", "a": "4"}]})
+    submission = client.post(f"/api/quizzes/{quiz.get_json()['id']}/submissions",
+                             json={"student_id": 1, "answers": [answer, "4"]})
+    assert submission.status_code == 201
+    assert submission.get_json()["score"] == 1
@@ -0,0 +1,64 @@
+# tests/test_response_cache.py
+# Cached GET responses must never outlive the entity version they were built from.
+
+
+def test_recreated_lesson_is_not_served_from_the_deleted_lessons_cache(client, api):
+    first = client.post("/api/courses/1/lessons", json={"title": "Old", "content_ids": ["old.mp4"]}).get_json()
+    old = client.get(f"/api/lessons/{first['id']}/content")
+    assert old.status_code == 200
+    old_etag = old.headers["ETag"]
+    old_version = api.storage.get_version("lesson", first["id"])
+
+    assert client.delete(f"/api/lessons/{first['id']}").status_code == 200
+    assert client.get(f"/api/lessons/{first['id']}/content").status_code == 404
+    second = client.post("/api/courses/1/lessons", json={"title": "New", "content_ids": ["new.mp4"]}).get_json()
+    # SQLite reuses the newest rowid; the memory backend never does. Either way the
+    # new lesson's content must be fresh.
+    if second["id"] == first["id"]:
+        assert api.storage.get_version("lesson", second["id"]) > old_version
+
+    response = client.get(f"/api/lessons/{second['id']}/content")
+    assert response.status_code == 200
+    assert [item["id"] for item in response.get_json()["content"]] == ["new.mp4"]
+    assert response.headers["ETag"] != old_etag
+    revalidated = client.get(f"/api/lessons/{second['id']}/content", headers={"If-None-Match": old_etag})
+    assert revalidated.status_code == 200
+
+
+def test_update_changes_the_etag(client):
+    lesson = client.post("/api/courses/1/lessons", json={"title": "Intro", "content_ids": ["a.mp4"]}).get_json()
+    etag = client.get(f"/api/lessons/{lesson['id']}/content").headers["ETag"]
+    assert client.get(f"/api/lessons/{lesson['id']}/content", headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(f"/api/lessons/{lesson['id']}", json={"content_ids": ["b.mp4"]})
+    response = client.get(f"/api/lessons/{lesson['id']}/content", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["content"][0]["id"] == "b.mp4"
+
+
+def test_uploading_referenced_content_changes_the_etag(client):
+    lesson = client.post("/api/courses/1/lessons", json={"title": "Intro", "content_ids": ["intro.pdf"]}).get_json()
+    before = client.get(f"/api/lessons/{lesson['id']}/content")
+    assert before.get_json()["content"][0]["type"] == "unknown"
+
+    upload = client.post("/api/content/upload-document?filename=intro.pdf", data=b"%PDF",
+                         content_type="application/octet-stream")
+    assert upload.status_code == 201
+    after = client.get(f"/api/lessons/{lesson['id']}/content", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.get_json()["content"][0]["type"] == "document"
+
+    # A duplicate upload registers nothing, so cached responses stay valid
+    duplicate = client.post("/api/content/upload-document?filename=copy.pdf", data=b"%PDF",
+                            content_type="application/octet-stream")
+    assert duplicate.status_code == 200
+    revalidated = client.get(f"/api/lessons/{lesson['id']}/content", headers={"If-None-Match": after.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
+def test_quiz_etag(client):
+    quiz = client.post("/api/quizzes", json={"title": "Quiz", "questions": [{"q": "2+2?", "a": "4"}]}).get_json()
+    first = client.get(f"/api/quizzes/{quiz['id']}")
+    assert first.status_code == 200
+    assert client.get(f"/api/quizzes/{quiz['id']}", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert client.get("/api/quizzes/999").status_code == 404
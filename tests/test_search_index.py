@@ -0,0 +1,166 @@
+# tests/test_search_index.py
+# The BM25 search index: scores, compressed posting lists, updates and removals,
+# compaction, and the kind and course filters.
+import math
+
+import numpy as np
+import pytest
+
+import search_index
+from search_index import BLOCK_SIZE, B, K1, SearchIndex, _PostingList
+
+
+def _lesson(entity_id, title, course_id=1):
+    return {"id": entity_id, "course_id": course_id, "title": title, "content_ids": []}
+
+
+def _bm25(frequency, length, average_length, documents, document_frequency):
+    idf = math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+    return idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * length / average_length))
+
+
+def test_bm25_scores():
+    index = SearchIndex()
+    index.add_many("lesson", [
+        _lesson(1, "python python basics"),
+        _lesson(2, "python"),
+        _lesson(3, "advanced rust"),
+    ])
+    total, results = index.search("python")
+    average_length = (3 + 1 + 2) / 3
+    assert total == 2
+    # Length normalization: the one-word title outranks the longer one that says it twice
+    assert [(kind, entity_id) for kind, entity_id, _ in results] == [("lesson", 2), ("lesson", 1)]
+    assert results[0][2] == pytest.approx(_bm25(1, 1, average_length, 3, 2), abs=1e-4)
+    assert results[1][2] == pytest.approx(_bm25(2, 3, average_length, 3, 2), abs=1e-4)
+
+
+def test_scores_are_summed_over_query_terms():
+    index = SearchIndex()
+    # Equal lengths and document frequencies, so each term scores the same in every document
+    index.add_many("lesson", [_lesson(1, "python basics"), _lesson(2, "python other"), _lesson(3, "basics other")])
+    total, results = index.search("Python BASICS")
+    assert total == 3
+    assert results[0][1] == 1
+    assert results[0][2] == pytest.approx(results[1][2] + results[2][2], abs=1e-3)
+
+
+def test_ties_go_to_the_earlier_document_and_limit_applies():
+    index = SearchIndex()
+    index.add_many("lesson", [_lesson(i, "same words") for i in range(1, 101)])
+    total, results = index.search("same", limit=5)
+    assert total == 100
+    assert [entity_id for _, entity_id, _ in results] == [1, 2, 3, 4, 5]
+
+
+def test_quiz_and_assignment_text_is_indexed():
+    index = SearchIndex()
+    index.add("quiz", {"id": 1, "title": "Quiz", "questions": [{"q": "What is recursion?", "a": "x"}, "bad"]})
+    index.add("assignment", {"id": 1, "title": "Essay", "description": "Explain recursion"})
+    assert sorted(kind for kind, _, _ in index.search("recursion")[1]) == ["assignment", "quiz"]
+
+
+@pytest.mark.parametrize("gap", [1, 300, 70000])
+def test_posting_lists_round_trip_through_compressed_blocks(gap):
+    docnos = np.arange(0, (2 * BLOCK_SIZE + 5) * gap, gap, dtype=np.int64)
+    frequencies = np.arange(len(docnos), dtype=np.int64) % 7 + 1
+    appended = _PostingList()
+    for docno, frequency in zip(docnos.tolist(), frequencies.tolist()):
+        appended.append(docno, frequency)
+    rebuilt = _PostingList.from_arrays(docnos, frequencies)
+
+    for postings in (appended, rebuilt):
+        assert postings.count == len(docnos)
+        assert len(postings.tail) == 2 * 5  # the partial block stays uncompressed
+        decoded_docnos, decoded_frequencies = postings.decode()
+        order = np.argsort(decoded_docnos)
+        assert decoded_docnos[order].tolist() == docnos.tolist()
+        assert decoded_frequencies[order].tolist() == frequencies.tolist()
+
+
+def test_frequencies_saturate_at_255():
+    postings = _PostingList()
+    postings.append(0, 1000)
+    assert postings.decode()[1].tolist() == [255]
+
+
+def test_update_and_remove():
+    index = SearchIndex()
+    index.add_many("lesson", [_lesson(1, "python"), _lesson(2, "python")])
+    index.add("lesson", _lesson(1, "rust"))
+    assert [entity_id for _, entity_id, _ in index.search("python")[1]] == [2]
+    assert [entity_id for _, entity_id, _ in index.search("rust")[1]] == [1]
+
+    index.remove("lesson", 2)
+    index.remove("lesson", 2)  # no-op
+    index.remove("lesson", 99)  # never indexed
+    assert index.search("python") == (0, [])
+    assert index.stats() == {"documents": 1, "dead_documents": 2, "terms": 2}
+
+
+def test_compaction_keeps_results():
+    index = SearchIndex()
+    index.add_many("lesson", [_lesson(i, f"common term{i % 3}", course_id=i % 2) for i in range(1, 400)])
+    for entity_id in range(1, 400, 2):
+        index.remove("lesson", entity_id)
+    index.add("lesson", _lesson(2, "common updated", course_id=0))
+    before = index.search("common term1 updated", limit=500)
+
+    index.compact()
+    assert index.stats()["dead_documents"] == 0
+    assert len(index) == 199
+    after = index.search("common term1 updated", limit=500)
+    assert after[0] == before[0]
+    # Dead postings no longer count towards document frequencies, so only the order is compared
+    assert [(kind, entity_id) for kind, entity_id, _ in after[1]][:1] == [("lesson", 2)]
+    assert sorted(entity_id for _, entity_id, _ in after[1]) == sorted(entity_id for _, entity_id, _ in before[1])
+    assert index.search("common", course_id=0, limit=500)[0] == 199
+    # Writes after compaction use the renumbered arrays
+    index.add("lesson", _lesson(4, "fresh"))
+    assert index.search("fresh")[1][0][1] == 4
+
+
+def test_compaction_runs_once_dead_documents_outnumber_live_ones(monkeypatch):
+    monkeypatch.setattr(search_index, "MIN_DEAD_TO_COMPACT", 3)
+    index = SearchIndex()
+    index.add_many("lesson", [_lesson(i, "python") for i in range(1, 7)])
+    for entity_id in range(1, 5):
+        index.remove("lesson", entity_id)
+    assert index.stats()["dead_documents"] == 0
+    assert [entity_id for _, entity_id, _ in index.search("python")[1]] == [5, 6]
+
+
+def test_kind_and_course_filters():
+    index = SearchIndex()
+    index.add_many("lesson", [_lesson(1, "graphs", course_id=1), _lesson(2, "graphs", course_id=2)])
+    index.add("quiz", {"id": 1, "title": "graphs quiz", "questions": []})
+    index.add("assignment", {"id": 1, "title": "graphs", "description": ""})
+
+    assert sorted(kind for kind, _, _ in index.search("graphs", kinds=["quiz", "assignment"])[1]) == ["assignment", "quiz"]
+    assert [(kind, entity_id) for kind, entity_id, _ in index.search("graphs", course_id=2)[1]] == [("lesson", 2)]
+    assert index.search("graphs", kinds=["quiz"], course_id=1) == (0, [])
+    assert index.search("graphs", course_id=3) == (0, [])
+
+
+@pytest.mark.parametrize("course_id", [2**63, 2**64, -5, "1", True, None])
+def test_course_ids_the_index_cannot_store_are_no_course(course_id):
+    index = SearchIndex()
+    index.add_many("lesson", [_lesson(1, "python", course_id=course_id), _lesson(2, "python", course_id=1)])
+    assert index.search("python")[0] == 2
+    assert [entity_id for _, entity_id, _ in index.search("python", course_id=1)[1]] == [2]
+    assert index.search("python", course_id=2**64) == (0, [])
+
+
+def test_search_endpoint(client):
+    client.post("/api/courses/1/lessons", json={"title": "Intro to graphs"})
+    client.post("/api/courses/2/lessons", json={"title": "Graphs again"})
+    client.post("/api/quizzes", json={"title": "Graphs quiz", "questions": []})
+
+    response = client.get("/api/search?q=graphs&type=lesson&course_id=2")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["total"] == 1
+    assert body["results"][0]["item"]["title"] == "Graphs again"
+    assert client.get(f"/api/search?q=graphs&course_id={2**64}").get_json()["total"] == 0
+    assert client.get("/api/search?q=graphs&type=video").status_code == 400
+    assert client.get("/api/search").status_code == 400
@@ -0,0 +1,106 @@
+# tests/test_uploads.py
+# Streaming and resumable uploads: duplicates are detected before a file is moved into
+# place, and malformed requests get 4xx answers.
+import io
+import uuid
+
+import pytest
+
+from chunked_upload import UploadError
+
+
+def _upload(client, content_type, filename, body):
+    return client.post(f"/api/content/upload-{content_type}?filename={filename}", data=body,
+                       content_type="application/octet-stream")
+
+
+def _upload_session(client, content_type, filename, body):
+    session = client.post("/api/content/uploads", json={"type": content_type, "filename": filename, "size": len(body)})
+    assert session.status_code == 201
+    session_id = session.get_json()["id"]
+    chunk = client.put(f"/api/content/uploads/{session_id}", data=body, headers={"Upload-Offset": "0"})
+    assert chunk.status_code == 200
+    return client.post(f"/api/content/uploads/{session_id}/complete", json={})
+
+
+def _download(client, filename):
+    return client.get(f"/api/content/documents/{filename}").get_data()
+
+
+@pytest.mark.parametrize("upload", [_upload, _upload_session])
+def test_duplicate_under_another_files_name_leaves_that_file_alone(client, upload):
+    assert upload(client, "document", "a.pdf", b"same bytes").status_code == 201
+    assert upload(client, "document", "b.pdf", b"other bytes").status_code == 201
+
+    duplicate = upload(client, "document", "b.pdf", b"same bytes")
+    assert duplicate.status_code == 200
+    assert duplicate.get_json()["filename"] == "a.pdf"
+    assert _download(client, "a.pdf") == b"same bytes"
+    assert _download(client, "b.pdf") == b"other bytes"
+
+
+def test_duplicate_leaves_no_staged_files(client, api, tmp_path):
+    _upload(client, "document", "a.pdf", b"same bytes")
+    _upload(client, "document", "c.pdf", b"same bytes")
+    _upload_session(client, "document", "d.pdf", b"same bytes")
+    assert sorted(p.name for p in (tmp_path / "content" / "documents").iterdir()) == ["a.pdf"]
+    assert list((tmp_path / "content" / "sessions").iterdir()) == []
+
+
+def test_chunk_for_unknown_session_is_404(client):
+    response = client.put(f"/api/content/uploads/{uuid.uuid4().hex}", data=b"data", headers={"Upload-Offset": "0"})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("filename", [123, ["a.pdf"], {"name": "a.pdf"}])
+def test_non_string_filenames_are_rejected(client, filename):
+    assert client.post("/api/content/uploads", json={"type": "document", "filename": filename}).status_code == 400
+    assert client.post("/api/content/upload-document", json={"filename": filename}).status_code == 400
+
+
+def test_same_bytes_of_another_type_are_not_a_duplicate(client):
+    assert _upload(client, "video", "clip.mp4", b"same bytes").status_code == 201
+    document = _upload(client, "document", "notes.pdf", b"same bytes")
+    assert document.status_code == 201
+    assert document.get_json()["content"]["type"] == "document"
+    assert _download(client, "notes.pdf") == b"same bytes"
+    assert _upload(client, "document", "copy.pdf", b"same bytes").get_json()["filename"] == "notes.pdf"
+
+
+def test_unhashable_content_ids_stored_earlier_resolve_as_unknown(client, api):
+    _upload(client, "document", "a.pdf", b"bytes")
+    lesson = api.storage.create_lesson(1, "Legacy", ["a.pdf", ["nested"], {"id": 1}])
+
+    content = client.get(f"/api/lessons/{lesson['id']}/content")
+    assert content.status_code == 200
+    assert [item["type"] for item in content.get_json()["content"]] == ["document", "unknown", "unknown"]
+    outline = client.get("/api/courses/1/outline")
+    assert outline.status_code == 200
+    assert [item["type"] for item in outline.get_json()["lessons"][0]["content"]] == ["document", "unknown", "unknown"]
+
+
+def test_get_contents_looks_up_ids_in_chunks(api, monkeypatch):
+    monkeypatch.setattr("storage.MAX_IN_PARAMETERS", 2)
+    for i in range(5):
+        api.storage.register_content("document", {"filename": f"{i}.pdf", "size": 1, "checksum": None}, f"/{i}.pdf")
+    ids = [f"{i}.pdf" for i in (4, 0, 3, 3, 1, 2)] + ["missing.pdf"]
+    assert sorted(api.storage.get_contents(ids)) == [f"{i}.pdf" for i in range(5)]
+
+
+def test_chunks_past_the_declared_size_are_413(client, api):
+    session_id = client.post("/api/content/uploads", json={"type": "document", "filename": "a.pdf", "size": 6}).get_json()["id"]
+    assert client.put(f"/api/content/uploads/{session_id}", data=b"abcd", headers={"Upload-Offset": "0"}).status_code == 200
+    declared = client.put(f"/api/content/uploads/{session_id}", data=b"efg", headers={"Upload-Offset": "4"})
+    assert declared.status_code == 413
+    assert declared.get_json()["offset"] == 4
+
+    # A chunked body declares no length; the bytes actually read are checked
+    with pytest.raises(UploadError) as refused:
+        api.upload_store.append_chunk(session_id, 4, io.BytesIO(b"efg"))
+    assert refused.value.status_code == 413
+    assert api.upload_store.get_session(session_id)["offset"] == 4
+
+    assert api.upload_store.append_chunk(session_id, 4, io.BytesIO(b"ef"))["offset"] == 6
+    complete = client.post(f"/api/content/uploads/{session_id}/complete", json={})
+    assert complete.status_code == 201
+    assert _download(client, "a.pdf") == b"abcdef"
@@ -0,0 +1,67 @@
+# tests/test_validation.py
+# Request bodies with the wrong types get a 400 from both backends, never a 500, and
+# create nothing.
+import pytest
+
+BAD_BODIES = [
+    ("/api/courses/1/lessons", {"title": None}),
+    ("/api/courses/1/lessons", {"title": {"en": "Intro"}}),
+    ("/api/courses/1/lessons", {"title": "Intro", "content_ids": "a.mp4"}),
+    ("/api/courses/1/lessons", {"title": "Intro", "content_ids": [["a.mp4"]]}),
+    ("/api/quizzes", {"title": None, "questions": []}),
+    ("/api/quizzes", {"title": "Quiz", "questions": [], "lesson_id": "1"}),
+    ("/api/quizzes", {"title": "Quiz", "questions": [], "lesson_id": 2**63}),
+    ("/api/assignments", {"title": "Essay", "description": {"text": "Write"}}),
+    ("/api/assignments", {"title": "Essay", "description": "Write", "lesson_id": [1]}),
+    ("/api/assignments", {"title": "Essay", "description": "Write", "lesson_id": True}),
+]
+
+
+@pytest.mark.parametrize("path,body", BAD_BODIES)
+def test_bad_types_are_rejected(client, path, body):
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+    assert client.get("/api/courses/1/lessons").get_json() == []
+
+
+@pytest.mark.parametrize("changes", [
+    {"title": None},
+    {"content_ids": {"a.mp4": 1}},
+    {"course_id": -1},
+    {"course_id": 2**63},
+])
+def test_bad_lesson_changes_are_rejected(client, api, changes):
+    lesson = client.post("/api/courses/1/lessons", json={"title": "Intro", "content_ids": ["a.mp4"]}).get_json()
+    assert client.put(f"/api/lessons/{lesson['id']}", json=changes).status_code == 400
+    assert api.storage.get_lesson(lesson["id"]) == lesson
+
+
+def test_lesson_id_may_be_null(client):
+    response = client.post("/api/quizzes", json={"title": "Quiz", "questions": [], "lesson_id": None})
+    assert response.status_code == 201
+    assert response.get_json()["lesson_id"] is None
+
+
+@pytest.mark.parametrize("entity_id", [0, 2**63, 2**64])
+@pytest.mark.parametrize("method,path", [
+    ("get", "/api/courses/{}/lessons"),
+    ("post", "/api/courses/{}/lessons"),
+    ("post", "/api/courses/{}/lessons/batch"),
+    ("get", "/api/courses/{}/outline"),
+    ("put", "/api/lessons/{}"),
+    ("delete", "/api/lessons/{}"),
+    ("get", "/api/lessons/{}/content"),
+    ("get", "/api/quizzes/{}"),
+    ("post", "/api/quizzes/{}/submissions"),
+    ("get", "/api/quizzes/{}/analytics"),
+    ("get", "/api/submissions/{}"),
+])
+def test_out_of_range_path_ids_are_404(client, method, path, entity_id):
+    response = getattr(client, method)(path.format(entity_id), json={"title": "Intro"})
+    assert response.status_code == 404
+
+
+def test_largest_path_id_is_accepted(client):
+    assert client.get(f"/api/lessons/{2**63 - 1}/content").status_code == 404
+    assert client.get(f"/api/courses/{2**63 - 1}/lessons").get_json() == []
@@ -1,8 +1,10 @@
 import logging
 import json # Not strictly needed here if JsonFormatter handles it, but good for context
+import os
 from datetime import datetime, timezone
 # Assuming json_formatter.py is in the same directory or accessible in PYTHONPATH
 from json_formatter import JsonFormatter
+from async_logging import attach_async_pipeline
 
 # --- User Activity Logger Setup ---
 # Create a specific logger for user activities.
@@ -19,13 +21,33 @@ activity_logger.setLevel(logging.INFO) # Set the level for this specific logger
 # configure a new handler here. For simplicity, we can reuse JsonFormatter and StreamHandler,
 # but in a real setup, you might have a FileHandler or a network handler.
 
+# The request thread never formats JSON or writes to the stream itself: records go onto a
+# bounded queue and a background thread formats and writes them in batches
+# (see async_logging.py). Tunables:
+#   ACTIVITY_LOG_QUEUE_SIZE      max queued records (default 10000)
+#   ACTIVITY_LOG_OVERFLOW        block | drop_oldest | sample (default drop_oldest)
+#   ACTIVITY_LOG_BATCH_SIZE      records per write (default 256)
+#   ACTIVITY_LOG_FLUSH_INTERVAL  max seconds a record waits before being written (default 0.5)
+activity_queue_handler = None
+activity_log_listener = None
+
 # Check if handlers are already configured (e.g. by a global config)
 # This is a simple check; more robust would be to check by handler type or name
 if not activity_logger.handlers:
     activity_console_handler = logging.StreamHandler() # Outputs to stderr by default
     activity_console_handler.setFormatter(JsonFormatter()) # Use the same JSON formatter
-    activity_logger.addHandler(activity_console_handler)
-    print("User activity logger configured with new StreamHandler and JsonFormatter.")
+    # The pipeline is this logger's destination; propagating as well would write every
+    # event a second time (synchronously) if the root logger has handlers.
+    activity_logger.propagate = False
+    activity_queue_handler, activity_log_listener = attach_async_pipeline(
+        activity_logger,
+        [activity_console_handler],
+        maxsize=int(os.environ.get("ACTIVITY_LOG_QUEUE_SIZE", 10000)),
+        overflow=os.environ.get("ACTIVITY_LOG_OVERFLOW", "drop_oldest"),
+        batch_size=int(os.environ.get("ACTIVITY_LOG_BATCH_SIZE", 256)),
+        flush_interval=float(os.environ.get("ACTIVITY_LOG_FLUSH_INTERVAL", 0.5)),
+    )
+    print("User activity logger configured with async batching StreamHandler and JsonFormatter.")
 else:
     print("User activity logger already has handlers.")
 # --- End User Activity Logger Setup ---
@@ -83,8 +105,15 @@ class UserActivityService:
         # Log using the dedicated activity_logger
         # The `extra` argument merges its content into the log record's __dict__,
         # which JsonFormatter can then pick up.
+        # With the async pipeline installed this only builds the record and appends it
+        # to the queue; formatting and writing happen on the writer thread.
         activity_logger.info(log_message, extra=activity_data)
 
+    @staticmethod
+    def pipeline_stats():
+        """Queued/dropped/flushed counters of the async activity log pipeline (None if not in use)."""
+        return activity_queue_handler.stats() if activity_queue_handler else None
+
 
 # --- Example Usage (can be run directly for testing the logger) ---
 if __name__ == "__main__":
@@ -133,6 +162,10 @@ if __name__ == "__main__":
         additional_details={"files_deleted": 1024, "space_freed_mb": 256}
     )
 
+    # Writes happen on a background thread; flush them before the example exits
+    if activity_log_listener:
+        activity_log_listener.stop()
+        print(f"Activity log pipeline: {UserActivityService.pipeline_stats()}")
+
     print("Test activities logged. Check your console/log output.")
     print("If JsonFormatter is correctly configured for 'user_activity' logger, output should be JSON.")
-```